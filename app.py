@@ -1,24 +1,32 @@
 import os
+import json
+import time
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Import all your individual fetching functions from the scrapers package
-from scrapers import (
-    fetch_instagram_post_info,
-    fetch_instagram_profile_info,
-    fetch_instagram_hashtag_media,
-    fetch_tiktok_post_info,
-    fetch_tiktok_profile_info,
-    fetch_youtube_post_info,
-    fetch_youtube_profile_info,
-    fetch_snapchat_profile_info
-)
+# Batch helper that fans identifiers out to the individual scrapers concurrently
+from scrapers import SCRAPERS, INCREMENTAL_INFO_TYPES, preload
+from scrapers.batch import fetch_batch, iter_batch
+# Persistent background job queue for batches too large to finish within one request
+from scrapers.jobs import get_job_queue, JobNotFound, DEFAULT_PAGE_SIZE
+# Streaming CSV / NDJSON / Parquet exports with a fixed column order per info type
+from scrapers.export import export_records, available_formats, ExportError
+# Prometheus metrics, totalled across gunicorn workers
+from scrapers import metrics
+# Delta-encoded history of profile and post metrics, recorded on fresh fetches with SCRAPER_SNAPSHOTS_ENABLED=1
+from scrapers.snapshots import get_history, parse_time
 
 app = Flask(__name__)
 
+# Seconds /api/fetch-info spends fetching before it answers with what it has; identifiers still
+# pending then come back as "Failed". Keep it under the server's worker timeout. 0 disables it.
+FETCH_TIME_BUDGET = float(os.getenv("FETCH_TIME_BUDGET", "25"))
+
+INCREMENTAL_ERROR = f"'incremental' is only supported for {', '.join(sorted(INCREMENTAL_INFO_TYPES))}."
+
 @app.route('/')
 def home():
     """Renders the main HTML page for the social media info fetcher."""
@@ -28,78 +36,34 @@ def home():
 def get_info():
     """
     API endpoint to fetch social media information for multiple inputs.
-    Expects a JSON payload with 'type' and a list of 'identifiers'.
+    Expects a JSON payload with 'type' and a list of 'identifiers', and optionally
+    'time_budget': the seconds to spend before returning partial results (FETCH_TIME_BUDGET by default),
+    'debug': true to add a "_debug" timing breakdown and attempt count to every record,
+    and 'incremental': true to get only hashtag posts that earlier incremental calls haven't returned.
     """
     data = request.get_json()
     info_type = data.get("type", "")
     identifiers = data.get("identifiers", []) # Now expecting a list of identifiers
+    time_budget = data.get("time_budget", FETCH_TIME_BUDGET)
+    debug = data.get("debug", False) is True
+    incremental = data.get("incremental", False) is True
 
     # Basic validation
     if not info_type or not identifiers:
         return jsonify({"error": "Missing 'type' or 'identifiers' in request. Please provide at least one identifier."}), 400
+    if isinstance(time_budget, bool) or not isinstance(time_budget, (int, float)) or time_budget < 0:
+        return jsonify({"error": "'time_budget' must be a non-negative number of seconds."}), 400
+    if incremental and info_type not in INCREMENTAL_INFO_TYPES:
+        return jsonify({"error": INCREMENTAL_ERROR}), 400
 
     all_results = []
     overall_status = "success" # Will be "partial_success" or "failure" if errors occur
 
-    for identifier in identifiers:
-        info_for_current_identifier = None
-        current_item_error_message = None
-
-        try:
-            # Call the appropriate scraper function based on info_type
-            if info_type == "instagram_post":
-                info_for_current_identifier = fetch_instagram_post_info(identifier)
-            elif info_type == "instagram_profile":
-                info_for_current_identifier = fetch_instagram_profile_info(identifier)
-            elif info_type == "instagram_hashtag":
-                # Instagram Hashtag Media returns a LIST of posts.
-                # We need to extend the main all_results list with these.
-                hashtag_posts = fetch_instagram_hashtag_media(identifier)
-                if hashtag_posts and isinstance(hashtag_posts, list):
-                    all_results.extend(hashtag_posts)
-                elif hashtag_posts and isinstance(hashtag_posts, dict) and hashtag_posts.get("error"):
-                    current_item_error_message = hashtag_posts["error"]
-                    overall_status = "partial_success" # At least one error occurred
-                else:
-                    current_item_error_message = "No data or unexpected format from Instagram Hashtag Media API."
-                    overall_status = "partial_success"
-
-            elif info_type == "tiktok_post":
-                info_for_current_identifier = fetch_tiktok_post_info(identifier)
-            elif info_type == "tiktok_profile":
-                info_for_current_identifier = fetch_tiktok_profile_info(identifier)
-            elif info_type == "youtube_post":
-                info_for_current_identifier = fetch_youtube_post_info(identifier)
-            elif info_type == "youtube_profile":
-                info_for_current_identifier = fetch_youtube_profile_info(identifier)
-            elif info_type == "snapchat_profile":
-                info_for_current_identifier = fetch_snapchat_profile_info(identifier)
-            else:
-                current_item_error_message = "Invalid info type provided."
-                overall_status = "partial_success" # Invalid type counts as an error for that item
-
-            # If a single item (not a list from hashtag) was fetched and it's not an error
-            if info_for_current_identifier and isinstance(info_for_current_identifier, dict) and not info_for_current_identifier.get("error"):
-                all_results.append(info_for_current_identifier)
-            # If a single item was fetched but it contained an error
-            elif info_for_current_identifier and isinstance(info_for_current_identifier, dict) and info_for_current_identifier.get("error"):
-                current_item_error_message = info_for_current_identifier["error"]
-                overall_status = "partial_success" # An error occurred for this item
-
-        except Exception as e:
-            import traceback
-            traceback.print_exc() # Print full traceback to console for debugging
-            current_item_error_message = f"An unexpected server error occurred for identifier '{identifier}': {str(e)}"
-            overall_status = "partial_success" # Mark as partial success due to an error
-
-        # If there was an error for the current identifier, add an error record to results
-        if current_item_error_message:
-            all_results.append({
-                "Requested Identifier": identifier,
-                "Status": "Failed",
-                "Error Details": current_item_error_message,
-                "Platform": info_type.split('_')[0].capitalize() # Get platform name
-            })
+    # Identifiers are fetched concurrently; results come back in input order
+    for records, failed in fetch_batch(info_type, identifiers, time_budget=time_budget, debug=debug, incremental=incremental):
+        all_results.extend(records)
+        if failed:
+            overall_status = "partial_success" # At least one error occurred
 
     # Determine final response based on overall status
     if not all_results and overall_status == "partial_success":
@@ -115,6 +79,224 @@ def get_info():
         # All items succeeded
         return jsonify({"results": all_results}), 200
 
+def _format_event(event, payload, sse):
+    """Serializes one stream message as an SSE event or a single NDJSON line."""
+    body = json.dumps(payload, ensure_ascii=False, default=str)
+    if sse:
+        return f"event: {event}\ndata: {body}\n\n"
+    return body + "\n"
+
+@app.route('/api/fetch-info/stream', methods=['POST'])
+def stream_info():
+    """
+    Streaming variant of /api/fetch-info: takes the same JSON payload but sends each record
+    (data or "Failed") as soon as its identifier completes instead of buffering the batch;
+    hashtag posts are sent page by page while the hashtag is still being paginated.
+    Responds with NDJSON by default, or Server-Sent Events with ?format=sse or
+    'Accept: text/event-stream'. Every message is {"type": "record", "index", "record"},
+    where 'index' is the identifier's position in the request, and the stream ends with
+    {"type": "summary", "total", "completed", "failed", "warning"/"error"}.
+    """
+    data = request.get_json()
+    info_type = data.get("type", "")
+    identifiers = data.get("identifiers", [])
+    incremental = data.get("incremental", False) is True
+
+    # Same validation as the buffered endpoint
+    if not info_type or not identifiers:
+        return jsonify({"error": "Missing 'type' or 'identifiers' in request. Please provide at least one identifier."}), 400
+    if incremental and info_type not in INCREMENTAL_INFO_TYPES:
+        return jsonify({"error": INCREMENTAL_ERROR}), 400
+
+    sse = request.args.get("format") == "sse" or "text/event-stream" in request.headers.get("Accept", "")
+
+    def generate():
+        record_count = 0
+        completed = 0
+        failed_count = 0
+        for position, records, failed, finished in iter_batch(info_type, identifiers, incremental=incremental):
+            if finished:
+                completed += 1
+                if failed:
+                    failed_count += 1
+            for record in records:
+                record_count += 1
+                yield _format_event("record", {"type": "record", "index": position, "record": record}, sse)
+
+        summary = {"type": "summary", "total": len(identifiers), "completed": completed, "failed": failed_count}
+        if failed_count and failed_count == completed:
+            summary["error"] = "No data could be fetched for any of the provided identifiers, or all failed. Please check inputs and API keys."
+        elif failed_count:
+            summary["warning"] = "Some identifiers failed to fetch data. Please check the 'Status' and 'Error Details' for individual records."
+        elif not record_count:
+            summary["warning"] = "No data found for the provided identifiers."
+        yield _format_event("summary", summary, sse)
+
+    mimetype = "text/event-stream" if sse else "application/x-ndjson"
+    # Proxies such as nginx would otherwise buffer the whole stream before forwarding it
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers=headers)
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queues a batch for background processing and returns its job id right away.
+    Expects the same JSON payload as /api/fetch-info ('type', 'identifiers' and 'incremental').
+    """
+    data = request.get_json()
+    info_type = data.get("type", "")
+    identifiers = data.get("identifiers", [])
+    incremental = data.get("incremental", False) is True
+
+    if not info_type or not identifiers:
+        return jsonify({"error": "Missing 'type' or 'identifiers' in request. Please provide at least one identifier."}), 400
+    if info_type not in SCRAPERS:
+        return jsonify({"error": "Invalid info type provided."}), 400
+    if incremental and info_type not in INCREMENTAL_INFO_TYPES:
+        return jsonify({"error": INCREMENTAL_ERROR}), 400
+
+    job_id = get_job_queue().submit(info_type, identifiers, incremental=incremental)
+    return jsonify({"job_id": job_id, "status": "queued", "total": len(identifiers)}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Returns a job's status and progress counters."""
+    try:
+        return jsonify(get_job_queue().get_job(job_id)), 200
+    except JobNotFound:
+        return jsonify({"error": f"Job '{job_id}' not found."}), 404
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """
+    Returns a page of a job's records. Pass a response's 'next_cursor' as the 'cursor' query
+    parameter to get the next page ('has_more' tells whether one is ready already; while the
+    job runs, polling with the same cursor picks up new records). 'limit' sets the page size.
+    """
+    job_queue = get_job_queue()
+    try:
+        job = job_queue.get_job(job_id)
+        records, next_cursor, has_more = job_queue.get_results(
+            job_id,
+            cursor=request.args.get("cursor"),
+            limit=request.args.get("limit", DEFAULT_PAGE_SIZE, type=int),
+        )
+    except JobNotFound:
+        return jsonify({"error": f"Job '{job_id}' not found."}), 404
+    except ValueError:
+        return jsonify({"error": "Invalid 'cursor' parameter."}), 400
+
+    return jsonify({
+        "job_id": job_id,
+        "status": job["status"],
+        "results": records,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    }), 200
+
+def _export_response(records, info_type, export_format, filename):
+    """Streams records as a file download, or returns a 400 for an unusable format."""
+    try:
+        chunks, mimetype, extension = export_records(records, info_type, export_format)
+    except ExportError as e:
+        return jsonify({"error": str(e)}), 400
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{extension}"'}
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+@app.route('/api/export', methods=['POST'])
+def export_results():
+    """
+    Exports a result set as a download. Expects a JSON payload with 'type' and the 'results'
+    returned by /api/fetch-info; ?format= selects csv (default), ndjson or, with pyarrow installed,
+    parquet (see /api/export/formats).
+    The whole payload is parsed in memory, so this is for small result sets a client already
+    holds; batches run as jobs are exported by /api/jobs/<job_id>/export without a re-upload.
+    """
+    data = request.get_json()
+    info_type = data.get("type", "")
+    results = data.get("results", [])
+
+    if not info_type or not isinstance(results, list):
+        return jsonify({"error": "Missing 'type' or 'results' in request."}), 400
+
+    records = (record for record in results if isinstance(record, dict))
+    return _export_response(records, info_type, request.args.get("format", "csv"), "social_media_data")
+
+@app.route('/api/export/formats', methods=['GET'])
+def export_formats():
+    """Lists the export formats this installation can produce (Parquet only when pyarrow is installed)."""
+    return jsonify({"formats": available_formats()}), 200
+
+@app.route('/api/jobs/<job_id>/export', methods=['GET'])
+def export_job(job_id):
+    """
+    Exports every record a job has produced so far; ?format= selects one of /api/export/formats (csv by default).
+    Records are read from the job store page by page while the file is being sent;
+    a finished job is exported in the order its identifiers were submitted.
+    """
+    job_queue = get_job_queue()
+    try:
+        job = job_queue.get_job(job_id)
+    except JobNotFound:
+        return jsonify({"error": f"Job '{job_id}' not found."}), 404
+    return _export_response(
+        job_queue.iter_records(job_id, input_order=job["status"] == "completed"), job["type"], request.args.get("format", "csv"), f"{job['type']}_{job_id}"
+    )
+
+@app.route('/api/snapshots', methods=['GET'])
+def get_snapshots():
+    """
+    Returns the recorded metric history of a profile or post and its growth over the range,
+    e.g. /api/snapshots?type=tiktok_profile&identifier=@user&days=30. The range is the last
+    'days' days (30 by default), or 'since' / 'until' as Unix seconds or ISO dates.
+    """
+    info_type = request.args.get("type", "")
+    identifier = request.args.get("identifier", "")
+    if not info_type or not identifier:
+        return jsonify({"error": "Missing 'type' or 'identifier' query parameter."}), 400
+
+    try:
+        until = parse_time(request.args["until"]) if "until" in request.args else None
+        if "since" in request.args:
+            since = parse_time(request.args["since"])
+        else:
+            days = float(request.args.get("days", "30"))
+            since = int((until if until is not None else time.time()) - days * 86400)
+    except ValueError:
+        return jsonify({"error": "'since' and 'until' must be Unix seconds or ISO dates, 'days' a number."}), 400
+
+    history = get_history(info_type, identifier, since, until)
+    if history.get("error"):
+        return jsonify(history), 400
+    if history["points"] is None:
+        return jsonify({"error": f"No snapshots recorded for {info_type} '{identifier}'."}), 404
+    return jsonify(history), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Prometheus metrics: upstream calls (counts by status, error classes, latency), API key
+    states and rotations, cache hit rates, in-flight calls, langdetect time and circuit breakers.
+    Under gunicorn the numbers cover every worker, whichever one serves the scrape.
+    """
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.before_request
+def start_background_work():
+    """
+    Starts this process's job workers (resuming any unfinished jobs left over from a previous
+    run) and metrics publisher, once. Under gunicorn, post_fork has done it already; elsewhere
+    (python app.py, flask run) it happens on the first request rather than at import, which
+    every process importing app would otherwise repeat, langdetect's pool processes included.
+    """
+    get_job_queue().ensure_workers()
+    metrics.ensure_publisher()
+
+if os.getenv("SCRAPER_PRELOAD") == "1":
+    # Set by gunicorn.conf.py under preload_app: load every platform once in the master so
+    # forked workers share it; job workers and the metrics publisher start in each worker after the fork
+    preload()
+
 if __name__ == '__main__':
     # Run the Flask app in debug mode. Set debug=False for production.
     app.run(debug=True)
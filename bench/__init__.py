@@ -0,0 +1,2 @@
+# bench/__init__.py
+# Load testing tools: a stub of the RapidAPI hosts (stub_server.py) and the benchmark suite (run.py).
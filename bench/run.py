@@ -0,0 +1,361 @@
+# bench/run.py
+# End-to-end throughput benchmark of /api/fetch-info against the stub RapidAPI server. Reports
+# requests/sec, p50/p99 latency and upstream calls per identifier for each scenario, and saves
+# the results under bench/results/ so runs can be compared:
+#
+#     python -m bench.run --label baseline
+#     python -m bench.run --label pooled --compare bench/results/<baseline file>.json
+#
+# By default the app runs in-process (Flask test client) against a stub started in a thread.
+# With --url, a running server is benchmarked instead; it must have been started with
+# SCRAPER_UPSTREAM_OVERRIDE pointing at the stub given by --stub-url. With --replay DIR, upstream
+# responses come from fixtures recorded with SCRAPER_FIXTURES_MODE=record (see scrapers/fixtures.py),
+# the identifiers requested are the ones recorded, and the result cache is off, so every request
+# runs the extraction path on real payloads, offline and the same way every time.
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from .stub_server import StubServer, add_config_arguments, config_from_arguments
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "bench", "results")
+SCENARIOS = ("single", "large_batch", "duplicate_heavy")
+
+# Different spellings of the same identifier per info type; all of them canonicalize to the same key.
+# 'token' is 11 characters of [a-z0-9], unique per identifier.
+SPELLINGS = {
+    "youtube_profile": lambda token: [f"@{token}", f"https://www.youtube.com/@{token}", token],
+    "youtube_post": lambda token: [f"https://www.youtube.com/watch?v={token}", f"https://youtu.be/{token}",
+                                   f"https://www.youtube.com/shorts/{token}"],
+    "tiktok_profile": lambda token: [f"@{token}", f"https://www.tiktok.com/@{token}", token],
+    "tiktok_post": lambda token: [f"https://www.tiktok.com/@bench/video/{int(token, 36)}",
+                                  f"https://www.tiktok.com/@bench/video/{int(token, 36)}?lang=en"],
+    "instagram_profile": lambda token: [token, f"@{token}", f"https://www.instagram.com/{token}/"],
+    "instagram_post": lambda token: [f"https://www.instagram.com/p/{token}/", f"https://www.instagram.com/reel/{token}/"],
+    "instagram_hashtag": lambda token: [f"#{token}", token, f"#{token.upper()}"],
+    "snapchat_profile": lambda token: [token, f"https://www.snapchat.com/add/{token}"],
+}
+
+
+def _percentile(sorted_values, share):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(share * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class InProcessClient:
+    """Posts to the app through Flask test clients, one per thread."""
+    def __init__(self, app, upstream_calls):
+        self.app = app
+        self.upstream_calls = upstream_calls # Returns the upstream calls answered so far
+        self._local = threading.local()
+
+    def post(self, payload):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.post("/api/fetch-info", json=payload)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    """Posts to a running server over HTTP and reads the call counter of a separately started stub."""
+    def __init__(self, url, stub_url):
+        self.url = url.rstrip("/") + "/api/fetch-info"
+        self.stub_url = stub_url.rstrip("/")
+
+    def post(self, payload):
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def upstream_calls(self):
+        with urllib.request.urlopen(f"{self.stub_url}/__stats", timeout=10) as response:
+            return json.loads(response.read())["requests"]
+
+
+class IdentifierFactory:
+    """Hands out identifiers no earlier run or scenario has used, so the result caches start cold."""
+    def __init__(self, info_type):
+        self.spellings = SPELLINGS[info_type]
+        self.prefix = uuid.uuid4().hex[:4]
+        self.count = 0
+
+    def new(self):
+        """Returns the spellings of a fresh identifier; the first is the plain one."""
+        self.count += 1
+        return self.spellings(f"b{self.prefix}{self.count:06d}")
+
+
+class RecordedIdentifiers:
+    """Hands out the identifiers fixtures were recorded for, round-robin (with --replay)."""
+    def __init__(self, identifiers):
+        self.identifiers = identifiers
+        self.count = 0
+
+    def new(self):
+        identifier = self.identifiers[self.count % len(self.identifiers)]
+        self.count += 1
+        return [identifier]
+
+
+def _use_fixtures(fixtures_dir):
+    """Sets the app up to replay the fixtures in fixtures_dir. Must run before any scrapers module is imported."""
+    os.environ["SCRAPER_FIXTURES_MODE"] = "replay"
+    os.environ["SCRAPER_FIXTURES_DIR"] = fixtures_dir
+    os.environ["SCRAPER_CACHE_ENABLED"] = "0" # Recorded identifiers repeat; every request should do the work
+    os.environ.pop("SCRAPER_UPSTREAM_OVERRIDE", None)
+
+
+def _recorded_identifiers(fixtures_dir, info_type):
+    from scrapers.fixtures import FixtureStore
+    identifiers = {}
+    for entry in FixtureStore(fixtures_dir).entries():
+        if entry.get("info_type") == info_type and entry["status"] == 200:
+            identifiers.setdefault(entry["identifier"], None)
+    return list(identifiers)
+
+
+def _payloads(scenario, factory, info_type, args):
+    """Returns the request payloads of a scenario and the number of requests sent at a time."""
+    def payload(identifiers):
+        body = {"type": info_type, "identifiers": identifiers}
+        if args.time_budget is not None:
+            body["time_budget"] = args.time_budget
+        return body
+
+    if scenario == "single":
+        return [payload([factory.new()[0]]) for _ in range(args.requests)], args.concurrency
+    if scenario == "large_batch":
+        return [payload([factory.new()[0] for _ in range(args.batch_size)]) for _ in range(args.batches)], 1
+    if scenario == "duplicate_heavy":
+        # A small set of distinct identifiers, each requested many times under different spellings
+        rng = random.Random(args.batch_size)
+        distinct = [factory.new() for _ in range(max(1, int(args.batch_size * args.distinct_share)))]
+        return [
+            payload([rng.choice(rng.choice(distinct)) for _ in range(args.batch_size)])
+            for _ in range(args.batches)
+        ], 1
+    raise ValueError(f"Unknown scenario '{scenario}'")
+
+
+def run_scenario(scenario, client, info_type, args):
+    """Sends a scenario's requests and returns its measurements."""
+    factory = RecordedIdentifiers(args.recorded) if args.replay else IdentifierFactory(info_type)
+    # Warm-up: imports the platform, opens connections and loads langdetect before timing starts
+    client.post({"type": info_type, "identifiers": [factory.new()[0]]})
+
+    payloads, concurrency = _payloads(scenario, factory, info_type, args)
+    latencies = []
+    failed_records = 0
+    http_errors = 0
+    lock = threading.Lock()
+
+    def send(payload):
+        nonlocal failed_records, http_errors
+        start = time.perf_counter()
+        status, body = client.post(payload)
+        elapsed = time.perf_counter() - start
+        failed = sum(1 for record in (body or {}).get("results", []) if record.get("Status") == "Failed")
+        with lock:
+            latencies.append(elapsed)
+            failed_records += failed
+            if status != 200:
+                http_errors += 1
+
+    calls_before = client.upstream_calls()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, payloads))
+    seconds = time.perf_counter() - started
+    upstream_calls = client.upstream_calls() - calls_before
+
+    identifiers = sum(len(payload["identifiers"]) for payload in payloads)
+    latencies.sort()
+    return {
+        "requests": len(payloads),
+        "identifiers": identifiers,
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(len(payloads) / seconds, 2),
+        "identifiers_per_second": round(identifiers / seconds, 2),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.50) * 1000, 1),
+            "p90": round(_percentile(latencies, 0.90) * 1000, 1),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1),
+        },
+        "upstream_calls": upstream_calls,
+        "upstream_calls_per_identifier": round(upstream_calls / identifiers, 3),
+        "failed_records": failed_records,
+        "http_errors": http_errors,
+    }
+
+
+# (label, path into a scenario's results, True if higher is better)
+_REPORTED = (
+    ("req/s", ("requests_per_second",), True),
+    ("ids/s", ("identifiers_per_second",), True),
+    ("p50 ms", ("latency_ms", "p50"), False),
+    ("p99 ms", ("latency_ms", "p99"), False),
+    ("calls/id", ("upstream_calls_per_identifier",), False),
+    ("failed", ("failed_records",), False),
+)
+
+
+def _lookup(results, path):
+    for key in path:
+        results = results.get(key) if isinstance(results, dict) else None
+    return results
+
+
+def print_report(current, previous=None):
+    """Prints each scenario's numbers, with the change from 'previous' (an earlier result file) if given."""
+    from tabulate import tabulate
+    rows = []
+    for scenario, results in current["scenarios"].items():
+        row = [scenario]
+        for _, path, higher_is_better in _REPORTED:
+            value = _lookup(results, path)
+            cell = f"{value}"
+            old = _lookup(previous["scenarios"].get(scenario, {}), path) if previous else None
+            if isinstance(old, (int, float)) and old and isinstance(value, (int, float)):
+                change = (value - old) / old * 100
+                better = change > 0 if higher_is_better else change < 0
+                cell += f" ({change:+.1f}%{'' if abs(change) < 1 else ' better' if better else ' worse'})"
+            row.append(cell)
+        rows.append(row)
+    if previous:
+        print(f"Compared with '{previous.get('label')}' ({previous.get('timestamp')}, {previous.get('git_commit')})")
+    print(tabulate(rows, headers=["scenario"] + [label for label, _, _ in _REPORTED], tablefmt="github"))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=REPO_ROOT, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{results['timestamp'].replace(':', '')}-{results['label']}.json")
+    with open(path, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    return path
+
+
+def _in_process_client(args, stub_config):
+    """
+    Starts the stub in a thread (or sets up replay of the fixtures in args.replay) and loads the
+    app against it. The environment is set before the app is imported, as the scrapers read
+    their configuration at import time.
+    """
+    if not args.replay:
+        stub = StubServer(("127.0.0.1", 0), stub_config)
+        os.environ["SCRAPER_UPSTREAM_OVERRIDE"] = stub.start_in_thread()
+    for index in range(1, args.keys + 1):
+        os.environ[f"RAPIDAPI_KEY_{index}"] = f"bench-key-{index}"
+    os.environ[f"RAPIDAPI_KEY_{args.keys + 1}"] = "" # Ends the key list; .env keys never reach the stub
+    os.environ["RAPIDAPI_KEY_RATE"] = str(args.key_rate)
+    os.environ["RAPIDAPI_KEY_BURST"] = str(max(10.0, args.key_rate))
+    os.environ["SCRAPER_JOBS_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench-"), "jobs.db")
+    os.environ["SCRAPER_JOB_WORKERS"] = "0"
+    os.environ["SCRAPER_SNAPSHOTS_ENABLED"] = "0" # Stub metrics are random; keep them out of the snapshot history
+    os.environ.pop("SCRAPER_CACHE_SQLITE_PATH", None)
+    os.environ.pop("SCRAPER_METRICS_DIR", None)
+
+    sys.path.insert(0, REPO_ROOT)
+    from app import app
+    if args.replay:
+        from scrapers.fixtures import get_fixture_store
+        return InProcessClient(app, lambda: get_fixture_store().replayed)
+    return InProcessClient(app, lambda: stub.stats()["requests"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput benchmark of /api/fetch-info against the stub RapidAPI server.")
+    parser.add_argument("--type", default="youtube_profile", choices=sorted(SPELLINGS), help="Info type to request")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run")
+    parser.add_argument("--requests", type=int, default=200, help="Requests in the single-item scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight in the single-item scenario")
+    parser.add_argument("--batches", type=int, default=5, help="Requests in the batch scenarios")
+    parser.add_argument("--batch-size", type=int, default=200, help="Identifiers per batch")
+    parser.add_argument("--distinct-share", type=float, default=0.1,
+                        help="Distinct identifiers in the duplicate-heavy scenario, as a share of the batch size")
+    parser.add_argument("--time-budget", type=float, default=None, help="'time_budget' sent with each request")
+    parser.add_argument("--keys", type=int, default=8, help="API keys the app rotates through (in-process only)")
+    parser.add_argument("--key-rate", type=float, default=1000, help="RAPIDAPI_KEY_RATE of the app (in-process only)")
+    parser.add_argument("--url", help="Benchmark a running server at this URL instead of the app in-process")
+    parser.add_argument("--stub-url", default="http://127.0.0.1:8765", help="The stub that server uses (with --url)")
+    parser.add_argument("--replay", metavar="DIR", help="Serve upstream responses from the fixtures recorded in DIR")
+    parser.add_argument("--label", default="run", help="Name saved with the results")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--no-save", action="store_true", help="Don't write the results to bench/results/")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    unknown = [scenario for scenario in scenarios if scenario not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(unknown)}. Choose from {', '.join(SCENARIOS)}.")
+
+    if args.replay:
+        if args.url:
+            parser.error("--replay runs the app in-process; it can't be combined with --url.")
+        _use_fixtures(args.replay)
+        args.recorded = _recorded_identifiers(args.replay, args.type)
+        if not args.recorded:
+            parser.error(f"No {args.type} fixtures with a recorded identifier in {args.replay}.")
+
+    stub_config = config_from_arguments(args)
+    client = HttpClient(args.url, args.stub_url) if args.url else _in_process_client(args, stub_config)
+
+    results = {
+        "label": args.label,
+        "timestamp": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": _git_commit(),
+        "info_type": args.type,
+        "target": args.url or "in-process",
+        "replay": args.replay,
+        "settings": {
+            "requests": args.requests, "concurrency": args.concurrency, "batches": args.batches,
+            "batch_size": args.batch_size, "distinct_share": args.distinct_share, "time_budget": args.time_budget,
+            "keys": args.keys, "key_rate": args.key_rate,
+        },
+        "stub": stub_config.as_dict() if not (args.url or args.replay) else None,
+        "scenarios": {},
+    }
+    for scenario in scenarios:
+        print(f"Running {scenario}...")
+        results["scenarios"][scenario] = run_scenario(scenario, client, args.type, args)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as previous_file:
+            previous = json.load(previous_file)
+    print_report(results, previous)
+    if not args.no_save:
+        print(f"Results saved to {save_results(results)}")
+
+
+if __name__ == "__main__":
+    main()
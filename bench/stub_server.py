@@ -0,0 +1,392 @@
+# bench/stub_server.py
+# Local stand-in for the RapidAPI hosts the scrapers call, so /api/fetch-info can be load tested
+# without spending quota. Calls are routed on the x-rapidapi-host header and the path, and answered
+# with payloads shaped like the real APIs' after a configurable delay, with 429/401/5xx answers
+# injected as asked. Point the app at it with SCRAPER_UPSTREAM_OVERRIDE=http://127.0.0.1:<port>,
+# or let bench/run.py start one in-process. On its own:
+#
+#     python -m bench.stub_server --port 8765 --latency lognormal:0.08:0.5 --rate-429 0.02
+#
+# GET /__stats returns the calls served so far (total, by host, by status); POST /__reset clears them.
+import math
+import zlib
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Texts in a few languages, so language detection does representative work
+_TEXTS = (
+    "Just finished the most amazing trip through the mountains, the views were incredible",
+    "Ceci est une description en français pour une vidéo de cuisine du dimanche",
+    "Hoy vamos a preparar una receta tradicional con ingredientes de temporada",
+    "Heute zeige ich euch, wie man in wenigen Minuten ein leckeres Frühstück macht",
+    "Oggi parliamo delle migliori spiagge da visitare questa estate in Italia",
+    "Hoje vou mostrar a minha rotina de treino completa para iniciantes",
+)
+
+
+def parse_latency(spec):
+    """
+    Parses a latency distribution into a function returning seconds:
+    "0" (none), "fixed:S", "uniform:LOW:HIGH" or "lognormal:MEDIAN:SIGMA".
+    """
+    parts = spec.split(":")
+    kind, values = parts[0], [float(value) for value in parts[1:]]
+    if kind == "0" and not values:
+        return lambda rng: 0.0
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Invalid latency spec '{spec}'. Use 0, fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA.")
+
+
+class StubConfig:
+    """
+    How the stub behaves:
+    - latency: distribution spec of the delay before each answer (see parse_latency)
+    - rate_429 / rate_5xx: share of calls answered with a 429 or a 500/502/503
+    - unauthorized_keys: API keys that always get a 401 "not subscribed"
+    - quota: calls each key may make per host before it gets 429s (0 for unlimited);
+      the rate-limit headers report what is left, as RapidAPI does
+    - payload_bytes: approximate size of each response, padded with unused fields
+    - page_size / hashtag_pages: posts per hashtag page and pages before the last one
+    - seed: makes injected failures and delays repeatable
+    """
+    def __init__(self, latency="0", rate_429=0.0, rate_5xx=0.0, unauthorized_keys=(), quota=0,
+                 payload_bytes=2048, page_size=50, hashtag_pages=3, seed=None):
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.unauthorized_keys = frozenset(unauthorized_keys)
+        self.quota = quota
+        self.payload_bytes = payload_bytes
+        self.page_size = page_size
+        self.hashtag_pages = hashtag_pages
+        self.seed = seed
+
+    def as_dict(self):
+        return {
+            "latency": self.latency,
+            "rate_429": self.rate_429,
+            "rate_5xx": self.rate_5xx,
+            "unauthorized_keys": len(self.unauthorized_keys),
+            "quota": self.quota,
+            "payload_bytes": self.payload_bytes,
+            "page_size": self.page_size,
+            "hashtag_pages": self.hashtag_pages,
+        }
+
+
+def _number(rng, low=100, high=5_000_000):
+    return rng.randint(low, high)
+
+
+def _padding(rng, size):
+    """Unused fields bringing a response up to about 'size' bytes, like the noise real APIs send."""
+    related = []
+    used = 0
+    while used < size:
+        entry = {"id": f"{rng.getrandbits(48):012x}", "title": rng.choice(_TEXTS), "views": _number(rng)}
+        related.append(entry)
+        used += len(entry["title"]) + 60
+    return related
+
+
+def youtube_video(path, query, config, rng):
+    video_id = query.get("id", "")
+    return {
+        "videoId": video_id,
+        "title": f"Video {video_id}",
+        "description": rng.choice(_TEXTS),
+        "lengthSeconds": rng.randint(10, 3600),
+        "publishedTimestamp": int(time.time()) - rng.randint(0, 86400 * 365),
+        "stats": {"views": _number(rng), "likes": _number(rng), "comments": _number(rng, 0, 50000)},
+        "author": {"title": f"Channel of {video_id}", "channelId": f"UC{video_id}"},
+        "related": _padding(rng, config.payload_bytes),
+    }
+
+
+def youtube_channel(path, query, config, rng):
+    kind, _, value = path[len("/channel/"):].partition("/")
+    value = urllib.parse.unquote(value)
+    return {
+        "id": value if kind == "id" else f"UC{zlib.crc32(value.encode()):012d}",
+        "handle": value if kind == "handle" else None,
+        "name": f"Channel {value.lstrip('@')}",
+        "subscribers": _number(rng),
+        "videoCount": _number(rng, 1, 5000),
+        "viewCount": _number(rng, 1000, 10 ** 9),
+        "related": _padding(rng, config.payload_bytes),
+    }
+
+
+def tiktok_video(path, query, config, rng):
+    link = query.get("link", "")
+    video_id = link.rstrip("/").rsplit("/", 1)[-1].split("?")[0]
+    return {
+        "ok": True,
+        "id": video_id,
+        "share_url": link,
+        "author": {"unique_id": "stub_author"},
+        "statistics": {"play_count": _number(rng), "digg_count": _number(rng), "comment_count": _number(rng, 0, 50000),
+                       "share_count": _number(rng, 0, 50000)},
+        "video": {"duration": rng.randint(5000, 180000)},
+        "desc_language": rng.choice(("en", "fr", "es", "de")),
+        "create_time": int(time.time()) - rng.randint(0, 86400 * 365),
+        "related": _padding(rng, config.payload_bytes),
+    }
+
+
+def tiktok_user(path, query, config, rng):
+    username = query.get("unique_id", "")
+    return {
+        "code": 0,
+        "data": {
+            "user": {"uniqueId": username, "nickname": username.capitalize()},
+            "stats": {"followerCount": _number(rng), "followingCount": _number(rng, 0, 5000),
+                      "heartCount": _number(rng), "videoCount": _number(rng, 1, 3000)},
+            "related": _padding(rng, config.payload_bytes),
+        },
+    }
+
+
+def instagram_account(path, query, config, rng):
+    username = query.get("username", "")
+    return {
+        "username": username,
+        "full_name": username.capitalize(),
+        "edge_followed_by": {"count": _number(rng)},
+        "edge_follow": {"count": _number(rng, 0, 7500)},
+        "edge_owner_to_timeline_media": {"count": _number(rng, 1, 10000)},
+        "related": _padding(rng, config.payload_bytes),
+    }
+
+
+def instagram_post(path, query, config, rng):
+    code = query.get("code_or_id_or_url", "")
+    return {
+        "data": {
+            "code": code,
+            "is_video": True,
+            "caption": {"text": rng.choice(_TEXTS), "created_at": int(time.time()) - rng.randint(0, 86400 * 365)},
+            "metrics": {"like_count": _number(rng), "comment_count": _number(rng, 0, 50000),
+                        "share_count": _number(rng, 0, 50000), "play_count": _number(rng)},
+            "clips_metadata": {"original_sound_info": {"duration_in_ms": rng.randint(5000, 90000)}},
+            "user": {"username": "stub_author", "full_name": "Stub Author"},
+            "related": _padding(rng, config.payload_bytes),
+        }
+    }
+
+
+def instagram_hashtag(path, query, config, rng):
+    hashtag = query.get("hashtag", "")
+    page = int(query.get("pagination_token", "page-1").rpartition("-")[2] or 1)
+    newest = int(time.time()) - (page - 1) * config.page_size * 60
+    items = []
+    for index in range(config.page_size):
+        text = rng.choice(_TEXTS)
+        items.append({
+            "code": f"{hashtag}-{page}-{index}",
+            "taken_at": newest - index * 60,
+            "caption": {"text": f"{text} #{hashtag}", "hashtags": [f"#{hashtag}"]},
+            "user": {"username": f"user{rng.randint(1, 10 ** 6)}", "full_name": "Stub User"},
+            "is_video": index % 2 == 0,
+            "like_count": _number(rng, 0, 100000),
+            "comment_count": _number(rng, 0, 5000),
+            "ig_play_count": _number(rng),
+        })
+    response = {"data": {"items": items, "related": _padding(rng, config.payload_bytes)}}
+    if page < config.hashtag_pages:
+        response["pagination_token"] = f"page-{page + 1}"
+    return response
+
+
+def snapchat_user(path, query, config, rng):
+    username = query.get("username", "")
+    return {
+        "data": {"props": {"pageProps": {
+            "userProfile": {"publicProfileInfo": {"username": username, "title": username.capitalize(),
+                                                  "subscriberCount": _number(rng)}},
+            "related": _padding(rng, config.payload_bytes),
+        }}}
+    }
+
+
+# host -> [(path prefix, payload builder)]; the first matching prefix answers
+ROUTES = {
+    "youtube-v38.p.rapidapi.com": [("/video/details/", youtube_video)],
+    "youtube-shorts-sounds-songs-api.p.rapidapi.com": [("/channel/", youtube_channel)],
+    "tiktok89.p.rapidapi.com": [("/tiktok", tiktok_video)],
+    "tiktok-scraper7.p.rapidapi.com": [("/user/info", tiktok_user)],
+    "simple-instagram-api.p.rapidapi.com": [("/account-info", instagram_account)],
+    "instagram-social-api.p.rapidapi.com": [("/v1/post_info", instagram_post), ("/v1/hashtag", instagram_hashtag)],
+    "snapchat-scraper2.p.rapidapi.com": [("/api/v1/users/detail", snapchat_user)],
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real hosts, so the app's pool is exercised
+    disable_nagle_algorithm = True # Headers and body are separate writes; don't let delayed ACKs stall them
+
+    def log_message(self, format, *args):
+        pass # One line per call would drown the benchmark's own output
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/__stats":
+            self._send_json(200, self.server.stats())
+            return
+
+        server = self.server
+        config = server.config
+        host = self.headers.get("x-rapidapi-host", "")
+        key = self.headers.get("x-rapidapi-key", "")
+        query = dict(urllib.parse.parse_qsl(url.query))
+        rng = server.rng()
+
+        time.sleep(server.latency(rng))
+
+        builder = next((build for prefix, build in ROUTES.get(host, ()) if url.path.startswith(prefix)), None)
+        if builder is None:
+            status, payload, headers = 404, {"message": f"Endpoint '{url.path}' does not exist"}, {}
+        elif key in config.unauthorized_keys:
+            status, payload, headers = 401, {"message": "You are not subscribed to this API."}, {}
+        else:
+            headers = {}
+            over_quota = False
+            if config.quota:
+                used = server.use_quota(host, key)
+                headers = {"x-ratelimit-requests-limit": config.quota,
+                           "x-ratelimit-requests-remaining": max(0, config.quota - used),
+                           "x-ratelimit-requests-reset": 60}
+                over_quota = used > config.quota
+            roll = rng.random()
+            if over_quota or roll < config.rate_429:
+                status, payload = 429, {"message": "You have exceeded the rate limit per second for your plan."}
+            elif roll < config.rate_429 + config.rate_5xx:
+                status, payload = rng.choice((500, 502, 503)), {"message": "Upstream error"}
+            else:
+                status, payload = 200, builder(url.path, query, config, rng)
+        server.count(host, status)
+        self._send_json(status, payload, headers)
+
+    def do_POST(self):
+        if urllib.parse.urlsplit(self.path).path == "/__reset":
+            self.server.reset()
+            self._send_json(200, {"reset": True})
+        else:
+            self._send_json(404, {"message": "Not found"})
+
+
+class StubServer(ThreadingHTTPServer):
+    """The stub's HTTP server; keeps the call counters and per-key quota usage."""
+    daemon_threads = True
+    request_queue_size = 128 # The default backlog of 5 drops connects when a pool opens many at once
+
+    def __init__(self, address, config):
+        super().__init__(address, StubHandler)
+        self.config = config
+        self.latency = parse_latency(config.latency)
+        self._seed = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def rng(self):
+        """A generator per call, seeded from the server's, so threads don't share one."""
+        with self._lock:
+            return random.Random(self._seed.getrandbits(64))
+
+    def count(self, host, status):
+        with self._lock:
+            self._total += 1
+            self._by_host[host] = self._by_host.get(host, 0) + 1
+            self._by_status[str(status)] = self._by_status.get(str(status), 0) + 1
+
+    def use_quota(self, host, key):
+        """Counts a call against a key's quota on a host; returns the calls used so far."""
+        with self._lock:
+            used = self._quota_used.get((host, key), 0) + 1
+            self._quota_used[(host, key)] = used
+            return used
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self._total, "by_host": dict(self._by_host), "by_status": dict(self._by_status)}
+
+    def reset(self):
+        with self._lock:
+            self._total = 0
+            self._by_host = {}
+            self._by_status = {}
+            self._quota_used = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_in_thread(self):
+        """Serves in a daemon thread; returns the base URL to use as SCRAPER_UPSTREAM_OVERRIDE."""
+        threading.Thread(target=self.serve_forever, name="stub-server", daemon=True).start()
+        return self.url
+
+
+def add_config_arguments(parser):
+    """Adds the StubConfig options to an argparse parser (shared with bench/run.py)."""
+    parser.add_argument("--latency", default="lognormal:0.08:0.5",
+                        help="Delay per call: 0, fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA (default: %(default)s)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of calls answered with a 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Share of calls answered with a 500/502/503")
+    parser.add_argument("--unauthorized-key", action="append", default=[], help="API key answered with a 401 (repeatable)")
+    parser.add_argument("--quota", type=int, default=0, help="Calls per key and host before 429s (0: unlimited)")
+    parser.add_argument("--payload-bytes", type=int, default=2048, help="Approximate size of each response")
+    parser.add_argument("--page-size", type=int, default=50, help="Posts per hashtag page")
+    parser.add_argument("--hashtag-pages", type=int, default=3, help="Pages per hashtag")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for repeatable delays and failures")
+
+
+def config_from_arguments(args):
+    return StubConfig(
+        latency=args.latency, rate_429=args.rate_429, rate_5xx=args.rate_5xx, unauthorized_keys=args.unauthorized_key,
+        quota=args.quota, payload_bytes=args.payload_bytes, page_size=args.page_size, hashtag_pages=args.hashtag_pages,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the RapidAPI hosts used by the scrapers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_arguments(args)
+    parse_latency(config.latency) # Fail on a bad spec before binding the port
+    server = StubServer((args.host, args.port), config)
+    print(f"Stub RapidAPI server listening on {server.url}; set SCRAPER_UPSTREAM_OVERRIDE={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# gunicorn.conf.py
+import os
+import gc
+
+# Load the app once in the master, before forking. With SCRAPER_PRELOAD set, app.py also imports
+# every platform and langdetect's profiles there, so workers boot instantly and share those pages
+# copy-on-write. Set GUNICORN_PRELOAD_APP=0 to have each worker load the app itself instead.
+preload_app = os.getenv("GUNICORN_PRELOAD_APP", "1") != "0"
+if preload_app:
+    os.environ.setdefault("SCRAPER_PRELOAD", "1")
+
+# Every worker publishes its metrics here so /metrics can report totals for all of them
+os.environ.setdefault("SCRAPER_METRICS_DIR", os.path.join("instance", "metrics"))
+
+
+def on_starting(server):
+    # Snapshots left by a previous run would otherwise be added to this run's totals
+    from scrapers import metrics
+    metrics.clear_published()
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the GC's reach; otherwise the first collection in
+    # each worker touches (and so copies) every preloaded object
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Threads don't survive fork(), so background job workers start in each worker process
+    from scrapers.jobs import get_job_queue
+    get_job_queue().ensure_workers()
+    from scrapers import metrics
+    metrics.ensure_publisher()
+
+
+def worker_exit(server, worker):
+    # Publish the final counts, so requests served since the last publish still add up
+    from scrapers import metrics
+    metrics.publish()
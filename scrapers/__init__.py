@@ -1,14 +1,71 @@
 # scrapers/__init__.py
+import importlib
+
+# Dispatch table of platforms: info type -> (module, fetch function). Each module declares its
+# PlatformAdapter as ADAPTER (see adapters.py). Modules are only imported the first time they are used, so a worker that serves one platform
+# never pays for the others (or for langdetect's profiles if it never detects a language).
+SCRAPERS = {
+    "instagram_post": ("fetch_instagram_post_info", "fetch_instagram_post_info"),
+    "instagram_profile": ("fetch_instagram_profile_info", "fetch_instagram_profile_info"),
+    "instagram_hashtag": ("fetch_instagram_hashtag_media", "fetch_instagram_hashtag_media"),
+    "tiktok_post": ("fetch_tiktok_post_info", "fetch_tiktok_post_info"),
+    "tiktok_profile": ("fetch_tiktok_profile_info", "fetch_tiktok_profile_info"),
+    "youtube_post": ("fetch_youtube_post_info", "fetch_youtube_post_info"),
+    "youtube_profile": ("fetch_youtube_profile_info", "fetch_youtube_profile_info"),
+    "snapchat_profile": ("fetch_snapchat_profile_info", "fetch_snapchat_profile_info"),
+}
+
+# Info types whose fetch function can return only what earlier fetches haven't (incremental=True)
+INCREMENTAL_INFO_TYPES = frozenset({"instagram_hashtag"})
+
+_FUNCTION_MODULES = {function_name: module_name for module_name, function_name in SCRAPERS.values()}
+
+
+def _load_module(module_name, function_name):
+    module = importlib.import_module(f".{module_name}", __name__)
+    # Importing a submodule binds its name on the package; point it back at the fetch function
+    # so `scrapers.fetch_x` keeps meaning the function, as it did with eager imports
+    globals()[function_name] = getattr(module, function_name)
+    return module
+
+
+def load_scraper(info_type):
+    """
+    Returns (fetch function, PlatformAdapter) for an info type, importing its module on first use.
+    Raises KeyError for an unknown info type.
+    """
+    module_name, function_name = SCRAPERS[info_type]
+    module = _load_module(module_name, function_name)
+    return getattr(module, function_name), module.ADAPTER
+
+
+def __getattr__(name):
+    # Resolves `from scrapers import fetch_x` / `scrapers.fetch_x` lazily
+    module_name = _FUNCTION_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    _load_module(module_name, name)
+    return globals()[name]
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+def preload():
+    """
+    Imports every platform and warms the heavy dependencies: langdetect's language profiles
+    and the RapidAPI key scheduler (which also surfaces missing keys at boot instead of on
+    the first request). Meant to run in the gunicorn master with preload_app, so forked
+    workers share the loaded pages copy-on-write.
+    """
+    for info_type in SCRAPERS:
+        load_scraper(info_type)
+    from .language import warm_up
+    warm_up()
+    from .api_key_manager import get_key_manager
+    get_key_manager()
 
-# Import and re-export each individual fetch function from its own file
-from .fetch_instagram_post_info import fetch_instagram_post_info
-from .fetch_instagram_profile_info import fetch_instagram_profile_info
-from .fetch_instagram_hashtag_media import fetch_instagram_hashtag_media
-from .fetch_tiktok_post_info import fetch_tiktok_post_info
-from .fetch_tiktok_profile_info import fetch_tiktok_profile_info
-from .fetch_youtube_post_info import fetch_youtube_post_info
-from .fetch_youtube_profile_info import fetch_youtube_profile_info
-from .fetch_snapchat_profile_info import fetch_snapchat_profile_info
 
 # Optional: Define __all__ for explicit 'from scrapers import *' behavior
 # This specifies what symbols are imported when `from scrapers import *` is used.
@@ -21,4 +78,4 @@ __all__ = [
     'fetch_youtube_post_info',
     'fetch_youtube_profile_info',
     'fetch_snapchat_profile_info'
-]
\ No newline at end of file
+]
@@ -0,0 +1,354 @@
+# scrapers/__main__.py
+# Command-line batch runner. Fetches the identifiers of a file (or stdin), one per line, through the
+# same fetcher as /api/fetch-info (key rotation, caches, retries and per-host limits included) and
+# streams the records to NDJSON or CSV as they complete:
+#
+#     python -m scrapers tiktok_profile usernames.txt -o profiles.ndjson
+#     cat urls.txt | python -m scrapers youtube_post - -o videos.csv
+#     python -m scrapers instagram_hashtag tags.txt --incremental -o new_posts.ndjson
+#
+# A run writing to a file keeps a checkpoint next to it (<output>.checkpoint). Running the same
+# command again after an interruption (Ctrl-C, SIGTERM, a crash) skips the identifiers whose records
+# are already in the output and carries on; the checkpoint is removed once the input is finished.
+# Memory stays flat however long the input is: lines are only read as workers free up.
+import os
+import io
+import csv
+import sys
+import json
+import time
+import signal
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from . import SCRAPERS, INCREMENTAL_INFO_TYPES
+from .export import get_columns, csv_row, ndjson_line
+
+OUTPUT_FORMATS = ("ndjson", "csv")
+CHECKPOINT_INTERVAL = 5.0 # Seconds between checkpoints (one is also written on exit)
+PROGRESS_INTERVAL = 10.0 # Seconds between progress lines on stderr
+IN_FLIGHT_PER_WORKER = 4 # Identifiers queued per worker thread, so workers never wait on the input
+
+
+class CheckpointError(Exception):
+    """Raised when the output a checkpoint describes is missing or was changed since."""
+
+
+def load_checkpoint(path):
+    """Returns the checkpoint saved at 'path', or None when there is none."""
+    try:
+        with open(path, encoding="utf-8") as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, state):
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as checkpoint_file:
+        json.dump(state, checkpoint_file)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path) # Atomic: an interrupted save leaves the previous checkpoint
+
+
+class _InterruptGuard:
+    """
+    SIGINT/SIGTERM handler that raises KeyboardInterrupt, except while a finished identifier's
+    records are being written and marked done: an interrupt then waits until that is over, so a
+    checkpoint never counts a half-written record or misses one that is fully written.
+    """
+    def __init__(self):
+        self.deferring = False
+        self.pending = False
+
+    def handle(self, signum, frame):
+        if self.deferring:
+            self.pending = True
+            return
+        raise KeyboardInterrupt
+
+    @contextlib.contextmanager
+    def deferred(self):
+        self.deferring = True
+        try:
+            yield
+        finally:
+            self.deferring = False
+        if self.pending:
+            self.pending = False
+            raise KeyboardInterrupt
+
+
+_interrupts = _InterruptGuard()
+
+
+class BatchRun:
+    """
+    One pass over an input stream. Line numbers (from 0) identify the identifiers; blank lines
+    and lines starting with '#' are skipped. Records are written in completion order, each with
+    the "Requested Identifier" it came from.
+
+    A checkpoint holds 'resume_from', the first line whose records may not be written yet,
+    'done', the lines after it whose records are, and 'output_bytes', the size of the output at
+    that moment. Resuming cuts the output back to that size, so records written after the last
+    checkpoint are fetched again rather than appearing twice.
+    """
+    def __init__(self, info_type, output, output_format, workers, checkpoint_path=None, checkpoint=None, incremental=False):
+        self.info_type = info_type
+        self.incremental = incremental # Only posts earlier incremental fetches haven't returned (hashtags)
+        self.output = output # Binary file object
+        self.output_format = output_format
+        self.workers = workers
+        self.checkpoint_path = checkpoint_path
+        self.columns = get_columns(info_type)
+
+        self.resumed = checkpoint is not None
+        checkpoint = checkpoint or {}
+        self.resume_from = checkpoint.get("resume_from", 0)
+        self.done = set(checkpoint.get("done", ())) # Finished lines at or after resume_from
+        self.identifiers = checkpoint.get("identifiers", 0) # Totals include earlier, resumed runs
+        self.records = checkpoint.get("records", 0)
+        self.failed = checkpoint.get("failed", 0)
+        self.output_bytes = checkpoint.get("output_bytes", 0) # Size of the complete records written so far
+        self.lines_read = 0
+        self.in_flight = {} # future -> (line number, identifier)
+        self._checkpoint_state = {}
+
+    def run(self, lines, checkpoint_state=None):
+        """
+        Fetches every identifier in 'lines' (an iterable of text lines). 'checkpoint_state' is
+        saved along with the progress. On KeyboardInterrupt, saves a checkpoint and re-raises.
+        """
+        # Imported on use: importing the fetcher can print notes, which must not land in records sent to stdout
+        from .batch import fetch_identifier
+
+        self._checkpoint_state = checkpoint_state or {}
+        if self.output_format == "csv" and not self.resumed:
+            self._write_text(self._csv_text([self.columns]))
+
+        started = time.monotonic()
+        identifiers_at_start = self.identifiers
+        next_checkpoint = started + CHECKPOINT_INTERVAL
+        next_progress = started + PROGRESS_INTERVAL
+        window = self.workers * IN_FLIGHT_PER_WORKER
+        numbered_lines = enumerate(lines)
+        input_finished = False
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scraper-cli")
+        try:
+            while True:
+                while not input_finished and len(self.in_flight) < window:
+                    line_number, line = next(numbered_lines, (None, None))
+                    if line_number is None:
+                        input_finished = True
+                        break
+                    self.lines_read = line_number + 1
+                    identifier = line.strip()
+                    if line_number < self.resume_from or line_number in self.done:
+                        continue # Already in the output
+                    if not identifier or identifier.startswith("#"):
+                        continue
+                    future = executor.submit(fetch_identifier, self.info_type, identifier, incremental=self.incremental)
+                    self.in_flight[future] = (line_number, identifier)
+
+                if not self.in_flight:
+                    break
+                finished, _ = wait(self.in_flight, timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    line_number, identifier = self.in_flight[future]
+                    records, failed = future.result()
+                    # Written and flushed before the line counts as done; both happen or neither does
+                    with _interrupts.deferred():
+                        self._write_records(identifier, records)
+                        del self.in_flight[future]
+                        self.done.add(line_number)
+                        self.identifiers += 1
+                        self.records += len(records)
+                        self.failed += failed
+
+                now = time.monotonic()
+                if self.checkpoint_path and now >= next_checkpoint:
+                    self.save()
+                    next_checkpoint = now + CHECKPOINT_INTERVAL
+                if now >= next_progress:
+                    rate = (self.identifiers - identifiers_at_start) / (now - started)
+                    self._log(f"{self.identifiers} identifiers done ({self.failed} failed), {rate:.1f}/s, line {self.lines_read}")
+                    next_progress = now + PROGRESS_INTERVAL
+        except KeyboardInterrupt:
+            # Nothing of the identifiers still in flight has been written; they stay unfinished
+            if self.checkpoint_path:
+                self.save()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+        self.output.flush()
+
+        elapsed = time.monotonic() - started
+        rate = (self.identifiers - identifiers_at_start) / elapsed if elapsed else 0.0
+        self._log(f"Finished: {self.identifiers} identifiers ({self.failed} failed), {self.records} records, {rate:.1f}/s")
+
+    def save(self):
+        """Flushes the output and writes a checkpoint of everything written so far."""
+        self.output.flush()
+        os.fsync(self.output.fileno())
+        if self.in_flight:
+            first_unfinished = min(line_number for line_number, _ in self.in_flight.values())
+        else:
+            first_unfinished = self.lines_read
+        # Never back: a resumed run interrupted while still skipping hasn't read up to resume_from yet
+        self.resume_from = max(self.resume_from, first_unfinished)
+        # Only lines past the first unfinished one need remembering, so 'done' stays bounded by the window
+        self.done = {line_number for line_number in self.done if line_number >= self.resume_from}
+        save_checkpoint(self.checkpoint_path, dict(
+            self._checkpoint_state,
+            resume_from=self.resume_from,
+            done=sorted(self.done),
+            output_bytes=self.output_bytes,
+            identifiers=self.identifiers,
+            records=self.records,
+            failed=self.failed,
+            updated_at=time.time(),
+        ))
+
+    def _write_records(self, identifier, records):
+        rows = []
+        for record in records:
+            row = dict(record) # A copy: the records may be held by the result cache
+            row.setdefault("Requested Identifier", identifier)
+            rows.append(row)
+        if self.output_format == "csv":
+            self._write_text(self._csv_text(csv_row(row, self.columns) for row in rows))
+        else:
+            self._write_text("".join(ndjson_line(row, self.columns) for row in rows))
+
+    def _csv_text(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def _write_text(self, text):
+        data = text.encode("utf-8")
+        self.output.write(data)
+        self.output.flush()
+        self.output_bytes += len(data)
+
+    def _log(self, message):
+        print(f"[{self.info_type}] {message}", file=sys.stderr, flush=True)
+
+
+def _open_output(path, checkpoint):
+    """Opens the output for a fresh run, or for resuming from 'checkpoint' (cut back to its size)."""
+    if checkpoint is None:
+        return open(path, "wb")
+    try:
+        output = open(path, "r+b")
+    except FileNotFoundError:
+        raise CheckpointError(f"The output {path} of the checkpoint is missing.")
+    size = output.seek(0, os.SEEK_END)
+    if size < checkpoint["output_bytes"]:
+        output.close()
+        raise CheckpointError(f"{path} is shorter than when the checkpoint was saved; it was changed since.")
+    output.truncate(checkpoint["output_bytes"])
+    output.seek(checkpoint["output_bytes"])
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m scrapers",
+        description="Fetch identifiers read from a file or stdin, one per line, and stream the records as NDJSON or CSV.",
+        epilog="Upstream calls per host are still capped by BATCH_PER_HOST_CONCURRENCY and each API key's rate; "
+               "the other SCRAPER_* and RAPIDAPI_* settings apply as they do for the app.",
+    )
+    parser.add_argument("info_type", choices=sorted(SCRAPERS), help="What the identifiers are")
+    parser.add_argument("input", nargs="?", default="-", help="File of identifiers, one per line ('-' or omitted: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="File to write the records to ('-' or omitted: stdout)")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS,
+                        help="Output format (default: from the output's extension, else ndjson)")
+    parser.add_argument("-w", "--workers", type=int,
+                        help="Identifiers fetched concurrently (default: BATCH_PLATFORM_MAX_WORKERS)")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"Only fetch posts earlier incremental runs haven't ({', '.join(sorted(INCREMENTAL_INFO_TYPES))})")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint; needs an output file)")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Don't keep a checkpoint")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    args = parser.parse_args()
+
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1.")
+    if args.incremental and args.info_type not in INCREMENTAL_INFO_TYPES:
+        parser.error(f"--incremental is only supported for {', '.join(sorted(INCREMENTAL_INFO_TYPES))}.")
+    output_format = args.format
+    if output_format is None:
+        output_format = "csv" if args.output.lower().endswith(".csv") else "ndjson"
+
+    checkpoint_path = None
+    if not args.no_checkpoint and args.output != "-":
+        checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+    elif args.checkpoint:
+        parser.error("--checkpoint needs an output file; records sent to stdout can't be resumed.")
+
+    # Compared against a checkpoint before resuming from it
+    run_state = {
+        "info_type": args.info_type,
+        "input": args.input if args.input == "-" else os.path.abspath(args.input),
+        "format": output_format,
+        "incremental": args.incremental,
+    }
+    checkpoint = None
+    if checkpoint_path and not args.restart:
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint is not None:
+            mismatched = [name for name, value in run_state.items() if checkpoint.get(name) != value]
+            if mismatched:
+                parser.error(f"{checkpoint_path} is from a different run ({', '.join(mismatched)} differ). "
+                             "Use --restart to start over, or --checkpoint to keep both.")
+
+    if args.input == "-":
+        lines = sys.stdin
+    else:
+        try:
+            lines = open(args.input, encoding="utf-8", errors="replace")
+        except OSError as e:
+            parser.error(f"Can't read {args.input}: {e.strerror}.")
+
+    if args.output == "-":
+        output = sys.stdout.buffer
+        # The scrapers print warnings; keep them out of the records
+        sys.stdout = sys.stderr
+    else:
+        try:
+            output = _open_output(args.output, checkpoint)
+        except CheckpointError as e:
+            parser.error(f"{e} Use --restart to start over.")
+    if checkpoint is not None:
+        print(f"Note: Resuming from {checkpoint_path}: {checkpoint['identifiers']} identifiers already done, "
+              f"continuing at line {checkpoint['resume_from'] + 1}.", file=sys.stderr)
+
+    # Checkpoint on a plain `kill` too; both wait for a record being written to finish
+    signal.signal(signal.SIGINT, _interrupts.handle)
+    signal.signal(signal.SIGTERM, _interrupts.handle)
+
+    from .batch import PLATFORM_MAX_WORKERS
+    workers = args.workers or PLATFORM_MAX_WORKERS
+    batch_run = BatchRun(args.info_type, output, output_format, workers, checkpoint_path, checkpoint, args.incremental)
+    try:
+        batch_run.run(lines, run_state)
+    except KeyboardInterrupt:
+        if checkpoint_path:
+            print(f"Interrupted. Progress is saved in {checkpoint_path}; run the same command again to resume.", file=sys.stderr)
+        return 130
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+        if args.output != "-":
+            output.close()
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path) # The run is complete; the next one starts over
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
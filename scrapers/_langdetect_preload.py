@@ -0,0 +1,8 @@
+# scrapers/_langdetect_preload.py
+"""
+Preloaded by the language detection pool's fork server: loading langdetect's profiles there
+once means every pool process forked from it starts with them already in (shared) memory.
+"""
+from .language import _load_langdetect
+
+_load_langdetect()
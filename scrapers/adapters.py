@@ -0,0 +1,407 @@
+# scrapers/adapters.py
+import json
+import math
+import threading
+import urllib.parse
+import http.client
+from contextlib import contextmanager
+
+from .extract import compile_path, compile_field # Field mappings compiled once into getters
+from .api_key_manager import rapidapi_key_manager
+from . import http_pool # Shared keep-alive connections per host
+from .identifiers import parse_identifier, IdentifierError # Shared URL/username parsing
+from .language import detect_languages # Memoized, pooled language detection
+from .retry import DEFAULT_RETRY_POLICY, is_retryable_status # Backoff, timeouts and deadlines
+from .circuit_breaker import get_breaker # Fail fast while a host is down
+from . import tracing # Spans around each step, for hooks and debug timings
+from . import fixtures # Recorded fixtures are labelled with the identifier they were fetched for
+from .snapshots import record_snapshot # Metric history of profiles and posts
+
+# Response fields some APIs use to say a key isn't subscribed or is wrong, even with a 200
+_AUTH_ERROR_MARKERS = ("not subscribed", "invalid api key")
+
+
+class DetectLanguage:
+    """
+    Field spec for the detected language of the text at 'path'. The engine classifies every
+    such text in a response in one batch instead of one record at a time.
+    """
+    def __init__(self, path):
+        self.path = path
+
+
+class FromInput:
+    """
+    Field spec for a value taken from the requested identifier rather than the response:
+    function(parsed, identifier) returns it, or None when the input doesn't hold it, and then
+    'fallback' (a path or callable, like any other field) reads it from the response.
+    Spellings of one identifier share a fetch (batch de-duplication, the result cache), so
+    these fields are recomputed for each spelling by PlatformAdapter.for_identifier().
+    """
+    def __init__(self, function, fallback=None):
+        self.function = function
+        self.fallback = fallback
+
+
+def _compile_from_input(spec):
+    fallback = compile_field(spec.fallback) if spec.fallback is not None else None
+
+    def extract(source, parsed, identifier):
+        value = spec.function(parsed, identifier)
+        if value is not None:
+            return str(value)
+        return fallback(source, parsed, identifier) if fallback is not None else "N/A"
+    return extract
+
+
+class PlatformAdapter:
+    """
+    Declarative description of one platform endpoint; the request lifecycle (key rotation,
+    pooled HTTP, JSON decoding, error mapping) is run for every platform by fetch().
+
+    - info_type: the /api/fetch-info type; also picks the identifier parser
+    - host / endpoint: RapidAPI host and path template, formatted with the URL-encoded parsed
+      'id' (a dict of templates selects one by the parsed identifier's kind)
+    - required: paths of which at least one must be present for a response to hold data
+    - data_path: where the fields are read from in the response (the whole response if None)
+    - items_path: for list endpoints, the path of the items; one record is built per item
+    - fields: output column -> a path under the data root, a DetectLanguage or FromInput spec,
+      or a callable (data, parsed, identifier) for computed values
+    - api_name / label: used in error messages ("TikTok API Error 404: ...")
+    - error_fields: response keys carrying the API's own error message
+    - retry_policy: attempts, backoff, socket timeouts and deadline (retry.DEFAULT_RETRY_POLICY if None)
+    """
+    def __init__(self, info_type, host, endpoint, fields, api_name, label, required=(), data_path=None,
+                 items_path=None, error_fields=("message", "error"), retry_policy=None):
+        self.info_type = info_type
+        self.host = host
+        self.endpoint = endpoint
+        self.fields = fields
+        self.api_name = api_name
+        self.label = label
+        self.required = required
+        self.data_path = data_path
+        self.items_path = items_path
+        self.error_fields = error_fields
+        self.retry_policy = retry_policy or DEFAULT_RETRY_POLICY
+
+        # Compile the mapping once: every path is split a single time, not on each record
+        self._data_root = compile_path(data_path) if data_path else None
+        self._items = compile_path(items_path) if items_path is not None else None
+        self._required = [compile_path(path) for path in required]
+        self._extractors = [] # (column, extract(source, parsed, identifier) or None, language text getter or None)
+        self._input_fields = [] # (column, FromInput spec)
+        self.columns = list(fields) # Record field order, also the export's column order
+        for column, spec in fields.items():
+            if isinstance(spec, DetectLanguage):
+                self._extractors.append((column, None, compile_path(spec.path)))
+            elif isinstance(spec, FromInput):
+                self._extractors.append((column, _compile_from_input(spec), None))
+                self._input_fields.append((column, spec))
+            else:
+                self._extractors.append((column, compile_field(spec), None))
+
+    def build_endpoint(self, parsed):
+        template = self.endpoint[parsed.kind] if isinstance(self.endpoint, dict) else self.endpoint
+        return template.format(id=urllib.parse.quote(parsed.id, safe=''))
+
+    def api_error_message(self, response_json):
+        """Returns the API's own error message from a response, or '' if it has none."""
+        if not isinstance(response_json, dict):
+            return ""
+        for field in self.error_fields:
+            message = response_json.get(field)
+            if message:
+                return message
+        return ""
+
+    def error_body_message(self, res):
+        """
+        Returns the API's error message from a non-200 answer, whose body may be JSON, an HTML
+        error page or empty; falls back to the HTTP reason phrase.
+        """
+        try:
+            message = self.api_error_message(json.loads(res.data))
+        except ValueError:
+            message = ""
+        return message or res.reason or "no error details"
+
+    def has_data(self, response_json):
+        if not self._required:
+            return True
+        for get in self._required:
+            value = get(response_json)
+            if value and value != "N/A":
+                return True
+        return False
+
+    def _root(self, response_json):
+        return self._data_root(response_json, {}) if self._data_root else response_json
+
+    def items(self, response_json):
+        """Returns the items of a list endpoint's response (an empty list if it has none)."""
+        items = self._items(self._root(response_json), [])
+        return items if isinstance(items, list) else []
+
+    def build_records(self, response_json, parsed, identifier):
+        """
+        Maps a successful response to output records: one per item for list endpoints,
+        otherwise a single record.
+        """
+        if self.items_path is not None:
+            return self.records_for(self.items(response_json), parsed, identifier)
+        return self.records_for([self._root(response_json)], parsed, identifier)
+
+    def records_for(self, sources, parsed, identifier):
+        """
+        Builds one record per source dict (an item, or the data root) in a single pass over
+        the compiled extractors. Language fields are detected for all of them in one batch
+        at the end.
+        """
+        extractors = self._extractors
+        records = []
+        pending_languages = [] # (record, column, text)
+        for source in sources:
+            record = {}
+            for column, extract, language_text in extractors:
+                if extract is None:
+                    record[column] = None # Filled in below, keeping the column order
+                    pending_languages.append((record, column, language_text(source)))
+                else:
+                    record[column] = extract(source, parsed, identifier)
+            records.append(record)
+
+        if pending_languages:
+            languages = detect_languages([text for _, _, text in pending_languages])
+            for (record, column, _), language in zip(pending_languages, languages):
+                record[column] = language
+        return records
+
+    def for_identifier(self, result, identifier):
+        """
+        Returns 'result' (a record, a list of them, or an error dict) fetched for another
+        spelling of 'identifier', with its FromInput fields recomputed for this one. Records
+        are updated in place, so callers pass their own copies.
+        """
+        if not self._input_fields or not result or (isinstance(result, dict) and result.get("error")):
+            return result
+        try:
+            parsed = parse_identifier(self.info_type, identifier)
+        except IdentifierError:
+            return result
+        for record in (result if isinstance(result, list) else [result]):
+            for column, spec in self._input_fields:
+                value = spec.function(parsed, identifier)
+                if value is not None: # Otherwise it came from the response, the same for every spelling
+                    record[column] = str(value)
+        return result
+
+    def _timed_out(self, identifier, deadline, last_error):
+        print(f"Timed out fetching {self.label} for {identifier}; giving up.")
+        error_message = f"Timed out fetching {self.label} for {identifier} within the {deadline.seconds:g}s deadline."
+        if last_error:
+            error_message += f" Last error: {last_error}."
+        return {"error": error_message}
+
+    def _circuit_open(self, breaker):
+        retry_in = breaker.retry_in()
+        print(f"Circuit open for {self.host}; not calling {self.api_name}.")
+        if retry_in > 0:
+            return {"error": f"{self.api_name} is unavailable after repeated failures; not calling it for another {math.ceil(retry_in)}s."}
+        # Half-open, with every probe slot taken by a call that hasn't finished yet
+        return {"error": f"{self.api_name} is unavailable after repeated failures; a probe request is checking whether it has recovered."}
+
+    def parse(self, identifier):
+        """Returns (parsed identifier, None), or (None, {"error": ...}) if it can't be parsed."""
+        try:
+            return parse_identifier(self.info_type, identifier), None
+        except IdentifierError as e:
+            print(f"Error: {e}. Skipping.")
+            return None, {"error": str(e)}
+
+    def fetch(self, identifier):
+        """
+        Runs the request lifecycle for one identifier: parse it, call the API (see request())
+        and map the response. Returns a record dict (a list of them for list endpoints) or
+        {"error": ...}.
+        """
+        parsed, error = self.parse(identifier)
+        if error is not None:
+            return error
+        response_json, error = self.request(parsed, identifier)
+        if error is not None:
+            return error
+
+        with tracing.span("records.build"):
+            records = self.build_records(response_json, parsed, identifier)
+        if self.items_path is not None:
+            return records
+        # Only fresh results get here (cache hits don't), so each snapshot is a real observation
+        with tracing.span("snapshot.record"):
+            record_snapshot(self.info_type, parsed, records[0])
+        return records[0]
+
+    def request(self, parsed, identifier, params=None, deadline=None):
+        """
+        Calls the API for a parsed identifier; 'params' are extra query parameters (e.g. a
+        pagination cursor). 429s, 5xx answers and connection failures are retried after a
+        jittered, exponentially growing pause (on the next key when keys rotate); 401/403
+        disable the key and move straight on. Attempts and pauses together must fit in the
+        identifier's deadline (see retry.RetryPolicy), cut short by 'deadline' if given.
+        While the host's circuit breaker is open, fails fast without calling it.
+        Returns (response JSON, None) for a response holding data, or (None, {"error": ...}).
+        """
+        endpoint = self.build_endpoint(parsed)
+        if fixtures.FIXTURES_MODE == fixtures.RECORD:
+            fixtures.describe_call(self.info_type, identifier)
+        breaker = get_breaker(self.host)
+        if breaker.is_open():
+            return None, self._circuit_open(breaker)
+
+        policy = self.retry_policy
+        deadline = policy.start_deadline().earliest(deadline)
+        # At least one attempt per key, so every key has its turn before giving up
+        attempts = max(policy.max_attempts, rapidapi_key_manager.max_key_rotations)
+        retries = 0 # Pauses taken so far; each one roughly doubles the next
+        pause = False # Set by failures worth backing off from before the next attempt
+        last_error = None
+        for _ in range(attempts):
+            if pause:
+                retries += 1
+                with tracing.span("backoff", retry=retries):
+                    slept = policy.sleep(retries, deadline)
+                if not slept:
+                    return None, self._timed_out(identifier, deadline, last_error)
+                pause = False
+            if deadline.expired():
+                return None, self._timed_out(identifier, deadline, last_error)
+
+            with tracing.span("key.acquire", host=self.host):
+                api_key = rapidapi_key_manager.acquire_key(self.host, timeout=deadline.remaining())
+            if api_key is None:
+                if deadline.expired():
+                    return None, self._timed_out(identifier, deadline, last_error)
+                return None, {"error": "All RapidAPI keys exhausted, cooling down or invalid for this host."}
+            key_index = rapidapi_key_manager.key_index(api_key)
+            if not breaker.allow_request():
+                return None, self._circuit_open(breaker)
+            headers = rapidapi_key_manager.get_headers(self.host, api_key)
+            try:
+                with tracing.span("upstream.request", host=self.host, key=key_index) as attempt:
+                    try:
+                        res = http_pool.request(self.host, endpoint, headers=headers, params=params,
+                                                timeout=policy.timeouts(deadline))
+                    except (http.client.HTTPException, OSError):
+                        breaker.record_failure()
+                        raise
+                    attempt.set_attribute("status", res.status)
+                if res.status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success() # Any other answer means the host is up
+                quota_reported = rapidapi_key_manager.update_from_headers(self.host, api_key, res.headers) # Track quota left on this key
+                if is_retryable_status(res.status): # Rate limited or upstream trouble; the body may not be JSON
+                    if res.status == 429:
+                        print(f"Rate limit hit with key (index: {key_index}) for {self.api_name}. Trying another key...")
+                        rapidapi_key_manager.report_rate_limited(self.host, api_key)
+                    else:
+                        print(f"{self.api_name} Error {res.status} for {identifier}. Retrying after a pause...")
+                    last_error = f"{self.api_name} Error {res.status}"
+                    pause = True
+                    continue
+
+                # Classified by status first: error answers often carry an HTML page or no body at all
+                if res.status in (401, 403):
+                    print(f"Key (index: {key_index}) invalid or subscription issue for {self.api_name}. Trying another key...")
+                    rapidapi_key_manager.report_auth_failure(self.host, api_key)
+                    continue
+                if res.status != 200:
+                    error_message = self.error_body_message(res)
+                    if any(marker in str(error_message).lower() for marker in _AUTH_ERROR_MARKERS):
+                        print(f"Key (index: {key_index}) invalid or subscription issue for {self.api_name}. Trying another key...")
+                        rapidapi_key_manager.report_auth_failure(self.host, api_key)
+                        continue
+                    print(f"{self.api_name} Error {res.status}: {error_message}. Not a rate limit, returning error.")
+                    return None, {"error": f"{self.api_name} Error {res.status}: {error_message}"}
+
+                with tracing.span("json.decode", size=len(res.data)):
+                    response_json = json.loads(res.data) # Decoded straight from the bytes, no text copy
+                error_message = self.api_error_message(response_json)
+                if any(marker in str(error_message).lower() for marker in _AUTH_ERROR_MARKERS):
+                    print(f"Key (index: {key_index}) invalid or subscription issue for {self.api_name}. Trying another key...")
+                    rapidapi_key_manager.report_auth_failure(self.host, api_key)
+                    continue
+
+                if not self.has_data(response_json):
+                    error_message = error_message or "No valid data or specific error message from API."
+                    print(f"{self.api_name} returned no valid data for {identifier}: {error_message}")
+                    return None, {"error": f"{self.api_name} returned no valid data for {identifier}: {error_message}"}
+
+                rapidapi_key_manager.report_success(self.host, api_key, quota_reported)
+                return response_json, None
+
+            except (http.client.HTTPException, OSError) as e:
+                # Connection errors and timeouts (connect or read)
+                print(f"HTTP connection error for {identifier}: {e}. Retrying after a pause...")
+                last_error = f"connection error ({e or type(e).__name__})"
+                pause = True
+                continue
+            except ValueError as e:
+                # A 200 whose body isn't UTF-8 JSON
+                print(f"Error for {identifier}: Could not decode JSON response from {self.api_name}: {e}. Retrying after a pause...")
+                last_error = f"invalid JSON from {self.api_name}"
+                pause = True
+                continue
+
+        error_message = f"Failed to fetch {self.label} after trying all available API keys."
+        if last_error:
+            error_message += f" Last error: {last_error}."
+        return None, {"error": error_message}
+
+
+_listeners = threading.local()
+
+
+@contextmanager
+def record_listener(callback):
+    """
+    Has list endpoints fetched by this thread inside the block hand each record to
+    'callback(record)' as soon as it is built, ahead of the complete list they return, so
+    callers can forward a paginated fetch page by page.
+    """
+    previous = getattr(_listeners, "callback", None)
+    _listeners.callback = callback
+    try:
+        yield
+    finally:
+        _listeners.callback = previous
+
+
+def emit_record(record):
+    """Passes a freshly built record to the record_listener in scope on this thread, if any."""
+    callback = getattr(_listeners, "callback", None)
+    if callback is not None:
+        callback(record)
+
+
+# Dispatch table: info type -> adapter, filled in as each platform module is imported
+_ADAPTERS = {}
+
+
+def register_adapter(adapter):
+    """Adds a platform's adapter to the dispatch table and returns it."""
+    _ADAPTERS[adapter.info_type] = adapter
+    return adapter
+
+
+def get_adapter(info_type):
+    """
+    Returns the adapter for an info type, importing its platform module on first use.
+    Raises KeyError for an unknown info type.
+    """
+    adapter = _ADAPTERS.get(info_type)
+    if adapter is None:
+        from . import load_scraper
+        load_scraper(info_type)
+        adapter = _ADAPTERS[info_type]
+    return adapter
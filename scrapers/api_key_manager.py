@@ -1,10 +1,64 @@
 # scrapers/api_key_manager.py
 import os
+import time
+import threading
 from dotenv import load_dotenv
 
+from . import metrics
+
 load_dotenv()
 
-class RapidAPIKeyManager:
+# --- Configuration (Per-key scheduling, overridable from the environment) ---
+KEY_RATE_PER_SECOND = float(os.getenv("RAPIDAPI_KEY_RATE", "5")) # Token refill rate of each key, per host
+KEY_BURST = float(os.getenv("RAPIDAPI_KEY_BURST", "10")) # Token bucket capacity of each key, per host
+KEY_COOLDOWN_SECONDS = float(os.getenv("RAPIDAPI_KEY_COOLDOWN", "60")) # Rest period after a 429, or once a quota with no reported reset runs out
+KEY_WAIT_TIMEOUT = float(os.getenv("RAPIDAPI_KEY_WAIT_TIMEOUT", "5")) # Max seconds to wait for a usable key
+KEY_LOW_REMAINING = int(os.getenv("RAPIDAPI_KEY_LOW_REMAINING", "5")) # Quota left below which a key is used last
+
+# Quota headers RapidAPI attaches to every response
+REMAINING_HEADER = "x-ratelimit-requests-remaining"
+RESET_HEADER = "x-ratelimit-requests-reset" # Seconds until the quota window resets
+
+
+# Keys are identified by their position in the configured list, never by the key itself
+KEY_REQUESTS = metrics.counter(
+    "scraper_rapidapi_key_requests_total", "Requests each API key was handed out for, by host.", ("host", "key"))
+KEY_ROTATIONS = metrics.counter(
+    "scraper_rapidapi_key_rotations_total", "Keys taken out of rotation on a host, by reason.", ("host", "reason"))
+
+
+class KeyState:
+    """
+    Scheduling state of one API key on one host.
+    """
+    __slots__ = ("tokens", "last_refill", "cooldown_until", "disabled", "remaining", "reset_at", "last_used")
+
+    def __init__(self, now):
+        self.tokens = KEY_BURST
+        self.last_refill = now
+        self.cooldown_until = 0.0 # Monotonic time until which the key is resting after a 429
+        self.disabled = False # Set after a 401/403; the key is never used on this host again
+        self.remaining = None # Requests left in the current quota window, if known
+        self.reset_at = None # Monotonic time at which the quota window resets, if known
+        self.last_used = 0.0
+
+    def refill(self, now):
+        self.tokens = min(KEY_BURST, self.tokens + (now - self.last_refill) * KEY_RATE_PER_SECOND)
+        self.last_refill = now
+
+    def expire_quota(self, now):
+        """Forgets the known quota once its window has reset, which reactivates an exhausted key."""
+        if self.reset_at is not None and now >= self.reset_at:
+            self.remaining = None
+            self.reset_at = None
+
+
+class RapidAPIKeyScheduler:
+    """
+    Hands out RapidAPI keys per request. Every (host, key) pair has its own token bucket,
+    cooldown and disabled flag, so a 429 or 401 on one host only takes that key out of
+    rotation for that host and never changes the key other threads are using.
+    """
     def __init__(self):
         self.api_keys = []
         i = 1
@@ -23,33 +77,226 @@ class RapidAPIKeyManager:
             else:
                 raise ValueError("No RapidAPI keys found in environment variables (e.g., RAPIDAPI_KEY or RAPIDAPI_KEY_1, RAPIDAPI_KEY_2...)")
 
-        self.current_key_index = 0
+        # Number of attempts a scraper makes for one identifier: one per key
         self.max_key_rotations = len(self.api_keys)
+        self._key_indexes = {key: index for index, key in enumerate(self.api_keys)}
+        self._states = {} # (host, key) -> KeyState
+        self._lock = threading.Lock()
 
-    def get_current_key(self):
-        if not self.api_keys:
-            return None
-        return self.api_keys[self.current_key_index]
+    def _state(self, host, key, now):
+        state = self._states.get((host, key))
+        if state is None:
+            state = KeyState(now)
+            self._states[(host, key)] = state
+        return state
 
-    def rotate_key(self):
-        if not self.api_keys:
-            return False
+    def key_index(self, key):
+        """Returns the position of a key in the configured list, for log messages."""
+        return self._key_indexes.get(key, -1)
+
+    def _try_acquire(self, host, now):
+        """
+        Picks the healthiest key for host and consumes one token from it.
+        Returns (key, None) on success, or (None, wait_seconds) when every key is busy,
+        where wait_seconds is None if no key can become usable again.
+        """
+        best_key = None
+        best_score = None
+        next_ready = None
+        for key in self.api_keys:
+            state = self._state(host, key, now)
+            if state.disabled:
+                continue
+            state.expire_quota(now)
+            if state.remaining == 0:
+                if state.reset_at is None:
+                    # Quota spent but the API never said when it resets: rest the key for a fixed period
+                    state.reset_at = now + KEY_COOLDOWN_SECONDS
+                ready_in = state.reset_at - now
+            elif now < state.cooldown_until:
+                ready_in = state.cooldown_until - now
+            else:
+                state.refill(now)
+                if state.tokens >= 1:
+                    # Keys close to exhausting their quota go last, then most tokens,
+                    # then most quota left, then least recently used
+                    remaining = state.remaining if state.remaining is not None else float("inf")
+                    score = (remaining > KEY_LOW_REMAINING, state.tokens, remaining, -state.last_used)
+                    if best_score is None or score > best_score:
+                        best_key, best_score = key, score
+                    continue
+                ready_in = (1 - state.tokens) / KEY_RATE_PER_SECOND
+            if next_ready is None or ready_in < next_ready:
+                next_ready = ready_in
+
+        if best_key is None:
+            return None, next_ready
+        state = self._states[(host, best_key)]
+        state.tokens -= 1
+        state.last_used = now
+        return best_key, None
+
+    def acquire_key(self, host, timeout=None):
+        """
+        Returns the key to use for the next request to host, waiting up to KEY_WAIT_TIMEOUT
+        seconds (or 'timeout', if shorter) for a token or cooldown to free up.
+        Returns None if no key is usable in that time.
+        """
+        wait_limit = KEY_WAIT_TIMEOUT if timeout is None else min(KEY_WAIT_TIMEOUT, timeout)
+        deadline = time.monotonic() + wait_limit
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                key, wait_seconds = self._try_acquire(host, now)
+            if key is not None:
+                KEY_REQUESTS.labels(host, self.key_index(key)).inc()
+                return key
+            if wait_seconds is None or now + wait_seconds > deadline:
+                return None
+            time.sleep(wait_seconds)
 
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        print(f"Rotating to next RapidAPI key (index: {self.current_key_index}).")
+    def report_success(self, host, key, quota_reported=False):
+        """
+        Records a successful call. Unless its response reported the quota left ('quota_reported',
+        see update_from_headers), which already counts the call, decrements the known quota.
+        """
+        if quota_reported:
+            return
+        with self._lock:
+            state = self._state(host, key, time.monotonic())
+            if state.remaining is not None and state.remaining > 0:
+                state.remaining -= 1
 
-        if self.current_key_index == 0:
+    def update_from_headers(self, host, key, headers):
+        """
+        Records the quota RapidAPI reports in a response's rate-limit headers, so keys about
+        to run out are avoided before they start returning 429s and come back when their
+        window resets. Responses without the headers are ignored.
+        Returns True when the response reported the quota remaining.
+        """
+        if headers is None:
             return False
-        return True
+        remaining = _parse_header_number(headers.get(REMAINING_HEADER))
+        reset_seconds = _parse_header_number(headers.get(RESET_HEADER))
+        if remaining is None and reset_seconds is None:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(host, key, now)
+            if remaining is not None:
+                state.remaining = max(0, int(remaining))
+            if reset_seconds is not None:
+                state.reset_at = now + max(0.0, reset_seconds)
+        return remaining is not None
+
+    def report_rate_limited(self, host, key, retry_after=None):
+        """
+        Puts a key to rest on host after a 429: for retry_after seconds if given, until the
+        known quota reset if the headers reported one, otherwise for KEY_COOLDOWN_SECONDS.
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(host, key, now)
+            if retry_after is not None:
+                cooldown = retry_after
+            elif state.reset_at is not None and state.reset_at > now:
+                cooldown = state.reset_at - now
+            else:
+                cooldown = KEY_COOLDOWN_SECONDS
+            state.cooldown_until = max(state.cooldown_until, now + cooldown)
+        KEY_ROTATIONS.labels(host, "rate_limited").inc()
+        print(f"RapidAPI key (index: {self.key_index(key)}) cooling down for {cooldown:.0f}s on {host}.")
+
+    def report_auth_failure(self, host, key):
+        """Disables a key on host after a 401/403 or a 'not subscribed' answer."""
+        with self._lock:
+            self._state(host, key, time.monotonic()).disabled = True
+        KEY_ROTATIONS.labels(host, "auth_failure").inc()
+        print(f"RapidAPI key (index: {self.key_index(key)}) disabled for {host}.")
+
+    def key_states(self):
+        """
+        Returns [(host, key index, state, quota remaining or None)] for every key used so far,
+        where state is "active", "cooling_down", "exhausted" or "disabled".
+        """
+        states = []
+        with self._lock:
+            now = time.monotonic()
+            for (host, key), state in self._states.items():
+                if state.disabled:
+                    status = "disabled"
+                elif state.remaining == 0 and (state.reset_at is None or now < state.reset_at):
+                    status = "exhausted"
+                elif now < state.cooldown_until:
+                    status = "cooling_down"
+                else:
+                    status = "active"
+                states.append((host, self.key_index(key), status, state.remaining))
+        return states
 
-    # --- MODIFIED METHOD ---
-    def get_headers(self, host: str): # Add host parameter here
-        key = self.get_current_key()
+    def get_headers(self, host: str, key=None):
+        if key is None:
+            key = self.acquire_key(host)
         if not key:
             raise ValueError("No active RapidAPI key available.")
         return {
             "x-rapidapi-key": key,
-            "x-rapidapi-host": host # Use the passed host here
+            "x-rapidapi-host": host
         }
 
-rapidapi_key_manager = RapidAPIKeyManager()
\ No newline at end of file
+def _parse_header_number(value):
+    """Parses a numeric header value, returning None when it is missing or malformed."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class _LazyKeyScheduler:
+    """
+    Stands in for the shared scheduler and builds it on first use, so importing a scraper
+    doesn't read the environment (or fail when no keys are set) until a request needs a key.
+    """
+    def __init__(self):
+        self._scheduler = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._scheduler is None:
+            with self._lock:
+                if self._scheduler is None:
+                    self._scheduler = RapidAPIKeyScheduler()
+        return self._scheduler
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+rapidapi_key_manager = _LazyKeyScheduler()
+
+
+def get_key_manager():
+    """Returns the shared RapidAPIKeyScheduler, creating it from the environment on first use."""
+    return rapidapi_key_manager.get()
+
+
+def _key_states():
+    scheduler = rapidapi_key_manager._scheduler # Reported once built; reading metrics doesn't build it
+    return scheduler.key_states() if scheduler is not None else []
+
+
+def _collect_key_counts():
+    counts = {}
+    for host, _, status, _ in _key_states():
+        counts[(host, status)] = counts.get((host, status), 0) + 1
+    return list(counts.items())
+
+
+metrics.collected(
+    "scraper_rapidapi_keys", metrics.GAUGE, "API keys per host and state (active, cooling_down, exhausted, disabled).",
+    ("host", "state"), _collect_key_counts, mode=metrics.LIVEALL)
+metrics.collected(
+    "scraper_rapidapi_key_quota_remaining", metrics.GAUGE, "Requests left in each key's quota window, where the API reports it.",
+    ("host", "key"), lambda: [((host, index), remaining) for host, index, _, remaining in _key_states() if remaining is not None],
+    mode=metrics.LIVEALL)
@@ -0,0 +1,319 @@
+# scrapers/batch.py
+import os
+import queue
+import threading
+import collections
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from . import SCRAPERS, INCREMENTAL_INFO_TYPES, load_scraper # Lazy platform registry
+from .adapters import record_listener # Posts of paginated fetches, forwarded page by page
+from .identifiers import parse_many, IdentifierError
+from .retry import Deadline, deadline_scope
+from . import metrics
+from . import tracing
+
+# --- Configuration (Worker pool sizing, overridable from the environment) ---
+PLATFORM_MAX_WORKERS = int(os.getenv("BATCH_PLATFORM_MAX_WORKERS", "8")) # Worker threads of each platform's pool
+PER_HOST_CONCURRENCY = int(os.getenv("BATCH_PER_HOST_CONCURRENCY", "4"))
+
+IDENTIFIERS = metrics.counter(
+    "scraper_identifiers_total", "Identifiers fetched, by info type and outcome (success, failed).", ("info_type", "outcome"))
+
+_executors = {}
+_executors_lock = threading.Lock()
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+
+def _platform(info_type):
+    return info_type.split('_')[0]
+
+
+def _get_executor(info_type):
+    """
+    Returns the worker pool of an info type's platform, creating it on first use.
+    Each platform gets its own pool (a bulkhead), shared by all requests: the number of
+    upstream calls stays bounded, and a slow provider only backs up its own queue instead
+    of holding the threads other platforms need.
+    """
+    platform = _platform(info_type)
+    executor = _executors.get(platform)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(platform)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=PLATFORM_MAX_WORKERS, thread_name_prefix=f"scraper-{platform}")
+                _executors[platform] = executor
+    return executor
+
+
+class _FairSemaphore:
+    """
+    Semaphore that hands its slots out in arrival order. threading.Semaphore lets the thread
+    that just released a slot take it straight back for its next fetch, so with more workers
+    than slots the first waiters can starve for as long as the queue keeps the others busy.
+    """
+    def __init__(self, value):
+        self._value = value
+        self._waiters = collections.deque() # One locked lock per waiting thread, oldest first
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Takes a slot, waiting up to 'timeout' seconds (None: no limit). Returns False if none came free in time."""
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return True
+            waiter = threading.Lock()
+            waiter.acquire()
+            self._waiters.append(waiter)
+        # Until release() passes a slot on to this thread
+        if waiter.acquire(timeout=-1 if timeout is None else timeout):
+            return True
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                return True # release() handed this thread the slot just as the wait ran out
+        return False
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().release() # The slot goes straight to the oldest waiter
+            else:
+                self._value += 1
+
+
+def _get_host_semaphore(host):
+    """
+    Returns the semaphore limiting concurrent calls to a single upstream host.
+    """
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = _FairSemaphore(PER_HOST_CONCURRENCY)
+            _host_semaphores[host] = semaphore
+        return semaphore
+
+
+def build_error_record(info_type, identifier, error_message):
+    """
+    Builds the per-item "Failed" record returned in place of data for an identifier.
+    """
+    return {
+        "Requested Identifier": identifier,
+        "Status": "Failed",
+        "Error Details": error_message,
+        "Platform": _platform(info_type).capitalize() # Get platform name
+    }
+
+
+def fetch_identifier(info_type, identifier, deadline=None, debug=False, incremental=False):
+    """
+    Fetches a single identifier and normalizes the outcome.
+    Returns a tuple (records, failed): 'records' is the list of rows to add to the response
+    (posts for a hashtag, one profile/post dict, or one "Failed" record) and 'failed'
+    tells whether an error record was produced. A 'deadline' (retry.Deadline) cuts the
+    fetch's own retry deadline short, e.g. to a request's overall time budget.
+    With 'debug', every record gets a "_debug" entry: the fetch's elapsed time, upstream
+    attempts and time per step (see tracing.TimingRecorder.summary). With 'incremental'
+    (INCREMENTAL_INFO_TYPES only), just the posts earlier incremental fetches haven't
+    returned are fetched, uncached; no new posts is an empty, successful outcome.
+    """
+    # Unknown types come from user input; one label for all of them keeps the series bounded
+    label = info_type if info_type in SCRAPERS else "invalid"
+    if not debug:
+        with tracing.span("fetch", info_type=label):
+            records, failed = _fetch_identifier(info_type, identifier, deadline, incremental)
+    else:
+        with tracing.record_timings() as recorder:
+            with tracing.span("fetch", info_type=label) as fetch_span:
+                records, failed = _fetch_identifier(info_type, identifier, deadline, incremental)
+        debug_info = dict(recorder.summary(), elapsed_ms=round(fetch_span.duration * 1000, 2))
+        # Copies: the records may be the very dicts held by the result cache
+        records = [dict(record, _debug=debug_info) for record in records]
+    IDENTIFIERS.labels(label, "failed" if failed else "success").inc()
+    return records, failed
+
+
+def _fetch_identifier(info_type, identifier, deadline, incremental=False):
+    if info_type not in SCRAPERS:
+        return [build_error_record(info_type, identifier, "Invalid info type provided.")], True
+    if incremental and info_type not in INCREMENTAL_INFO_TYPES:
+        return [build_error_record(info_type, identifier, f"Incremental fetches are not supported for {info_type}.")], True
+
+    error_message = None
+    try:
+        # The platform's module is imported the first time it is used
+        fetch_function, adapter = load_scraper(info_type)
+        # Info types sharing a host share its concurrency limit
+        host_semaphore = _get_host_semaphore(adapter.host)
+        with tracing.span("host.wait", host=adapter.host):
+            # Bounded by the deadline, so a fetch queued behind a slow host frees its worker when the budget runs out
+            acquired = host_semaphore.acquire(timeout=deadline.remaining() if deadline else None)
+        if not acquired:
+            error_message = f"The request's time budget of {deadline.seconds:g}s ran out while waiting for a free slot on {adapter.host}."
+            return [build_error_record(info_type, identifier, error_message)], True
+        try:
+            with deadline_scope(deadline):
+                result = fetch_function(identifier, incremental=True) if incremental else fetch_function(identifier)
+        finally:
+            host_semaphore.release()
+
+        if adapter.items_path is not None:
+            # List endpoints (e.g. Instagram Hashtag Media) return a LIST of posts.
+            if result and isinstance(result, list):
+                return result, False
+            elif incremental and result == []:
+                return [], False # Nothing new since the previous incremental fetch
+            elif result and isinstance(result, dict) and result.get("error"):
+                error_message = result["error"]
+            else:
+                error_message = "No data or unexpected format from Instagram Hashtag Media API."
+        elif result and isinstance(result, dict) and not result.get("error"):
+            return [result], False
+        elif result and isinstance(result, dict) and result.get("error"):
+            error_message = result["error"]
+        else:
+            return [], False
+    except Exception as e:
+        traceback.print_exc() # Print full traceback to console for debugging
+        error_message = f"An unexpected server error occurred for identifier '{identifier}': {str(e)}"
+
+    return [build_error_record(info_type, identifier, error_message)], True
+
+
+def _fan_out(info_type, identifier, outcome):
+    """
+    Copies a shared (records, failed) outcome for one position of the batch. Failure records
+    are rebuilt so they name the identifier exactly as it was requested there, and fields
+    taken from the input (e.g. a post URL as it was given) are recomputed for it.
+    """
+    records, failed = outcome
+    if failed:
+        return [build_error_record(info_type, identifier, records[0]["Error Details"])], True
+    records = [dict(record) for record in records]
+    if records:
+        _, adapter = load_scraper(info_type) # Already imported by the fetch that produced the records
+        adapter.for_identifier(records, identifier)
+    return records, False
+
+
+def _plan_batch(info_type, identifiers):
+    """
+    Parses the whole batch up front. Returns (keys, first_identifier_for_key, outcomes):
+    the de-duplication key of every position, the identifier to fetch for each distinct
+    key, and the ready-made "Failed" outcomes of malformed identifiers.
+    """
+    keys = []
+    first_identifier_for_key = {}
+    outcomes = {}
+    for position, (identifier, parsed) in enumerate(zip(identifiers, parse_many(info_type, identifiers))):
+        if isinstance(parsed, IdentifierError):
+            key = ("invalid", position)
+            outcomes[key] = ([build_error_record(info_type, identifier, str(parsed))], True)
+        else:
+            key = (info_type, parsed.kind, parsed.canonical_id)
+            first_identifier_for_key.setdefault(key, identifier)
+        keys.append(key)
+    return keys, first_identifier_for_key, outcomes
+
+
+def fetch_batch(info_type, identifiers, time_budget=None, debug=False, incremental=False):
+    """
+    Fetches all identifiers concurrently through the shared worker pool.
+    The whole batch is parsed up front: malformed identifiers get their "Failed" record
+    without being dispatched, and identifiers that canonicalize to the same key are
+    fetched once with the result fanned back out to every position they appeared in.
+    With a 'time_budget' (seconds), whatever hasn't finished when it runs out gets a
+    "Failed" record instead of holding up the rest. 'debug' and 'incremental' are passed on
+    to fetch_identifier.
+    Returns a list of (records, failed) tuples in the same order as 'identifiers'.
+    """
+    keys, first_identifier_for_key, outcomes = _plan_batch(info_type, identifiers)
+    deadline = Deadline(time_budget) if time_budget else None
+
+    if len(first_identifier_for_key) == 1:
+        # No point paying for a thread hand-off for a single identifier
+        key, identifier = next(iter(first_identifier_for_key.items()))
+        outcomes[key] = fetch_identifier(info_type, identifier, deadline, debug, incremental)
+    elif first_identifier_for_key:
+        executor = _get_executor(info_type)
+        futures = {
+            key: executor.submit(fetch_identifier, info_type, identifier, deadline, debug, incremental)
+            for key, identifier in first_identifier_for_key.items()
+        }
+        done, _ = wait(futures.values(), timeout=deadline.remaining() if deadline else None)
+        for key, future in futures.items():
+            if future in done:
+                outcomes[key] = future.result()
+            else:
+                # Fetches already running give up at the same deadline; queued ones never start
+                future.cancel()
+                error_message = f"The request's time budget of {time_budget:g}s ran out before this identifier was fetched."
+                outcomes[key] = ([build_error_record(info_type, first_identifier_for_key[key], error_message)], True)
+
+    return [_fan_out(info_type, identifier, outcomes[key]) for identifier, key in zip(identifiers, keys)]
+
+
+def _fetch_streaming(info_type, identifier, key, events, incremental):
+    """Runs fetch_identifier, putting (key, record, None) on 'events' for every record a list endpoint emits early."""
+    with record_listener(lambda record: events.put((key, record, None))):
+        return fetch_identifier(info_type, identifier, incremental=incremental)
+
+
+def iter_batch(info_type, identifiers, incremental=False):
+    """
+    Streaming counterpart of fetch_batch: yields (position, records, failed, finished) as
+    soon as records are ready, so callers can forward results without waiting for the
+    slowest identifier. Most identifiers are yielded once, finished; a paginated fetch
+    (hashtag media) is yielded post by post as its pages arrive, then once more, finished,
+    with whatever hadn't been yielded yet (e.g. a whole cached list, or its error record).
+    Malformed identifiers are yielded first; duplicates are yielded together as their shared
+    fetch progresses. Order follows completion, not input. 'incremental' is passed on to
+    fetch_identifier.
+    """
+    keys, first_identifier_for_key, outcomes = _plan_batch(info_type, identifiers)
+
+    positions_for_key = {}
+    for position, key in enumerate(keys):
+        positions_for_key.setdefault(key, []).append(position)
+
+    for key, outcome in outcomes.items():
+        for position in positions_for_key[key]:
+            yield (position,) + _fan_out(info_type, identifiers[position], outcome) + (True,)
+
+    if not first_identifier_for_key:
+        return
+
+    executor = _get_executor(info_type)
+    # (key, early record, None) while a fetch runs, then (key, None, its future) once it is done;
+    # a fetch's records are always queued before its completion
+    events = queue.Queue()
+    futures = {}
+    for key, identifier in first_identifier_for_key.items():
+        future = executor.submit(_fetch_streaming, info_type, identifier, key, events, incremental)
+        futures[future] = key
+        future.add_done_callback(lambda future, key=key: events.put((key, None, future)))
+    emitted = {key: 0 for key in first_identifier_for_key} # Records already yielded per key
+    try:
+        unfinished = len(futures)
+        while unfinished:
+            key, record, future = events.get()
+            if future is None:
+                emitted[key] += 1
+                for position in positions_for_key[key]:
+                    yield (position,) + _fan_out(info_type, identifiers[position], ([record], False)) + (False,)
+                continue
+            unfinished -= 1
+            records, failed = future.result()
+            if not failed:
+                records = records[emitted[key]:] # The list's first records were yielded as they arrived
+            for position in positions_for_key[key]:
+                yield (position,) + _fan_out(info_type, identifiers[position], (records, failed)) + (True,)
+    finally:
+        # The client went away mid-stream; don't keep fetching results nobody will read
+        for future in futures:
+            future.cancel()
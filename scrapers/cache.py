@@ -0,0 +1,279 @@
+# scrapers/cache.py
+import os
+import json
+import time
+import sqlite3
+import threading
+import functools
+from collections import OrderedDict
+
+from .sqlite_cache import get_shared_store
+from .singleflight import SingleFlight, WaitTimeout
+from .retry import current_deadline
+from .identifiers import parse_identifier, IdentifierError
+from . import metrics
+
+# --- Configuration (Cache sizing and lifetimes, overridable from the environment) ---
+CACHE_ENABLED = os.getenv("SCRAPER_CACHE_ENABLED", "1") != "0"
+CACHE_MAX_ENTRIES = int(os.getenv("SCRAPER_CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("SCRAPER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DEFAULT_TTL_SECONDS = float(os.getenv("SCRAPER_CACHE_TTL", "900"))
+
+# Default lifetime of a cached result per info type. Profiles change slowly, hashtag feeds quickly.
+# Each value can be overridden with SCRAPER_CACHE_TTL_<INFO_TYPE>, e.g. SCRAPER_CACHE_TTL_INSTAGRAM_PROFILE=3600.
+PLATFORM_TTLS = {
+    "instagram_post": 900,
+    "instagram_profile": 3600,
+    "instagram_hashtag": 300,
+    "tiktok_post": 900,
+    "tiktok_profile": 3600,
+    "youtube_post": 900,
+    "youtube_profile": 3600,
+    "snapchat_profile": 3600,
+}
+
+
+def get_ttl(info_type):
+    """Returns the cache lifetime in seconds for an info type."""
+    override = os.getenv(f"SCRAPER_CACHE_TTL_{info_type.upper()}")
+    if override is not None:
+        return float(override)
+    return float(PLATFORM_TTLS.get(info_type, DEFAULT_TTL_SECONDS))
+
+
+def canonical_identifier(identifier):
+    """
+    Normalizes a raw identifier the identifier parser couldn't make sense of,
+    so trivially different spellings still share a cache entry.
+    """
+    return identifier.strip().rstrip("/")
+
+
+def _copy_value(value):
+    """
+    Returns a copy of a cached result so callers can't mutate the cached entry.
+    Results are flat dicts or lists of flat dicts, so one level deep is enough.
+    """
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return [dict(item) if isinstance(item, dict) else item for item in value]
+    return value
+
+
+def _estimate_size(value):
+    """Approximates the memory held by a result by its JSON-encoded length."""
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str))
+    except (TypeError, ValueError):
+        return 1024
+
+
+class ResponseCache:
+    """
+    Thread-safe in-memory result cache with per-entry TTL and LRU eviction,
+    bounded both by number of entries and by approximate total size in bytes.
+    """
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> (expires_at, size, value)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns a copy of the cached value for key, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._total_bytes -= size
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _copy_value(value)
+
+    def set(self, key, value, ttl):
+        """Stores value under key for ttl seconds, evicting least recently used entries if needed."""
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        value = _copy_value(value)
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self._total_bytes -= old_entry[1]
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._total_bytes += size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        """Returns hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
+
+
+response_cache = ResponseCache()
+
+# Concurrent misses for the same key share one upstream fetch
+inflight_fetches = SingleFlight()
+
+
+def _collect_cache_lookups():
+    samples = [(("memory", "hit"), response_cache.hits), (("memory", "miss"), response_cache.misses)]
+    shared_store = get_shared_store()
+    if shared_store is not None:
+        samples += [(("shared", "hit"), shared_store.hits), (("shared", "miss"), shared_store.misses)]
+    return samples
+
+
+# Read from the caches' own counters when metrics are scraped
+metrics.collected(
+    "scraper_cache_lookups_total", metrics.COUNTER, "Result cache lookups by layer (memory, shared) and result (hit, miss).",
+    ("layer", "result"), _collect_cache_lookups)
+metrics.collected(
+    "scraper_cache_evictions_total", metrics.COUNTER, "Entries evicted from the in-memory result cache to stay within its limits.",
+    (), lambda: [((), response_cache.evictions)])
+metrics.collected(
+    "scraper_cache_entries", metrics.GAUGE, "Entries held in the in-memory result caches.",
+    (), lambda: [((), len(response_cache._entries))])
+metrics.collected(
+    "scraper_cache_bytes", metrics.GAUGE, "Approximate size of the in-memory result caches.",
+    (), lambda: [((), response_cache._total_bytes)])
+metrics.collected(
+    "scraper_fetches_in_flight", metrics.GAUGE, "Distinct identifiers being fetched upstream right now.",
+    (), lambda: [((), inflight_fetches.in_flight())])
+metrics.collected(
+    "scraper_fetches_shared_total", metrics.COUNTER, "Callers served by a fetch another caller already had in flight.",
+    (), lambda: [((), inflight_fetches.shared)])
+
+
+def _is_cacheable(result):
+    """Only successful results are cached; errors are always retried."""
+    if isinstance(result, dict):
+        return bool(result) and not result.get("error")
+    if isinstance(result, list):
+        return bool(result)
+    return False
+
+
+def cache_key(info_type, identifier):
+    """
+    Returns the key under which results for an identifier are cached and de-duplicated:
+    (info_type, kind, canonical id) from the identifier parser, so a URL and the bare
+    username or ID it points to share one entry.
+    """
+    if not isinstance(identifier, str):
+        return (info_type, identifier)
+    try:
+        parsed = parse_identifier(info_type, identifier)
+    except IdentifierError:
+        return (info_type, "raw", canonical_identifier(identifier))
+    return (info_type, parsed.kind, parsed.canonical_id)
+
+
+def _for_identifier(info_type, result, identifier):
+    """
+    Recomputes the fields a result takes from its identifier (see adapters.FromInput) for the
+    spelling this caller asked for: an entry is shared by every spelling of one identifier.
+    """
+    from .adapters import get_adapter # The platform module is imported by now: it is the one calling
+    try:
+        adapter = get_adapter(info_type)
+    except KeyError:
+        return result
+    return adapter.for_identifier(result, identifier)
+
+
+def cached(info_type):
+    """
+    Decorator for scraper functions taking a single identifier. Results are cached under
+    (info_type, canonical identifier), so a hit skips both the API call and any post-processing.
+    Lookups go to the in-process cache first, then to the shared SQLite store if one is configured;
+    a failing shared store counts as a miss, and a failed write to it is skipped.
+    On a miss, concurrent calls for the same key wait for a single upstream fetch, each for no
+    longer than the deadline in scope (see retry.deadline_scope).
+    Results fetched for another spelling get their input-derived fields redone for this one.
+    Calls passing options (e.g. incremental=True) go straight to the scraper, uncached: their
+    result depends on more than the identifier.
+    """
+    def decorator(fetch_function):
+        @functools.wraps(fetch_function)
+        def wrapper(identifier, **options):
+            if not isinstance(identifier, str) or options:
+                return fetch_function(identifier, **options)
+
+            def copy_for_caller(result):
+                return _for_identifier(info_type, _copy_value(result), identifier)
+
+            def shared_fetch(fetch):
+                # Waiting on another caller's fetch ends at this caller's own deadline, not that fetch's
+                deadline = current_deadline()
+                try:
+                    return inflight_fetches.do(key, fetch, copy_result=copy_for_caller,
+                                               timeout=deadline.remaining() if deadline else None)
+                except WaitTimeout:
+                    return {"error": f"Timed out waiting for another request's fetch of {identifier} within the {deadline.seconds:g}s deadline."}
+
+            key = cache_key(info_type, identifier)
+            if not CACHE_ENABLED:
+                return shared_fetch(lambda: fetch_function(identifier))
+
+            result = response_cache.get(key)
+            if result is not None:
+                return _for_identifier(info_type, result, identifier)
+
+            shared_store = get_shared_store()
+            shared_key = ":".join(key)
+            if shared_store is not None:
+                try:
+                    shared_entry = shared_store.get(shared_key)
+                except sqlite3.Error as e:
+                    # The shared store is an extra layer; when it fails (locked, full, damaged) fetch as on a miss
+                    print(f"Warning: SQLite cache lookup failed: {e}")
+                    shared_entry = None
+                if shared_entry is not None:
+                    result, expires_at = shared_entry
+                    response_cache.set(key, result, max(0.0, expires_at - time.time()))
+                    return _for_identifier(info_type, result, identifier)
+
+            def fetch_and_store():
+                result = fetch_function(identifier)
+                # Stored before the in-flight entry is released, so later callers hit the cache
+                if _is_cacheable(result):
+                    ttl = get_ttl(info_type)
+                    response_cache.set(key, result, ttl)
+                    if shared_store is not None:
+                        try:
+                            shared_store.set(shared_key, result, ttl)
+                        except sqlite3.Error as e:
+                            print(f"Warning: SQLite cache write failed: {e}") # The fetched result is still returned
+                return result
+
+            return shared_fetch(fetch_and_store)
+        return wrapper
+    return decorator
@@ -0,0 +1,143 @@
+# scrapers/circuit_breaker.py
+import os
+import time
+import threading
+from collections import deque
+
+from . import metrics
+
+# --- Configuration (Per-host circuit breakers, overridable from the environment) ---
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20")) # Recent calls per host the failure rate is measured over
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10")) # Calls in the window before the breaker may open
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5")) # Share of failed calls that opens the breaker
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30")) # Time an open breaker fails fast before probing
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1")) # Trial calls let through while half-open
+
+CLOSED = "closed" # Calls go through; outcomes are tracked
+OPEN = "open" # Calls fail fast without touching the host
+HALF_OPEN = "half_open" # A few trial calls decide whether to close again
+
+BREAKER_OPENS = metrics.counter(
+    "scraper_circuit_breaker_opens_total", "Times a host's circuit breaker opened.", ("host",))
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of recent calls to one upstream host. Once at least
+    BREAKER_FAILURE_RATE of the last BREAKER_WINDOW calls failed, the breaker opens and
+    callers fail fast instead of spending keys, retries and worker threads on a host that
+    is down. After BREAKER_OPEN_SECONDS it half-opens: a few probe calls are let through,
+    and the first outcome closes it again or re-opens it for another period.
+
+    Only failures of the host itself count (5xx answers, connection errors, timeouts);
+    any other answer, 4xx included, means the host is up.
+    """
+    def __init__(self, host, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS, failure_rate=BREAKER_FAILURE_RATE,
+                 open_seconds=BREAKER_OPEN_SECONDS, half_open_probes=BREAKER_HALF_OPEN_PROBES):
+        self.host = host
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window) # True for each failed call, oldest first
+        self._opened_at = 0.0
+        self._probes = 0 # Probe calls let through since half-opening
+        self._probes_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def _update(self, now):
+        """Moves an open breaker to half-open once its open period is over. Call with the lock held."""
+        if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+            self._probes = 0
+        elif self.state == HALF_OPEN and self._probes and now - self._probes_started_at >= self.open_seconds:
+            # A probe never reported back; let another one through
+            self._probes = 0
+
+    def _open(self, now):
+        self.state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        BREAKER_OPENS.labels(self.host).inc()
+        print(f"Circuit breaker for {self.host} opened; failing fast for {self.open_seconds:.0f}s.")
+
+    def retry_in(self):
+        """Returns the seconds until an open breaker lets a probe through (0 unless open)."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def is_open(self):
+        """True while calls must fail fast. Doesn't use up a half-open probe."""
+        with self._lock:
+            self._update(time.monotonic())
+            return self.state == OPEN
+
+    def allow_request(self):
+        """
+        Returns True if a call may go to the host now. Half-open breakers let through up to
+        'half_open_probes' calls; every allowed call must then report record_success() or
+        record_failure().
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._update(now)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes < self.half_open_probes:
+                if not self._probes:
+                    self._probes_started_at = now
+                self._probes += 1
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self._outcomes.clear()
+                print(f"Circuit breaker for {self.host} closed; the host is answering again.")
+            elif self.state == CLOSED:
+                self._outcomes.append(False)
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self._open(now)
+            elif self.state == CLOSED:
+                self._outcomes.append(True)
+                calls = len(self._outcomes)
+                if calls >= self.min_calls and sum(self._outcomes) / calls >= self.failure_rate:
+                    self._open(now)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(host):
+    """Returns the circuit breaker of a host, creating it on first use."""
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(host)
+                _breakers[host] = breaker
+    return breaker
+
+
+def _collect_states():
+    samples = []
+    for breaker in list(_breakers.values()):
+        breaker.is_open() # Brings an expired open state up to date
+        samples.extend(((breaker.host, state), 1 if breaker.state == state else 0) for state in (CLOSED, OPEN, HALF_OPEN))
+    return samples
+
+
+metrics.collected(
+    "scraper_circuit_breaker_state", metrics.GAUGE, "1 for the current state of each host's circuit breaker.",
+    ("host", "state"), _collect_states, mode=metrics.LIVEALL)
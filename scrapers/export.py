@@ -0,0 +1,171 @@
+# scrapers/export.py
+import io
+import csv
+import json
+import importlib.util
+
+# Fields of the "Failed" records that stand in for identifiers that couldn't be fetched
+ERROR_COLUMNS = ["Requested Identifier", "Status", "Error Details", "Platform"]
+
+EXPORT_FORMATS = {
+    # format: (mimetype, file extension)
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"), # Only offered when pyarrow is installed
+}
+
+# pyarrow is an optional dependency (pip install pyarrow); it is only looked up here, not imported
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Rows buffered before a chunk is handed to the client (CSV) or written as a row group (Parquet)
+CSV_ROWS_PER_CHUNK = 500
+PARQUET_ROWS_PER_GROUP = 10000
+
+
+class ExportError(ValueError):
+    """Raised when an export can't be produced (unknown format, missing optional library)."""
+
+
+def available_formats():
+    """Returns the export formats this installation can produce, in EXPORT_FORMATS order."""
+    return [name for name in EXPORT_FORMATS if name != "parquet" or PARQUET_AVAILABLE]
+
+
+def get_columns(info_type):
+    """
+    Returns the export column order for an info type: the fields its adapter declares, in
+    order, then the error fields. Keeping it fixed means exports of the same info type always
+    line up, whatever rows they hold. Unknown info types only get the error fields.
+    """
+    from .adapters import get_adapter # Imported on use: loads the platform's module on first export
+    try:
+        columns = list(get_adapter(info_type).columns)
+    except KeyError:
+        columns = []
+    columns.extend(column for column in ERROR_COLUMNS if column not in columns)
+    return columns
+
+
+def _cell(value):
+    """Flattens a record value into the text stored in a CSV or Parquet cell."""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False) # Stringify objects/arrays
+    return str(value)
+
+
+def csv_row(record, columns):
+    """Returns the CSV cells of one record: 'columns' in order, empty for fields it doesn't have."""
+    return [_cell(record.get(column)) for column in columns]
+
+
+def ndjson_line(record, columns):
+    """
+    Returns one record as a JSON line. Known columns come first in their export order;
+    any other fields the record carries are kept after them.
+    """
+    ordered = {column: record[column] for column in columns if column in record}
+    ordered.update(record)
+    return json.dumps(ordered, ensure_ascii=False, default=str) + "\n"
+
+
+def iter_csv(records, columns):
+    """
+    Yields a CSV document chunk by chunk. Only 'columns' are written, in that order;
+    fields a record doesn't have are left empty.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows_in_buffer = 0
+    for record in records:
+        writer.writerow(csv_row(record, columns))
+        rows_in_buffer += 1
+        if rows_in_buffer >= CSV_ROWS_PER_CHUNK:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows_in_buffer = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_ndjson(records, columns):
+    """Yields one JSON object per line (see ndjson_line)."""
+    for record in records:
+        yield ndjson_line(record, columns)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that collects what Parquet writes until it is drained."""
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _iter_parquet(records, columns, pa, pq):
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        group = []
+        for record in records:
+            group.append(record)
+            if len(group) >= PARQUET_ROWS_PER_GROUP:
+                writer.write_table(_parquet_table(group, columns, schema, pa))
+                group = []
+                yield sink.drain()
+        if group:
+            writer.write_table(_parquet_table(group, columns, schema, pa))
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _parquet_table(records, columns, schema, pa):
+    # Missing fields are nulls; everything else is stored as text, like the CSV export
+    arrays = {
+        column: [None if record.get(column) is None else _cell(record[column]) for record in records]
+        for column in columns
+    }
+    return pa.Table.from_pydict(arrays, schema=schema)
+
+
+def export_records(records, info_type, export_format):
+    """
+    Returns (generator, mimetype, file extension) for exporting 'records' of an info type.
+    'records' may be any iterable and is consumed lazily, so memory stays bounded by one
+    chunk (or one Parquet row group) however large the export is.
+    Raises ExportError for a format that isn't in available_formats() (e.g. Parquet without pyarrow).
+    """
+    formats = available_formats()
+    if export_format not in formats:
+        raise ExportError(f"Unsupported export format '{export_format}'. Use one of: {', '.join(formats)}.")
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    columns = get_columns(info_type)
+
+    if export_format == "csv":
+        return iter_csv(records, columns), mimetype, extension
+    if export_format == "ndjson":
+        return iter_ndjson(records, columns), mimetype, extension
+
+    # pyarrow is optional; it is only needed for Parquet exports (an install that fails to import ends up here)
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export requires the 'pyarrow' library (pip install pyarrow).")
+    return _iter_parquet(records, columns, pa, pq), mimetype, extension
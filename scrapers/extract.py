@@ -0,0 +1,61 @@
+# scrapers/extract.py
+import functools
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_path(path):
+    """
+    Compiles a dot-separated path ("user.username") into a getter, get(data, default="N/A"),
+    with the semantics of utils.safe_get: default when a key is missing, holds None, or an
+    intermediate value isn't a dict. The path is split once here instead of on every lookup,
+    and the common one- and two-key paths get unrolled getters. Compiled getters are cached.
+    """
+    keys = tuple(path.split("."))
+
+    if len(keys) == 1:
+        (key,) = keys
+
+        def get(data, default="N/A"):
+            if isinstance(data, dict):
+                value = data.get(key)
+                if value is not None:
+                    return value
+            return default
+
+    elif len(keys) == 2:
+        first, second = keys
+
+        def get(data, default="N/A"):
+            if isinstance(data, dict):
+                value = data.get(first)
+                if isinstance(value, dict):
+                    value = value.get(second)
+                    if value is not None:
+                        return value
+            return default
+
+    else:
+        def get(data, default="N/A"):
+            value = data
+            for key in keys:
+                if not isinstance(value, dict):
+                    return default
+                value = value.get(key)
+                if value is None:
+                    return default
+            return value
+
+    get.path = path
+    return get
+
+
+def compile_field(spec):
+    """
+    Compiles one field spec of a platform's mapping into extract(source, parsed, identifier),
+    which returns the field's text: a path is read from the source with a compiled getter,
+    a callable is called as is.
+    """
+    if callable(spec):
+        return lambda source, parsed, identifier: str(spec(source, parsed, identifier))
+    get = compile_path(spec)
+    return lambda source, parsed, identifier: str(get(source))
@@ -1,12 +1,12 @@
-import http.client
-import urllib.parse
-import json
-from datetime import datetime # For formatting timestamps
-from tabulate import tabulate # For pretty printing tables
-from langdetect import detect, DetectorFactory # Import language detection library
+import os
 
-# Set seed for langdetect to ensure consistent results (optional but good for reproducibility)
-DetectorFactory.seed = 0
+from .utils import format_timestamp
+from .adapters import PlatformAdapter, DetectLanguage, register_adapter, emit_record # Shared request lifecycle for every platform
+from .cache import cached # Per-identifier result cache
+from .retry import Deadline # Time limit of a pagination run
+from .hashtag_state import get_hashtag_state # High-water marks for incremental polls
+from .extract import compile_path # Precompiled getters for the per-post fields
+from . import tracing # Spans around each step, for hooks and debug timings
 
 # Note: If you encounter an error like "ModuleNotFoundError: No module named 'tabulate'"
 # or "ModuleNotFoundError: No module named 'langdetect'",
@@ -14,122 +14,186 @@ DetectorFactory.seed = 0
 # pip install tabulate langdetect
 
 # --- Configuration ---
-# Instagram API
-RAPIDAPI_KEY = "06e813f846mshd0abac9d8ccb0e0p17d5e9jsn610b6a71b016" # Your RapidAPI key for Instagram
+# Instagram API (keys come from the shared RapidAPI key manager)
 RAPIDAPI_HOST = "instagram-social-api.p.rapidapi.com"
+PAGINATION_PARAM = "pagination_token" # Query parameter asking for the page after a token
+PAGINATION_PATH = "pagination_token" # Where a response carries the next page's token
+HASHTAG_MAX_ITEMS = int(os.getenv("HASHTAG_MAX_ITEMS", "100")) # Posts collected per fetch_instagram_hashtag_media call
+HASHTAG_TIME_LIMIT = float(os.getenv("HASHTAG_TIME_LIMIT", "15")) # Seconds spent paginating per call (0 for no limit)
 
-headers = {
-    "x-rapidapi-key": RAPIDAPI_KEY,
-    "x-rapidapi-host": RAPIDAPI_HOST
-}
+# Hundreds of posts per page go through these, so their paths are compiled once.
+# Empty values ("", 0, []) are shown as "N/A", as this endpoint always has.
+_username = compile_path("user.username")
+_full_name = compile_path("user.full_name")
+_caption = compile_path("caption.text")
+_caption_hashtags = compile_path("caption.hashtags")
+_next_cursor = compile_path(PAGINATION_PATH)
 
-def safe_get(data, path, default="N/A"):
-    """
-    Safely retrieves a nested value from a dictionary using a dot-separated path.
-    Returns default if any key in the path is not found or if an intermediate value
-    is not a dictionary.
-    """
-    keys = path.split(".")
-    value = data
-    for key in keys:
-        if isinstance(value, dict):
-            value = value.get(key, {})
-        else:
-            return default # Path segment not a dict, cannot go further
-    return value if value else default # Return actual value or default if empty/None
 
-def format_timestamp(ts, include_time=False):
-    """
-    Formats a Unix timestamp into a readable datetime string (date only by default).
-    Handles 'N/A' or invalid timestamps gracefully.
-    If include_time is True, returns date and time.
-    """
-    if ts == "N/A" or not ts:
-        return "N/A"
+def _caption_text(item, parsed, identifier):
+    caption_text_val = _caption(item) or "N/A"
+    return (caption_text_val[:70] + '...') if len(caption_text_val) > 70 and caption_text_val != "N/A" else caption_text_val
+
+
+def _hashtags(item, parsed, identifier):
+    return ", ".join(_caption_hashtags(item, None) or []) or "N/A"
+
+
+def _video_views(item, parsed, identifier):
+    return (item.get("ig_play_count") or "N/A") if item.get("is_video", False) else "N/A"
+
+
+def _created_at(item, parsed, identifier):
+    return format_timestamp(item.get("taken_at", "0"), include_time=False)
+
+
+def _instagram_url(item, parsed, identifier):
+    return f"https://www.instagram.com/p/{item.get('code', '')}/" if item.get('code') else "N/A"
+
+
+ADAPTER = register_adapter(PlatformAdapter(
+    info_type="instagram_hashtag",
+    host=RAPIDAPI_HOST,
+    endpoint="/v1/hashtag?hashtag={id}", # The parser drops a leading '#'
+    api_name="Instagram API",
+    label="Instagram hashtag media",
+    items_path="data.items", # One record per post on the page
+    fields={
+        "Username": lambda item, parsed, identifier: _username(item) or "N/A",
+        "Full Name": lambda item, parsed, identifier: _full_name(item) or "N/A",
+        "Caption Text": _caption_text,
+        "Hashtags": _hashtags,
+        "Is Video": lambda item, parsed, identifier: item.get("is_video", False),
+        "Likes": lambda item, parsed, identifier: item.get("like_count", "N/A"),
+        "Comments": lambda item, parsed, identifier: item.get("comment_count", "N/A"),
+        "Video Views": _video_views,
+        "Created At": _created_at,
+        "Instagram URL": _instagram_url,
+        "Caption Language": DetectLanguage("caption.text"), # Classified for the whole page in one batch
+    },
+))
+
+
+def _taken_at(item):
     try:
-        ts_int = int(ts)
-        # Convert Unix timestamp (seconds) to UTC datetime string
-        if include_time:
-            return datetime.utcfromtimestamp(ts_int).strftime('%Y-%m-%d %H:%M:%S UTC')
-        else:
-            return datetime.utcfromtimestamp(ts_int).strftime('%Y-%m-%d')
-    except Exception:
-        return "Invalid timestamp"
+        return int(item.get("taken_at"))
+    except (TypeError, ValueError):
+        return None
 
-def fetch_instagram_hashtag_media(hashtag): # Renamed function
+
+def iter_instagram_hashtag_media(hashtags, max_items=HASHTAG_MAX_ITEMS, time_limit=HASHTAG_TIME_LIMIT, seen_codes=None,
+                                 incremental=False):
+    """
+    Generator over the posts of one hashtag or a list of them, following the API's pagination
+    cursor. Each page's posts are normalized and yielded as soon as the page arrives; posts
+    whose shortcode was already yielded (on an earlier page or for another hashtag, or is in
+    'seen_codes') are skipped. Stops after 'max_items' posts in total or 'time_limit' seconds
+    (0 or None for no limit).
+
+    With incremental=True, only posts earlier polls haven't emitted are yielded, and a
+    hashtag's pagination stops at the first page that reaches known content: a post older
+    than the hashtag's high-water mark or one already seen (the feed is newest first).
+    What each page emitted is saved to the hashtag state store once the page has been
+    consumed (a page abandoned half-way is emitted again next time). Polls favor the
+    newest content: when one stops at max_items or time_limit, older posts it didn't
+    reach are not revisited later.
+
+    A hashtag whose first page can't be fetched yields one {"error": ..., "hashtag": ...} in
+    place of its posts; a failure on a later page only ends that hashtag's pagination.
+    """
+    if isinstance(hashtags, str):
+        hashtags = [hashtags]
+    seen_codes = set() if seen_codes is None else seen_codes
+    deadline = Deadline(time_limit) if time_limit else None
+    state = get_hashtag_state() if incremental else None
+    yielded = 0
+
+    for hashtag in hashtags:
+        parsed, error = ADAPTER.parse(hashtag)
+        if error is not None:
+            yield dict(error, hashtag=hashtag)
+            continue
+
+        high_water_mark, known_codes = None, set()
+        if state is not None:
+            high_water_mark, known_codes = state.get(parsed.canonical_id)
+        newest_taken_at = high_water_mark
+
+        cursor = None
+        while True:
+            params = {PAGINATION_PARAM: cursor} if cursor else None
+            response_json, error = ADAPTER.request(parsed, hashtag, params=params, deadline=deadline)
+            if error is not None:
+                if cursor is None:
+                    yield dict(error, hashtag=hashtag)
+                else:
+                    print(f"Stopped paginating #{parsed.id} after {yielded} posts: {error['error']}")
+                break
+
+            # De-duplicate on the raw items, so repeated posts don't cost a language detection
+            new_items = []
+            reached_known = False
+            for item in ADAPTER.items(response_json):
+                code = item.get("code")
+                taken_at = _taken_at(item)
+                if taken_at is not None and (newest_taken_at is None or taken_at > newest_taken_at):
+                    newest_taken_at = taken_at
+                if state is not None:
+                    older = high_water_mark is not None and taken_at is not None and taken_at <= high_water_mark
+                    if older or code in known_codes:
+                        reached_known = True
+                        # Codes are how posts are recognized; without one, age is all there is to go on
+                        if code in known_codes or (not code and older):
+                            continue
+                if code:
+                    if code in seen_codes:
+                        continue
+                    seen_codes.add(code)
+                new_items.append(item)
+                if max_items and yielded + len(new_items) >= max_items:
+                    break
+            with tracing.span("records.build"):
+                posts = ADAPTER.records_for(new_items, parsed, hashtag)
+            for post in posts:
+                yield post
+            yielded += len(new_items)
+            if state is not None:
+                state.record(parsed.canonical_id, [(item["code"], _taken_at(item)) for item in new_items if item.get("code")],
+                             newest_taken_at)
+
+            if max_items and yielded >= max_items:
+                return
+            if reached_known:
+                break # Everything from here on was emitted by an earlier poll
+            next_cursor = _next_cursor(response_json, None)
+            if not next_cursor or next_cursor == cursor:
+                break # Last page
+            if deadline is not None and deadline.expired():
+                return
+            cursor = next_cursor
+
+
+@cached("instagram_hashtag")
+def fetch_instagram_hashtag_media(hashtag, incremental=False): # Renamed function
     """
-    Fetches posts/media for a given Instagram hashtag using the RapidAPI endpoint.
+    Fetches posts/media for a given Instagram hashtag using the RapidAPI endpoint, following
+    pagination up to HASHTAG_MAX_ITEMS posts or HASHTAG_TIME_LIMIT seconds.
     Returns a list of dictionaries, each representing a post/media item with extracted details.
+    Posts are also passed to the caller's adapters.record_listener as their page arrives.
+
+    With incremental=True, for hashtags that are polled repeatedly, only posts that appeared
+    since the previous incremental fetch are returned (an empty list when there are none), and
+    pagination stops at the first page reaching known content. Such calls bypass the result
+    cache, since their result depends on what earlier polls have already returned.
     """
-    conn = http.client.HTTPSConnection(RAPIDAPI_HOST)
-    # Ensure hashtag is URL-encoded
-    encoded_hashtag = urllib.parse.quote(hashtag, safe='')
-    endpoint = f"/v1/hashtag?hashtag={encoded_hashtag}"
-    
-    collected_posts = []
-    try:
-        conn.request("GET", endpoint, headers=headers)
-        res = conn.getresponse()
-        data = res.read()
-
-        json_data = json.loads(data.decode("utf-8"))
-    except json.JSONDecodeError:
-        print(f"Error: Failed to decode JSON response for #{hashtag}.")
-        return []
-    finally:
-        conn.close()
-
-    items = json_data.get("data", {}).get("items", [])
-    if not items:
-        print(f"No posts found for #{hashtag}")
-        return []
-
-    for item in items:
-        caption = item.get("caption", {})
-        user = item.get("user", {})
-        
-        is_video_val = item.get("is_video", False)
-        video_views_val = item.get("ig_play_count", "N/A") if is_video_val else "N/A"
-
-        taken_at_timestamp = item.get("taken_at", "0")
-        taken_at_formatted = format_timestamp(taken_at_timestamp, include_time=False)
-
-        username_val = user.get("username", "N/A")
-        full_name_val = user.get("full_name", "N/A")
-        caption_text_val = caption.get("text", "N/A")
-        
-        hashtags_val = ", ".join(caption.get("hashtags", [])) or "N/A"
-        mentions_val = ", ".join(caption.get("mentions", [])) or "N/A"
-        
-        likes_count = item.get("like_count", "N/A")
-        comments_count = item.get("comment_count", "N/A")
-        
-        video_url_val = item.get("video_url", "N/A") if is_video_val else "N/A"
-        thumbnail_url_val = item.get("thumbnail_url", "N/A")
-        instagram_url_val = f"https://www.instagram.com/p/{item.get('code', '')}/" if item.get('code') else "N/A"
-
-        detected_caption_language = "N/A"
-        if caption_text_val and len(caption_text_val.strip()) > 0:
-            try:
-                detected_caption_language = detect(caption_text_val)
-            except Exception:
-                detected_caption_language = "Undetectable"
-
-        collected_posts.append({
-            "Username": username_val,
-            "Full Name": full_name_val,
-            "Caption Text": (caption_text_val[:70] + '...') if len(caption_text_val) > 70 and caption_text_val != "N/A" else caption_text_val,
-            "Hashtags": hashtags_val,
-            "Is Video": str(is_video_val),
-            "Likes": str(likes_count),
-            "Comments": str(comments_count),
-            "Video Views": str(video_views_val),
-            "Created At": taken_at_formatted,
-            "Instagram URL": instagram_url_val,
-            "Caption Language": detected_caption_language
-        })
-    
-    return collected_posts
+    posts = []
+    for post in iter_instagram_hashtag_media(hashtag, incremental=incremental):
+        if "error" in post:
+            return {"error": post["error"]}
+        posts.append(post)
+        emit_record(post)
+    return posts
+
 
 # --- Example Usage ---
 if __name__ == "__main__":
@@ -172,7 +236,14 @@ if __name__ == "__main__":
     # Print the collected data as a formatted table
     if collected_posts_for_output:
         print("\n--- Instagram Hashtag Posts Details Table ---")
-        print(tabulate(collected_posts_for_output, headers=output_headers, tablefmt="fancy_grid"))
+        try:
+            from tabulate import tabulate # Only needed for this table, so not imported with the module
+            print(tabulate(collected_posts_for_output, headers=output_headers, tablefmt="fancy_grid"))
+        except ImportError:
+            print("Please install 'tabulate' library (pip install tabulate) to view formatted table.")
+            # Fallback to simple print if tabulate is not available
+            for row in collected_posts_for_output:
+                print(row)
         print("---------------------------------------------")
     else:
         print("\nNo details collected for the specified Instagram hashtags.")
@@ -1,17 +1,72 @@
 # scrapers/fetch_tiktok_post_info.py
-import http.client
-import urllib.parse
-import json
-import re
-from datetime import datetime # For formatting timestamps
-
-# Assuming utils.py is in the same directory or accessible via package import
 from .utils import safe_get, format_timestamp
-from .api_key_manager import rapidapi_key_manager # Import the key manager
+from .adapters import PlatformAdapter, FromInput, register_adapter # Shared request lifecycle for every platform
+from .cache import cached # Per-identifier result cache
 
 # --- Configuration (Host specific to this TikTok API) ---
 RAPIDAPI_HOST_TIKTOK = "tiktok89.p.rapidapi.com"
 
+
+def _input_username(parsed, identifier):
+    # Use the username from the input URL if available, otherwise it is taken from the API response
+    return parsed.details["username"]
+
+
+def _video_duration_seconds(data, parsed, identifier):
+    # The API provides duration in milliseconds, so we convert it to seconds.
+    raw_video_duration = safe_get(data, "video.duration")
+    if isinstance(raw_video_duration, (int, float)):
+        return raw_video_duration / 1000
+    return "N/A"
+
+
+def _input_video_url(parsed, identifier):
+    # Construct the video URL in the desired format from the input URL's username and video ID
+    if parsed.details["username"] and parsed.details["video_id"]:
+        return f"https://www.tiktok.com/@{parsed.details['username']}/video/{parsed.details['video_id']}"
+    return None
+
+
+def _video_url(data, parsed, identifier):
+    # Short links: build the URL from the API response instead
+    author_username_output = safe_get(data, "author.unique_id")
+    video_id_output = safe_get(data, "id")
+    if author_username_output != "N/A" and video_id_output != "N/A":
+        return f"https://www.tiktok.com/@{author_username_output}/video/{video_id_output}"
+    # Fallback to API's share_url if username or video_id could not be extracted from input or API
+    video_share_url = safe_get(data, "share_url")
+    print(f"Warning: Could not fully reconstruct TikTok URL using extracted username/video_id. Falling back to API's share_url: {video_share_url}")
+    return video_share_url
+
+
+def _created_date(data, parsed, identifier):
+    return format_timestamp(safe_get(data, "create_time"), include_time=True)
+
+
+ADAPTER = register_adapter(PlatformAdapter(
+    info_type="tiktok_post",
+    host=RAPIDAPI_HOST_TIKTOK,
+    endpoint="/tiktok?link={id}", # The full video URL; short links are resolved by the API
+    api_name="TikTok API",
+    label="TikTok post info",
+    required=("ok",), # The API sets 'ok' on success
+    error_fields=("message", "reason"),
+    fields={
+        "Views": "statistics.play_count",
+        "Likes": "statistics.digg_count",
+        "Comments": "statistics.comment_count",
+        "Shares": "statistics.share_count",
+        "Video URL": FromInput(_input_video_url, fallback=_video_url),
+        "Author Username": FromInput(_input_username, fallback="author.unique_id"),
+        "Video Duration (seconds)": _video_duration_seconds,
+        "Video Language": "desc_language",
+        "Caption Language": "desc_language", # Often the same field for TikTok
+        "Created Date (UTC)": _created_date,
+    },
+))
+
+
+@cached("tiktok_post")
 def fetch_tiktok_post_info(video_url): # Function name remains as provided
     """
     Fetches basic details for a given TikTok video URL using the TikTok API,
@@ -19,128 +74,7 @@ def fetch_tiktok_post_info(video_url): # Function name remains as provided
     Implements API key rotation for resilience against rate limits or invalid keys.
     Returns a dictionary of extracted details or an error dictionary if fetching fails.
     """
-    
-    # --- Extract username and video ID from the input URL (preferred for output URL format) ---
-    parsed_username = None
-    parsed_video_id = None
-    tiktok_url_match = re.search(r'tiktok\.com\/@([a-zA-Z0-9\._-]+)\/video\/(\d+)', video_url)
-    if tiktok_url_match:
-        parsed_username = tiktok_url_match.group(1)
-        parsed_video_id = tiktok_url_match.group(2)
-    else:
-        print(f"Warning: Could not parse username and video ID from input URL: {video_url}. Will rely on API response for output URL construction.")
-
-
-    # Properly encode the URL for the GET request to the API
-    encoded_url = urllib.parse.quote(video_url, safe='')
-    endpoint = f"/tiktok?link={encoded_url}"
-    
-    # --- API Request with Key Rotation Loop ---
-    for _ in range(rapidapi_key_manager.max_key_rotations):
-        conn = None # Initialize conn to None at the start of each loop iteration
-        try:
-            current_headers = rapidapi_key_manager.get_headers(RAPIDAPI_HOST_TIKTOK)
-            conn = http.client.HTTPSConnection(RAPIDAPI_HOST_TIKTOK)
-            conn.request("GET", endpoint, headers=current_headers)
-            res = conn.getresponse()
-            data = res.read() # Read the response body
-
-            raw_response_str = data.decode("utf-8")
-            response_json = json.loads(raw_response_str)
-
-            error_message_from_api = response_json.get('message', response_json.get('reason', ''))
-            
-            if res.status == 429:
-                print(f"Rate limit hit with current key (index: {rapidapi_key_manager.current_key_index}) for TikTok API. Rotating key...")
-                if not rapidapi_key_manager.rotate_key():
-                    return {"error": "All RapidAPI keys exhausted or invalid for TikTok rate limit."}
-                continue 
-            elif ("not subscribed" in str(error_message_from_api).lower() or 
-                  "invalid api key" in str(error_message_from_api).lower() or 
-                  res.status in [401, 403]):
-                print(f"Current key (index: {rapidapi_key_key_manager.current_key_index}) invalid or subscription issue for TikTok API. Rotating key...") # type: ignore
-                if not rapidapi_key_manager.rotate_key():
-                    return {"error": "All RapidAPI keys exhausted or invalid for TikTok subscription/authentication."}
-                continue 
-            elif res.status != 200:
-                print(f"TikTok API Error {res.status}: {error_message_from_api}. Not a rate limit, returning error.")
-                return {"error": f"TikTok API Error {res.status}: {error_message_from_api}"}
-            
-            if not response_json.get('ok'):
-                final_api_error_message = response_json.get('message', response_json.get('reason', 'Unknown error from TikTok API.'))
-                print(f"TikTok API returned an error for {video_url}: {final_api_error_message}")
-                return {"error": f"TikTok API returned an error for {video_url}: {final_api_error_message}"}
-
-            break # Exit loop if the request was successful and data is valid
-
-        except http.client.HTTPException as e:
-            print(f"HTTP connection error for {video_url}: {e}. Retrying with next key...")
-            if not rapidapi_key_manager.rotate_key():
-                return {"error": "All RapidAPI keys exhausted due to HTTP connection errors for TikTok."}
-            continue 
-        except json.JSONDecodeError:
-            print(f"Error for {video_url}: Could not decode JSON response from TikTok API. Raw response: {raw_response_str}. Retrying with next key...")
-            if not rapidapi_key_manager.rotate_key():
-                return {"error": "All RapidAPI keys exhausted due to invalid JSON responses from TikTok API."}
-            continue 
-        except Exception as e:
-            print(f"An unexpected error occurred for TikTok video {video_url}: {e}. Retrying with next key...")
-            if not rapidapi_key_manager.rotate_key():
-                return {"error": f"All RapidAPI keys exhausted due to unexpected errors with TikTok API: {str(e)}"}
-            continue 
-        finally:
-            if conn:
-                conn.close()
-    else: 
-        return {"error": "Failed to fetch TikTok post info after trying all available API keys."}
-
-    # --- Data Extraction (executed only if API call was successful and loop broke) ---
-    author_info = safe_get(response_json, 'author', {})
-    # Use parsed_username if available, otherwise try to get from API response
-    author_username_output = parsed_username if parsed_username else safe_get(author_info, 'unique_id')
-
-    statistics_info = response_json.get('statistics', {})
-    play_count = safe_get(statistics_info, 'play_count')
-    like_count = safe_get(statistics_info, 'digg_count')
-    comment_count = safe_get(statistics_info, 'comment_count')
-    share_count = safe_get(statistics_info, 'share_count')
-
-    video_details = response_json.get('video', {})
-    raw_video_duration = safe_get(video_details, 'duration')
-    # Use parsed_video_id if available, otherwise try to get from API response
-    video_id_output = parsed_video_id if parsed_video_id else safe_get(response_json, 'id') 
-    
-    video_duration_seconds = 'N/A'
-    # The API provides duration in milliseconds, so we convert it to seconds.
-    if isinstance(raw_video_duration, (int, float)):
-        video_duration_seconds = raw_video_duration / 1000
-    
-    caption_language = safe_get(response_json, 'desc_language')
-    
-    # Construct the video URL in the desired format, prioritizing parsed input data
-    if author_username_output and video_id_output:
-        video_share_url = f"https://www.tiktok.com/@{author_username_output}/video/{video_id_output}"
-    else:
-        # Fallback to API's share_url if username or video_id could not be extracted from input or API
-        video_share_url = safe_get(response_json, 'share_url') 
-        print(f"Warning: Could not fully reconstruct TikTok URL using extracted username/video_id. Falling back to API's share_url: {video_share_url}")
-
-
-    create_time_unix = safe_get(response_json, 'create_time')
-    create_time_utc = format_timestamp(create_time_unix, include_time=True)
-
-    return {
-        "Views": str(play_count),
-        "Likes": str(like_count),
-        "Comments": str(comment_count),
-        "Shares": str(share_count),
-        "Video URL": video_share_url,
-        "Author Username": author_username_output,
-        "Video Duration (seconds)": str(video_duration_seconds),
-        "Video Language": caption_language,
-        "Caption Language": caption_language, # Often the same field for TikTok
-        "Created Date (UTC)": create_time_utc
-    }
+    return ADAPTER.fetch(video_url)
 
 # --- Example Usage (only runs when this file is executed directly) ---
 if __name__ == "__main__":
@@ -0,0 +1,155 @@
+# scrapers/fixtures.py
+import os
+import json
+import gzip
+import time
+import hashlib
+import threading
+
+# --- Configuration (Recorded upstream responses, overridable from the environment) ---
+# "record": every upstream response is also saved as a fixture; "replay": responses are served from
+# the fixtures and nothing goes over the network (calls with no fixture get a 404). Empty: neither.
+FIXTURES_MODE = os.getenv("SCRAPER_FIXTURES_MODE", "").lower()
+FIXTURES_DIR = os.getenv("SCRAPER_FIXTURES_DIR", os.path.join("instance", "fixtures"))
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Response headers kept with a fixture: what the scrapers read. Anything else (cookies, tracing ids) is dropped.
+_KEPT_HEADERS = ("content-type", "x-ratelimit-requests-limit", "x-ratelimit-requests-remaining", "x-ratelimit-requests-reset")
+
+if FIXTURES_MODE not in ("", RECORD, REPLAY):
+    print(f"Warning: Unknown SCRAPER_FIXTURES_MODE '{FIXTURES_MODE}'; fixtures are neither recorded nor replayed.")
+    FIXTURES_MODE = ""
+elif FIXTURES_MODE:
+    print(f"Note: SCRAPER_FIXTURES_MODE is '{FIXTURES_MODE}'; upstream fixtures are in {os.path.abspath(FIXTURES_DIR)}.")
+
+
+_local = threading.local()
+
+
+def describe_call(info_type, identifier):
+    """
+    Labels the upstream calls this thread makes from now on with the identifier being fetched.
+    Recorded fixtures keep the label, so a replay (bench/run.py --replay) can request the same
+    identifiers again.
+    """
+    _local.call = (info_type, identifier)
+
+
+def request_key(host, method, path):
+    """
+    Returns the fixture key of a call: a hash of the method, host and path with its query
+    string. Request headers (the API key among them) are not part of it.
+    """
+    return hashlib.sha256(f"{method} {host}{path}".encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """
+    Raw upstream responses on disk, content-addressed:
+
+        <dir>/bodies/<2 hex>/<sha256 of the body>.gz   the body, gzip-compressed
+        <dir>/requests/<host>/<request key>.json       status, reason, kept headers and the body's hash
+
+    Identical bodies are stored once, and bodies are compressed with a fixed timestamp so
+    recording the same response twice writes the same bytes. The request files are small
+    JSON, readable and diffable, so fixtures can be committed and reviewed.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self._loaded = {} # request key -> (status, reason, headers, body); replays skip the disk after the first
+        self.replayed = 0 # Calls answered by load()
+        self._lock = threading.Lock()
+
+    def _request_path(self, host, key):
+        return os.path.join(self.directory, "requests", host, f"{key}.json")
+
+    def _body_path(self, digest):
+        return os.path.join(self.directory, "bodies", digest[:2], f"{digest}.gz")
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "wb") as fixture_file:
+            fixture_file.write(data)
+        os.replace(temporary_path, path) # Atomic, so a replay never reads half a fixture
+
+    def save(self, host, method, path, status, reason, headers, body):
+        """Stores one response, replacing any earlier one recorded for the same call."""
+        digest = hashlib.sha256(body).hexdigest()
+        body_path = self._body_path(digest)
+        if not os.path.exists(body_path):
+            self._write(body_path, gzip.compress(body, mtime=0))
+
+        kept_headers = {}
+        for name in _KEPT_HEADERS:
+            value = headers.get(name) if headers is not None else None
+            if value is not None:
+                kept_headers[name] = value
+        entry = {
+            "method": method,
+            "host": host,
+            "path": path,
+            "status": status,
+            "reason": reason,
+            "headers": kept_headers,
+            "body": digest,
+            "recorded_at": int(time.time()),
+        }
+        call = getattr(_local, "call", None)
+        if call is not None:
+            entry["info_type"], entry["identifier"] = call
+        key = request_key(host, method, path)
+        self._write(self._request_path(host, key), json.dumps(entry, indent=1, sort_keys=True).encode("utf-8"))
+        with self._lock:
+            self._loaded.pop(key, None)
+
+    def load(self, host, method, path):
+        """Returns (status, reason, headers dict, body bytes) recorded for a call, or None."""
+        key = request_key(host, method, path)
+        with self._lock:
+            self.replayed += 1
+        fixture = self._loaded.get(key)
+        if fixture is not None:
+            return fixture
+        try:
+            with open(self._request_path(host, key), "rb") as entry_file:
+                entry = json.load(entry_file)
+            with open(self._body_path(entry["body"]), "rb") as body_file:
+                body = gzip.decompress(body_file.read())
+        except FileNotFoundError:
+            return None
+        fixture = (entry["status"], entry["reason"], entry["headers"], body)
+        with self._lock:
+            self._loaded[key] = fixture
+        return fixture
+
+    def entries(self, host=None):
+        """Yields the request entries (dicts, without the body) of every recorded call, or one host's."""
+        requests_directory = os.path.join(self.directory, "requests")
+        if not os.path.isdir(requests_directory):
+            return
+        hosts = [host] if host else sorted(os.listdir(requests_directory))
+        for host_name in hosts:
+            host_directory = os.path.join(requests_directory, host_name)
+            if not os.path.isdir(host_directory):
+                continue
+            for name in sorted(os.listdir(host_directory)):
+                if name.endswith(".json"):
+                    with open(os.path.join(host_directory, name)) as entry_file:
+                        yield json.load(entry_file)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_fixture_store():
+    """Returns the process-wide fixture store in FIXTURES_DIR."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FixtureStore(FIXTURES_DIR)
+    return _store
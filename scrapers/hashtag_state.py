@@ -0,0 +1,115 @@
+# scrapers/hashtag_state.py
+import os
+import time
+import sqlite3
+import threading
+
+# --- Configuration (Incremental hashtag polling, overridable from the environment) ---
+HASHTAG_STATE_DB_PATH = os.getenv("SCRAPER_HASHTAG_STATE_DB_PATH", os.path.join("instance", "hashtag_state.db"))
+HASHTAG_SEEN_CODES = int(os.getenv("SCRAPER_HASHTAG_SEEN_CODES", "2000")) # Newest post codes remembered per hashtag
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashtag_marks (
+    hashtag TEXT PRIMARY KEY,
+    newest_taken_at INTEGER,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS hashtag_seen (
+    hashtag TEXT NOT NULL,
+    code TEXT NOT NULL,
+    taken_at INTEGER,
+    PRIMARY KEY (hashtag, code)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hashtag_seen_taken_at ON hashtag_seen (hashtag, taken_at);
+"""
+
+
+class HashtagStateStore:
+    """
+    Remembers, per hashtag, how far previous polls got: the newest 'taken_at' seen (the
+    high-water mark) and the codes of the most recent posts. Incremental polls use it to
+    emit only posts they haven't seen and to stop paginating once they reach known content.
+    Backed by SQLite so the state survives restarts and is shared by gunicorn workers.
+    """
+    def __init__(self, path, seen_codes=HASHTAG_SEEN_CODES):
+        self.path = path
+        self.seen_codes = seen_codes
+        self._local = threading.local() # One connection per thread; sqlite3 connections aren't shareable
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited across fork() must not be reused by the child
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, hashtag):
+        """Returns (newest taken_at or None, set of known post codes) for a hashtag."""
+        conn = self._connection()
+        row = conn.execute("SELECT newest_taken_at FROM hashtag_marks WHERE hashtag = ?", (hashtag,)).fetchone()
+        codes = {code for (code,) in conn.execute("SELECT code FROM hashtag_seen WHERE hashtag = ?", (hashtag,))}
+        return (row[0] if row else None), codes
+
+    def record(self, hashtag, posts, newest_taken_at):
+        """
+        Adds the (code, taken_at) pairs of newly seen posts and raises the hashtag's
+        high-water mark to 'newest_taken_at' (it never moves back). Only the newest
+        'seen_codes' codes are kept.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO hashtag_seen (hashtag, code, taken_at) VALUES (?, ?, ?)",
+                ((hashtag, code, taken_at) for code, taken_at in posts),
+            )
+            conn.execute(
+                "INSERT INTO hashtag_marks (hashtag, newest_taken_at, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (hashtag) DO UPDATE SET "
+                "newest_taken_at = max(coalesce(newest_taken_at, excluded.newest_taken_at), coalesce(excluded.newest_taken_at, newest_taken_at)), "
+                "updated_at = excluded.updated_at",
+                (hashtag, newest_taken_at, time.time()),
+            )
+            conn.execute(
+                "DELETE FROM hashtag_seen WHERE hashtag = ? AND code NOT IN "
+                "(SELECT code FROM hashtag_seen WHERE hashtag = ? ORDER BY taken_at DESC LIMIT ?)",
+                (hashtag, hashtag, self.seen_codes),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def reset(self, hashtag):
+        """Forgets a hashtag, so its next incremental poll starts from scratch."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM hashtag_marks WHERE hashtag = ?", (hashtag,))
+            conn.execute("DELETE FROM hashtag_seen WHERE hashtag = ?", (hashtag,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_hashtag_state():
+    """Returns the process-wide hashtag state store, opening it on first use."""
+    global _state
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                _state = HashtagStateStore(HASHTAG_STATE_DB_PATH)
+    return _state
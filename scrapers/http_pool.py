@@ -0,0 +1,280 @@
+# scrapers/http_pool.py
+import os
+import json
+import time
+import socket
+import threading
+import http.client
+import urllib.parse
+
+from . import metrics
+from . import tracing
+from . import fixtures # Record / replay of raw upstream responses
+
+# --- Configuration (Pool sizing, overridable from the environment) ---
+POOL_MAX_SIZE = int(os.getenv("HTTP_POOL_MAX_SIZE", "10")) # Max open connections per host
+POOL_IDLE_TIMEOUT = float(os.getenv("HTTP_POOL_IDLE_TIMEOUT", "30")) # Seconds before an idle connection is dropped
+POOL_WAIT_TIMEOUT = float(os.getenv("HTTP_POOL_WAIT_TIMEOUT", "30")) # Seconds to wait for a free connection
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")) # Seconds to establish a connection (TCP + TLS)
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15")) # Seconds to wait on any single read of a response
+# Sends every host's calls to this base URL instead (e.g. http://127.0.0.1:8765 for bench/stub_server.py).
+# Pools, metrics and the x-rapidapi-host header still use the real host names. Never set it in production.
+UPSTREAM_OVERRIDE = os.getenv("SCRAPER_UPSTREAM_OVERRIDE", "")
+
+_override = urllib.parse.urlsplit(UPSTREAM_OVERRIDE) if UPSTREAM_OVERRIDE else None
+if _override is not None:
+    print(f"Note: SCRAPER_UPSTREAM_OVERRIDE is set; all upstream calls go to {UPSTREAM_OVERRIDE}.")
+
+# Errors raised when a kept-alive connection was silently closed by the server
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    http.client.CannotSendRequest,
+    http.client.ResponseNotReady,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+def _split_timeout(timeout):
+    """
+    Normalizes a timeout into (connect, read) seconds. Accepts a (connect, read) pair or a
+    single number used for both; None means the configured defaults, never "wait forever".
+    """
+    if timeout is None:
+        return HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+    if isinstance(timeout, (tuple, list)):
+        return timeout[0], timeout[1]
+    return timeout, timeout
+
+
+def _create_connection(*args, **kwargs):
+    # DNS lookup and TCP handshake; the TLS handshake follows in HTTPSConnection.connect()
+    with tracing.span("http.tcp_connect"):
+        return socket.create_connection(*args, **kwargs)
+
+
+UPSTREAM_REQUESTS = metrics.counter(
+    "scraper_upstream_requests_total", "Upstream API calls by host and HTTP status ('error' if no response).", ("host", "status"))
+UPSTREAM_ERRORS = metrics.counter(
+    "scraper_upstream_errors_total", "Upstream calls that got no response, by host and error class.", ("host", "error"))
+UPSTREAM_LATENCY = metrics.histogram(
+    "scraper_upstream_request_duration_seconds", "Upstream call latency, connection wait included.", ("host",))
+UPSTREAM_IN_FLIGHT = metrics.gauge(
+    "scraper_upstream_in_flight", "Upstream calls currently in progress.", ("host",))
+
+
+class PooledResponse:
+    """
+    A fully read HTTP response. The body is read eagerly so the underlying
+    connection can go back to the pool before the caller parses it.
+    """
+    def __init__(self, status, reason, headers, data):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.data = data
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+class HTTPSConnectionPool:
+    """
+    Thread-safe pool of keep-alive HTTPS connections to a single host.
+    Connections are reused LIFO, evicted after POOL_IDLE_TIMEOUT seconds of inactivity,
+    and transparently re-opened once if a reused connection turns out to be stale.
+    """
+    def __init__(self, host, max_size=POOL_MAX_SIZE, idle_timeout=POOL_IDLE_TIMEOUT):
+        self.host = host
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._idle = [] # Stack of (connection, last_used_monotonic)
+        self._open_count = 0
+        self._condition = threading.Condition()
+
+    def _new_connection(self, read_timeout):
+        if _override is not None:
+            connection_class = http.client.HTTPConnection if _override.scheme == "http" else http.client.HTTPSConnection
+            conn = connection_class(_override.hostname, _override.port, timeout=read_timeout)
+        else:
+            conn = http.client.HTTPSConnection(self.host, timeout=read_timeout)
+        conn._create_connection = _create_connection # Times DNS + TCP apart from TLS
+        return conn
+
+    def _connect(self, conn, connect_timeout, read_timeout):
+        """Opens the connection under the connect timeout, then switches the socket to the read timeout."""
+        with tracing.span("http.connect", host=self.host):
+            conn.timeout = connect_timeout
+            conn.connect()
+        conn.timeout = read_timeout
+        conn.sock.settimeout(read_timeout)
+
+    def _send(self, conn, method, url, headers):
+        """Sends the request and waits for the status line; returns the http.client response."""
+        with tracing.span("http.send"):
+            conn.request(method, url, headers=headers or {})
+        with tracing.span("http.ttfb"):
+            return conn.getresponse()
+
+    def _acquire(self, read_timeout):
+        """
+        Returns (connection, reused). Blocks while the pool is at max_size and nothing is idle.
+        Reused connections get read_timeout applied to their socket.
+        """
+        deadline = time.monotonic() + POOL_WAIT_TIMEOUT
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                # Drop connections that have been idle too long; the server has likely closed them
+                while self._idle and now - self._idle[0][1] > self.idle_timeout:
+                    stale_conn, _ = self._idle.pop(0)
+                    stale_conn.close()
+                    self._open_count -= 1
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                    conn.timeout = read_timeout
+                    if conn.sock is not None:
+                        conn.sock.settimeout(read_timeout)
+                    return conn, True
+                if self._open_count < self.max_size:
+                    self._open_count += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise http.client.HTTPException(f"Timed out waiting for a free connection to {self.host}")
+                self._condition.wait(remaining)
+        return self._new_connection(read_timeout), False
+
+    def _release(self, conn, reusable):
+        with self._condition:
+            if reusable:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                conn.close()
+                self._open_count -= 1
+            self._condition.notify()
+
+    def request(self, method, url, headers=None, timeout=None):
+        """
+        Sends a request over a pooled connection and returns a PooledResponse.
+        'timeout' is a (connect, read) pair or one number for both (see _split_timeout).
+        Network errors, timeouts included, are re-raised to the caller after the connection is discarded.
+        """
+        connect_timeout, read_timeout = _split_timeout(timeout)
+        with tracing.span("http.pool_wait"):
+            conn, reused = self._acquire(read_timeout)
+        try:
+            try:
+                if conn.sock is None:
+                    self._connect(conn, connect_timeout, read_timeout)
+                res = self._send(conn, method, url, headers)
+            except _STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                # Kept-alive connection was closed by the server; reconnect once and retry
+                conn.close()
+                self._connect(conn, connect_timeout, read_timeout)
+                res = self._send(conn, method, url, headers)
+            with tracing.span("http.read"):
+                data = res.read()
+        except BaseException:
+            self._release(conn, reusable=False)
+            raise
+
+        self._release(conn, reusable=not res.will_close)
+        return PooledResponse(res.status, res.reason, res.headers, data)
+
+    def close(self):
+        """Closes every idle connection in the pool."""
+        with self._condition:
+            for conn, _ in self._idle:
+                conn.close()
+                self._open_count -= 1
+            self._idle = []
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host):
+    """
+    Returns the shared connection pool for a host, creating it on first use.
+    """
+    pool = _pools.get(host)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(host)
+            if pool is None:
+                pool = HTTPSConnectionPool(host)
+                _pools[host] = pool
+    return pool
+
+
+def _header_message(headers):
+    """Builds the case-insensitive header mapping http.client responses carry from a plain dict."""
+    message = http.client.HTTPMessage()
+    for name, value in headers.items():
+        message[name] = value
+    return message
+
+
+def _replay(host, method, endpoint):
+    """Returns the recorded response of a call as a PooledResponse, or a 404 saying none was recorded."""
+    fixture = fixtures.get_fixture_store().load(host, method, endpoint)
+    if fixture is None:
+        print(f"No recorded fixture for {method} {host}{endpoint}; answering 404.")
+        body = json.dumps({"message": f"No recorded fixture for {method} {host}{endpoint}"}).encode("utf-8")
+        return PooledResponse(404, "Not Found", _header_message({"content-type": "application/json"}), body)
+    status, reason, headers, body = fixture
+    return PooledResponse(status, reason, _header_message(headers), body)
+
+
+def _record(host, method, endpoint, response):
+    # 429s and 5xx answers are transient; recording one would replace a good fixture of the same call
+    if response.status == 429 or response.status >= 500:
+        return
+    try:
+        fixtures.get_fixture_store().save(host, method, endpoint, response.status, response.reason,
+                                          response.headers, response.data)
+    except OSError as e:
+        print(f"Warning: Could not record fixture for {method} {host}{endpoint}: {e}")
+
+
+def request(host, endpoint, headers=None, params=None, timeout=None, method="GET"):
+    """
+    Sends a request to https://{host}{endpoint} through the host's shared connection pool.
+    'params' are URL-encoded and appended to the endpoint. 'timeout' is a (connect, read)
+    pair or a single number; None uses HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT. Returns a PooledResponse.
+    With SCRAPER_FIXTURES_MODE=replay the response comes from the recorded fixtures instead
+    (and isn't counted as an upstream call); with =record every response is also saved.
+    """
+    if params:
+        separator = "&" if "?" in endpoint else "?"
+        endpoint = f"{endpoint}{separator}{urllib.parse.urlencode(params)}"
+    if fixtures.FIXTURES_MODE == fixtures.REPLAY:
+        return _replay(host, method, endpoint)
+    in_flight = UPSTREAM_IN_FLIGHT.labels(host)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        response = get_pool(host).request(method, endpoint, headers=headers, timeout=timeout)
+    except Exception as e:
+        UPSTREAM_REQUESTS.labels(host, "error").inc()
+        UPSTREAM_ERRORS.labels(host, type(e).__name__).inc()
+        raise
+    finally:
+        in_flight.dec()
+        UPSTREAM_LATENCY.labels(host).observe(time.perf_counter() - start)
+    UPSTREAM_REQUESTS.labels(host, response.status).inc()
+    if fixtures.FIXTURES_MODE == fixtures.RECORD:
+        _record(host, method, endpoint, response)
+    return response
+
+
+def close_all():
+    """Closes idle connections in every pool (e.g. before forking or at shutdown)."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
@@ -0,0 +1,204 @@
+# scrapers/identifiers.py
+import re
+import functools
+from collections import namedtuple
+
+# --- Precompiled patterns (compiled once at import instead of on every call) ---
+_INSTAGRAM_POST_URL = re.compile(r'(?:instagram\.com\/(p|reel)\/)([a-zA-Z0-9_-]+)')
+_INSTAGRAM_SHORTCODE = re.compile(r'^[a-zA-Z0-9_-]+$')
+_INSTAGRAM_PROFILE_URL = re.compile(r'(?:instagram\.com\/)([a-zA-Z0-9_\.]+)')
+_INSTAGRAM_USERNAME = re.compile(r'^@?([a-zA-Z0-9_\.]+)$')
+_HASHTAG = re.compile(r'^#?(\w+)$')
+_TIKTOK_VIDEO_URL = re.compile(r'tiktok\.com\/@([a-zA-Z0-9\._-]+)\/video\/(\d+)')
+_TIKTOK_ANY_URL = re.compile(r'^(?:https?:\/\/)?(?:[a-z0-9-]+\.)*tiktok\.com\/\S+$', re.IGNORECASE)
+_TIKTOK_PROFILE_URL = re.compile(r'(?:tiktok\.com\/@)([a-zA-Z0-9_\.]+)')
+_TIKTOK_USERNAME = re.compile(r'^@?([a-zA-Z0-9_\.]+)$')
+_YOUTUBE_VIDEO_URL = re.compile(r'(?:v=|youtu\.be/|embed/|shorts/)([a-zA-Z0-9_-]{11})')
+_YOUTUBE_VIDEO_ID = re.compile(r'^[a-zA-Z0-9_-]{11}$')
+_YOUTUBE_CHANNEL_URL = re.compile(r'(?:youtube\.com/(?:@|channel/|c/|user/)|youtu\.be/)([a-zA-Z0-9@_-]+)(?:[/]|$|\?|&)')
+_YOUTUBE_HANDLE = re.compile(r'^@?[a-zA-Z0-9_.\-]+$')
+_SNAPCHAT_PROFILE_URL = re.compile(r'snapchat\.com\/add\/([a-zA-Z0-9_.\-]+)')
+_SNAPCHAT_USERNAME = re.compile(r'^[a-zA-Z0-9_.\-]+$')
+
+
+class IdentifierError(ValueError):
+    """Raised when an input can't be mapped to an identifier of the requested info type."""
+
+
+class ParsedIdentifier(namedtuple("ParsedIdentifier", ["platform", "kind", "id", "canonical_id", "details"])):
+    """
+    An input mapped to what the scraper needs: 'id' is the value sent to the API,
+    'canonical_id' its normalized form (case-folded where the platform is case-insensitive)
+    and 'details' any extra parts of the input the scraper uses to build its output.
+    """
+    __slots__ = ()
+
+    @property
+    def key(self):
+        """Canonical (platform, kind, id) key shared by caching and de-duplication."""
+        return (self.platform, self.kind, self.canonical_id)
+
+
+def _is_url(identifier):
+    return identifier.startswith("http")
+
+
+def _parse_instagram_post(identifier):
+    if _is_url(identifier) or "instagram.com/" in identifier:
+        match = _INSTAGRAM_POST_URL.search(identifier)
+        if not match:
+            raise IdentifierError(f"Invalid Instagram post URL or identifier: {identifier}")
+        shortcode = match.group(2)
+        return ParsedIdentifier("instagram", "post", shortcode, shortcode, {"url_path_type": match.group(1)})
+    if not _INSTAGRAM_SHORTCODE.match(identifier):
+        raise IdentifierError(f"Invalid Instagram post URL or identifier: {identifier}")
+    return ParsedIdentifier("instagram", "post", identifier, identifier, {"url_path_type": "p"})
+
+
+def _parse_instagram_profile(identifier):
+    if _is_url(identifier):
+        match = _INSTAGRAM_PROFILE_URL.search(identifier)
+        if not match:
+            raise IdentifierError(f"Invalid Instagram profile URL or identifier: {identifier}")
+        username = match.group(1)
+    else:
+        match = _INSTAGRAM_USERNAME.match(identifier)
+        if not match:
+            raise IdentifierError(f"Invalid Instagram profile URL or identifier: {identifier}")
+        username = match.group(1)
+    return ParsedIdentifier("instagram", "profile", username, username.lower(), {})
+
+
+def _parse_instagram_hashtag(identifier):
+    match = _HASHTAG.match(identifier)
+    if not match:
+        raise IdentifierError(f"Invalid Instagram hashtag: {identifier}")
+    hashtag = match.group(1)
+    return ParsedIdentifier("instagram", "hashtag", hashtag, hashtag.lower(), {})
+
+
+def _parse_tiktok_post(identifier):
+    match = _TIKTOK_VIDEO_URL.search(identifier)
+    if match:
+        username, video_id = match.group(1), match.group(2)
+        return ParsedIdentifier("tiktok", "video", identifier, video_id, {"username": username, "video_id": video_id})
+    # Short links (vm.tiktok.com/..., tiktok.com/t/...) are resolved by the API itself
+    if _TIKTOK_ANY_URL.match(identifier):
+        return ParsedIdentifier("tiktok", "link", identifier, identifier, {"username": None, "video_id": None})
+    raise IdentifierError(f"Invalid TikTok video URL: {identifier}")
+
+
+def _parse_tiktok_profile(identifier):
+    if _is_url(identifier):
+        match = _TIKTOK_PROFILE_URL.search(identifier)
+    else:
+        match = _TIKTOK_USERNAME.match(identifier)
+    if not match:
+        raise IdentifierError(f"Could not extract a valid TikTok username from: {identifier}")
+    username = match.group(1)
+    return ParsedIdentifier("tiktok", "profile", username, username.lower(), {})
+
+
+def _parse_youtube_post(identifier):
+    match = _YOUTUBE_VIDEO_URL.search(identifier)
+    if match:
+        video_id = match.group(1)
+    elif _YOUTUBE_VIDEO_ID.match(identifier):
+        video_id = identifier
+    else:
+        raise IdentifierError(f"Could not extract video ID from URL: {identifier}")
+    return ParsedIdentifier("youtube", "video", video_id, video_id, {})
+
+
+def _youtube_channel(kind, value):
+    # Channel IDs are case-sensitive, handles are not
+    canonical = value if kind == "id" else value.lower()
+    return ParsedIdentifier("youtube", kind, value, canonical, {})
+
+
+def _is_youtube_channel_id(value):
+    return value.startswith("UC") and 22 <= len(value) <= 24 # YouTube IDs are typically 24 characters
+
+
+def _parse_youtube_profile(identifier):
+    if _is_url(identifier):
+        match = _YOUTUBE_CHANNEL_URL.search(identifier)
+        if not match:
+            raise IdentifierError(f"Could not determine identifier type or extract valid identifier from: {identifier}")
+        extracted = match.group(1)
+        if _is_youtube_channel_id(extracted):
+            return _youtube_channel("id", extracted)
+        if extracted.startswith("@"):
+            return _youtube_channel("handle", extracted)
+        # Custom URLs and legacy usernames (/c/LinusTechTips, /user/PewDiePie) are looked up as handles
+        return _youtube_channel("handle", "@" + extracted)
+    if _is_youtube_channel_id(identifier):
+        return _youtube_channel("id", identifier)
+    if not _YOUTUBE_HANDLE.match(identifier):
+        raise IdentifierError(f"Could not determine identifier type or extract valid identifier from: {identifier}")
+    # Plain strings (e.g. "ishowspeed") are assumed to be handles
+    return _youtube_channel("handle", identifier if identifier.startswith("@") else "@" + identifier)
+
+
+def _parse_snapchat_profile(identifier):
+    if _is_url(identifier):
+        match = _SNAPCHAT_PROFILE_URL.search(identifier)
+        if not match:
+            raise IdentifierError(f"Invalid Snapchat profile URL or identifier: {identifier}")
+        username = match.group(1)
+    elif _SNAPCHAT_USERNAME.match(identifier):
+        username = identifier
+    else:
+        raise IdentifierError(f"Invalid Snapchat profile URL or identifier: {identifier}")
+    return ParsedIdentifier("snapchat", "profile", username, username.lower(), {})
+
+
+# Parser for each info type accepted by /api/fetch-info
+PARSERS = {
+    "instagram_post": _parse_instagram_post,
+    "instagram_profile": _parse_instagram_profile,
+    "instagram_hashtag": _parse_instagram_hashtag,
+    "tiktok_post": _parse_tiktok_post,
+    "tiktok_profile": _parse_tiktok_profile,
+    "youtube_post": _parse_youtube_post,
+    "youtube_profile": _parse_youtube_profile,
+    "snapchat_profile": _parse_snapchat_profile,
+}
+
+
+@functools.lru_cache(maxsize=8192)
+def parse_identifier(info_type, identifier):
+    """
+    Maps a raw input (URL, username, handle, ID or hashtag) to a ParsedIdentifier.
+    Raises IdentifierError for malformed input or an unknown info type.
+    Results are memoized, so the batch layer, the cache and the scraper can all parse
+    the same input without repeating the work.
+    """
+    parser = PARSERS.get(info_type)
+    if parser is None:
+        raise IdentifierError("Invalid info type provided.")
+    if not isinstance(identifier, str) or not identifier.strip():
+        raise IdentifierError(f"Invalid identifier: {identifier!r}")
+    return parser(identifier.strip())
+
+
+def parse_many(info_type, identifiers):
+    """
+    Parses a whole batch at once. Returns a list aligned with 'identifiers' holding a
+    ParsedIdentifier for each valid input and an IdentifierError for each malformed one.
+    """
+    parser = PARSERS.get(info_type)
+    if parser is None:
+        error = IdentifierError("Invalid info type provided.")
+        return [error] * len(identifiers)
+
+    parsed = []
+    for identifier in identifiers:
+        try:
+            # Unhashable inputs (e.g. a JSON list) can't go through the memoized path
+            if not isinstance(identifier, str):
+                raise IdentifierError(f"Invalid identifier: {identifier!r}")
+            parsed.append(parse_identifier(info_type, identifier))
+        except IdentifierError as e:
+            parsed.append(e)
+    return parsed
@@ -0,0 +1,343 @@
+# scrapers/jobs.py
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+
+from .batch import fetch_batch
+
+# --- Configuration (Background jobs, overridable from the environment) ---
+JOBS_DB_PATH = os.getenv("SCRAPER_JOBS_DB_PATH", os.path.join("instance", "jobs.db"))
+JOB_WORKERS = int(os.getenv("SCRAPER_JOB_WORKERS", "2")) # Worker threads per process; 0 disables processing
+JOB_CHUNK_SIZE = int(os.getenv("SCRAPER_JOB_CHUNK_SIZE", "25")) # Identifiers a worker claims at a time
+JOB_LEASE_SECONDS = float(os.getenv("SCRAPER_JOB_LEASE_SECONDS", "300")) # Claimed items are re-queued after this
+JOB_POLL_INTERVAL = float(os.getenv("SCRAPER_JOB_POLL_INTERVAL", "2")) # Idle workers check for new work this often
+
+# Page size bounds for job result listings
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    info_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    incremental INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    identifier TEXT NOT NULL,
+    status TEXT NOT NULL,
+    lease_token TEXT,
+    lease_until REAL,
+    PRIMARY KEY (job_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS job_items_status ON job_items (job_id, status, lease_until);
+CREATE TABLE IF NOT EXISTS job_results (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    UNIQUE (job_id, position, seq)
+);
+CREATE INDEX IF NOT EXISTS job_results_job ON job_results (job_id, id);
+"""
+
+# Job lifecycle: queued -> running -> completed
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+
+# Item lifecycle: pending -> claimed -> done (claimed items whose lease expires go back to work)
+ITEM_PENDING = "pending"
+ITEM_CLAIMED = "claimed"
+ITEM_DONE = "done"
+
+
+class JobNotFound(LookupError):
+    """Raised when a job id doesn't exist."""
+
+
+class JobQueue:
+    """
+    Persistent queue of batch jobs backed by SQLite. A job's identifiers are stored as items,
+    claimed in chunks by background worker threads under a lease and run through the same
+    batch fetcher as /api/fetch-info. Progress and results are written as each chunk finishes,
+    so a restarted process (or another gunicorn worker) picks up exactly where work stopped:
+    items claimed by a worker that died become available again once their lease runs out.
+    """
+    def __init__(self, path, workers=JOB_WORKERS, chunk_size=JOB_CHUNK_SIZE, lease_seconds=JOB_LEASE_SECONDS):
+        self.path = path
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self._local = threading.local() # One connection per thread; sqlite3 connections aren't shareable
+        self._workers_lock = threading.Lock()
+        self._workers_pid = None
+        self._wakeup = threading.Event()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        # Databases created before jobs could be incremental lack the column
+        if "incremental" not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+            try:
+                conn.execute("ALTER TABLE jobs ADD COLUMN incremental INTEGER NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass # Another process added it first
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited across fork() must not be reused by the child
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def ensure_workers(self):
+        """Starts this process's worker threads on first use (e.g. after a gunicorn fork)."""
+        if self._workers_pid == os.getpid() or self.workers <= 0:
+            return
+        with self._workers_lock:
+            if self._workers_pid == os.getpid():
+                return
+            for number in range(self.workers):
+                worker = threading.Thread(target=self._work_loop, name=f"job-worker-{number}", daemon=True)
+                worker.start()
+            self._workers_pid = os.getpid()
+
+    def submit(self, info_type, identifiers, incremental=False):
+        """
+        Stores a new job and returns its id. Identifiers are processed in the background,
+        with 'incremental' passed on to the batch fetcher.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, info_type, status, total, incremental, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, info_type, STATUS_QUEUED, len(identifiers), int(incremental), now, now),
+            )
+            conn.executemany(
+                "INSERT INTO job_items (job_id, position, identifier, status) VALUES (?, ?, ?, ?)",
+                ((job_id, position, json.dumps(identifier), ITEM_PENDING) for position, identifier in enumerate(identifiers)),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.ensure_workers()
+        self._wakeup.set()
+        return job_id
+
+    def get_job(self, job_id):
+        """Returns a job's status and progress counters. Raises JobNotFound for an unknown id."""
+        row = self._connection().execute(
+            "SELECT id, info_type, status, total, incremental, completed, failed, created_at, updated_at, finished_at "
+            "FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            raise JobNotFound(job_id)
+        job_id, info_type, status, total, incremental, completed, failed, created_at, updated_at, finished_at = row
+        return {
+            "job_id": job_id,
+            "type": info_type,
+            "incremental": bool(incremental),
+            "status": status,
+            "total": total,
+            "completed": completed,
+            "failed": failed,
+            "progress": (completed / total) if total else 1.0,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "finished_at": finished_at,
+        }
+
+    def get_results(self, job_id, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        Returns one page of a job's records as (records, next_cursor, has_more).
+        Records come in the order they were stored (input order within each chunk), so
+        passing next_cursor back never skips records stored later by a running job.
+        'cursor' is an opaque string from a previous page; ValueError if it is malformed.
+        """
+        self.get_job(job_id) # Raises JobNotFound
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        after = int(cursor) if cursor else 0
+        rows = self._connection().execute(
+            "SELECT id, record FROM job_results WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (job_id, after, limit + 1),
+        ).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = str(rows[-1][0]) if rows else (cursor or None)
+        return [json.loads(row[1]) for row in rows], next_cursor, has_more
+
+    def iter_records(self, job_id, batch_size=MAX_PAGE_SIZE, input_order=False):
+        """
+        Yields every record stored so far for a job, reading one page at a time.
+        With input_order, records follow the positions of their identifiers in the submitted
+        batch instead of the order they were stored in.
+        """
+        if input_order:
+            yield from self._iter_records_by_position(job_id, batch_size)
+            return
+        cursor = None
+        while True:
+            records, cursor, has_more = self.get_results(job_id, cursor=cursor, limit=batch_size)
+            yield from records
+            if not has_more:
+                return
+
+    def _iter_records_by_position(self, job_id, batch_size):
+        self.get_job(job_id) # Raises JobNotFound
+        position, seq = -1, -1
+        while True:
+            rows = self._connection().execute(
+                "SELECT position, seq, record FROM job_results "
+                "WHERE job_id = ? AND (position > ? OR (position = ? AND seq > ?)) "
+                "ORDER BY position, seq LIMIT ?",
+                (job_id, position, position, seq, batch_size),
+            ).fetchall()
+            for position, seq, record in rows:
+                yield json.loads(record)
+            if len(rows) < batch_size:
+                return
+
+    def _claim(self):
+        """
+        Claims the next chunk of pending (or abandoned) items from the oldest unfinished job.
+        Returns (job_id, info_type, incremental, lease_token, [(position, identifier), ...]) or None when idle.
+        """
+        now = time.time()
+        lease_token = uuid.uuid4().hex
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for job_id, info_type, incremental in conn.execute(
+                "SELECT id, info_type, incremental FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (STATUS_QUEUED, STATUS_RUNNING),
+            ).fetchall():
+                items = conn.execute(
+                    "SELECT position, identifier FROM job_items WHERE job_id = ? "
+                    "AND (status = ? OR (status = ? AND lease_until <= ?)) ORDER BY position LIMIT ?",
+                    (job_id, ITEM_PENDING, ITEM_CLAIMED, now, self.chunk_size),
+                ).fetchall()
+                if not items:
+                    continue
+                conn.executemany(
+                    "UPDATE job_items SET status = ?, lease_token = ?, lease_until = ? WHERE job_id = ? AND position = ?",
+                    ((ITEM_CLAIMED, lease_token, now + self.lease_seconds, job_id, position) for position, _ in items),
+                )
+                conn.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                    (STATUS_RUNNING, now, job_id, STATUS_QUEUED),
+                )
+                conn.execute("COMMIT")
+                items = [(position, json.loads(identifier)) for position, identifier in items]
+                return job_id, info_type, bool(incremental), lease_token, items
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return None
+
+    def _record_chunk(self, job_id, lease_token, positions, outcomes):
+        """
+        Stores the outcomes of a processed chunk and advances the job's counters.
+        Items whose lease was taken over by another worker in the meantime are skipped,
+        so no identifier is ever counted twice.
+        """
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            completed = 0
+            failed_count = 0
+            for position, (records, failed) in zip(positions, outcomes):
+                updated = conn.execute(
+                    "UPDATE job_items SET status = ?, lease_token = NULL, lease_until = NULL "
+                    "WHERE job_id = ? AND position = ? AND status = ? AND lease_token = ?",
+                    (ITEM_DONE, job_id, position, ITEM_CLAIMED, lease_token),
+                ).rowcount
+                if not updated:
+                    continue
+                conn.executemany(
+                    "INSERT OR IGNORE INTO job_results (job_id, position, seq, failed, record) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (job_id, position, seq, int(failed), json.dumps(record, ensure_ascii=False, default=str))
+                        for seq, record in enumerate(records)
+                    ),
+                )
+                completed += 1
+                if failed:
+                    failed_count += 1
+            conn.execute(
+                "UPDATE jobs SET completed = completed + ?, failed = failed + ?, updated_at = ? WHERE id = ?",
+                (completed, failed_count, now, job_id),
+            )
+            remaining = conn.execute(
+                "SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status != ?", (job_id, ITEM_DONE)
+            ).fetchone()[0]
+            if not remaining:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?", (STATUS_COMPLETED, now, job_id)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def run_once(self):
+        """Claims and processes one chunk. Returns False when there was nothing to do."""
+        claim = self._claim()
+        if claim is None:
+            return False
+        job_id, info_type, incremental, lease_token, items = claim
+        positions = [position for position, _ in items]
+        outcomes = fetch_batch(info_type, [identifier for _, identifier in items], incremental=incremental)
+        self._record_chunk(job_id, lease_token, positions, outcomes)
+        return True
+
+    def _work_loop(self):
+        while True:
+            try:
+                if self.run_once():
+                    continue
+            except Exception:
+                traceback.print_exc() # Print full traceback to console for debugging
+                # Unfinished items stay claimed and are retried once their lease expires
+            self._wakeup.wait(JOB_POLL_INTERVAL)
+            self._wakeup.clear()
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Returns the process-wide job queue, opening its database on first use."""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue(JOBS_DB_PATH)
+    return _job_queue
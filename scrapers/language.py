@@ -0,0 +1,273 @@
+# scrapers/language.py
+import os
+import time
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from . import metrics
+from . import tracing
+
+# --- Configuration (Language detection, overridable from the environment) ---
+LANGDETECT_PROCESSES = int(os.getenv("LANGDETECT_PROCESSES", str(min(4, os.cpu_count() or 1)))) # 0 detects in-thread
+LANGDETECT_POOL_MIN_TEXTS = int(os.getenv("LANGDETECT_POOL_MIN_TEXTS", "32")) # Smaller batches are detected in-thread
+LANGDETECT_CACHE_SIZE = int(os.getenv("LANGDETECT_CACHE_SIZE", "50000")) # Memoized texts per process
+LANGDETECT_MIN_LETTERS = int(os.getenv("LANGDETECT_MIN_LETTERS", "3")) # Shorter texts aren't worth a guess
+
+NOT_AVAILABLE = "N/A" # No text to classify
+UNDETECTABLE = "Undetectable" # Text present but no language could be determined
+
+# Scripts used by a single language: text written only in one of them is classified without langdetect.
+# (first code point, last code point, langdetect language code)
+_SINGLE_LANGUAGE_SCRIPTS = (
+    (0x0370, 0x03FF, "el"), # Greek
+    (0x0530, 0x058F, "hy"), # Armenian
+    (0x0590, 0x05FF, "he"), # Hebrew
+    (0x0E00, 0x0E7F, "th"), # Thai
+    (0x10A0, 0x10FF, "ka"), # Georgian
+    (0x3040, 0x30FF, "ja"), # Hiragana and Katakana
+    (0xAC00, 0xD7AF, "ko"), # Hangul syllables
+)
+
+
+LANGDETECT_SECONDS = metrics.histogram(
+    "scraper_langdetect_duration_seconds", "Time spent running langdetect on a batch of texts (memo and fast path excluded).",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+
+def _script_language(char):
+    code_point = ord(char)
+    for first, last, language in _SINGLE_LANGUAGE_SCRIPTS:
+        if first <= code_point <= last:
+            return language
+    return None
+
+
+def _fast_path(text):
+    """
+    Classifies text that doesn't need langdetect: empty or placeholder text, text with too few
+    letters (emoji, numbers, punctuation, a short tag) and text written in a script only one
+    language uses. Returns None when the text has to go through langdetect.
+    """
+    if not text or text == NOT_AVAILABLE or not text.strip():
+        return NOT_AVAILABLE
+    letters = [char for char in text if char.isalpha()]
+    if len(letters) < LANGDETECT_MIN_LETTERS:
+        return UNDETECTABLE
+    language = _script_language(letters[0]) if letters else None
+    if language is not None and all(_script_language(char) == language for char in letters):
+        return language
+    return None
+
+
+_langdetect = None
+
+
+def _load_langdetect():
+    """
+    Imports langdetect and loads its language profiles on first use; both are slow and most
+    of a worker's requests (profiles, TikTok videos) never need them.
+    """
+    global _langdetect
+    if _langdetect is None:
+        import langdetect # Import language detection library
+        from langdetect.detector_factory import init_factory
+        # Set seed for langdetect to ensure consistent results (optional but good for reproducibility)
+        langdetect.DetectorFactory.seed = 0
+        init_factory()
+        _langdetect = langdetect
+    return _langdetect
+
+
+def _detect(text):
+    """Runs langdetect on one text. Also the function executed in pool processes."""
+    try:
+        return _load_langdetect().detect(text)
+    except Exception:
+        return UNDETECTABLE
+
+
+def _detect_many(texts):
+    return [_detect(text) for text in texts]
+
+
+def _text_key(text):
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+class LanguageDetector:
+    """
+    Language detection with a per-process memo keyed by a hash of the text, a fast path for
+    text langdetect can't or needn't classify, and langdetect for the rest. A single caption
+    or a short page is detected in-thread (a pool round-trip costs as much as the detection);
+    batches of at least 'pool_min_texts' texts go to a process pool, so the CPU-heavy
+    detection runs outside the web worker's GIL and in parallel.
+    """
+    def __init__(self, processes=LANGDETECT_PROCESSES, cache_size=LANGDETECT_CACHE_SIZE,
+                 pool_min_texts=LANGDETECT_POOL_MIN_TEXTS):
+        self.processes = processes
+        self.pool_min_texts = pool_min_texts
+        self.cache_size = cache_size
+        self._memo = OrderedDict() # text hash -> language, in LRU order
+        self._memo_lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        # Sharded like the registered metrics, so every batch worker thread counts without a lock;
+        # not registered itself (scraper_langdetect_texts_total reads it through the properties below)
+        texts = metrics.Metric("langdetect_texts", metrics.COUNTER, "Texts classified, by how.", ("path",))
+        self._hits = texts.labels("memo")
+        self._misses = texts.labels("langdetect")
+        self._fast_path = texts.labels("fast_path")
+
+    @property
+    def hits(self):
+        return self._hits.value()
+
+    @property
+    def misses(self):
+        return self._misses.value()
+
+    @property
+    def fast_path(self):
+        return self._fast_path.value()
+
+    def _get_pool(self):
+        """Returns this process's detection pool, creating it on first use (e.g. after a gunicorn fork)."""
+        if self.processes <= 0:
+            return None
+        if self._pool_pid != os.getpid():
+            with self._pool_lock:
+                if self._pool_pid != os.getpid():
+                    # forkserver/spawn children don't inherit the web worker's threads and locks
+                    if "forkserver" in multiprocessing.get_all_start_methods():
+                        context = multiprocessing.get_context("forkserver")
+                        # The fork server loads the profiles once and pool processes fork from it
+                        # warm (only takes effect if this process hasn't started its fork server yet)
+                        context.set_forkserver_preload(["__main__", "scrapers._langdetect_preload"])
+                    else:
+                        context = multiprocessing.get_context("spawn")
+                    # Spawned processes load the profiles once at startup rather than on their first texts
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.processes, mp_context=context, initializer=_load_langdetect
+                    )
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def _memo_get(self, key):
+        with self._memo_lock:
+            language = self._memo.get(key)
+            if language is not None:
+                self._memo.move_to_end(key)
+        if language is not None:
+            self._hits.inc()
+        return language
+
+    def _memo_set(self, key, language):
+        with self._memo_lock:
+            self._memo[key] = language
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.cache_size:
+                self._memo.popitem(last=False)
+
+    def _run(self, texts):
+        """Classifies texts with langdetect, in the process pool when one is configured and the batch is big enough."""
+        if len(texts) < self.pool_min_texts:
+            return _detect_many(texts)
+        pool = self._get_pool()
+        if pool is None:
+            return _detect_many(texts)
+        # Split into one chunk per process so every process gets a share of the page
+        chunk_size = max(1, -(-len(texts) // self.processes))
+        chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+        try:
+            languages = []
+            for chunk_languages in pool.map(_detect_many, chunks):
+                languages.extend(chunk_languages)
+            return languages
+        except BrokenProcessPool:
+            print("Warning: Language detection pool died; detecting in-process instead.")
+            with self._pool_lock:
+                pool.shutdown(wait=False)
+                self._pool_pid = None # Recreated on the next call
+            return _detect_many(texts)
+
+    def detect_many(self, texts):
+        """
+        Returns the language code of each text, aligned with 'texts': "N/A" for missing or
+        empty text and "Undetectable" when no language can be determined.
+        """
+        languages = [None] * len(texts)
+        pending = OrderedDict() # text hash -> (text, [positions])
+        fast_path = 0
+        for position, text in enumerate(texts):
+            language = _fast_path(text)
+            if language is not None:
+                fast_path += 1
+                languages[position] = language
+                continue
+            key = _text_key(text)
+            language = self._memo_get(key)
+            if language is not None:
+                languages[position] = language
+                continue
+            pending.setdefault(key, (text, []))[1].append(position)
+        if fast_path:
+            self._fast_path.inc(fast_path)
+
+        if pending:
+            self._misses.inc(len(pending))
+            keys = list(pending)
+            start = time.perf_counter()
+            with tracing.span("langdetect", texts=len(keys)):
+                detected = self._run([pending[key][0] for key in keys])
+            LANGDETECT_SECONDS.observe(time.perf_counter() - start)
+            for key, language in zip(keys, detected):
+                self._memo_set(key, language)
+                for position in pending[key][1]:
+                    languages[position] = language
+        return languages
+
+    def detect(self, text):
+        """Returns the language code of a single text (see detect_many)."""
+        return self.detect_many([text])[0]
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "fast_path": self.fast_path,
+            "entries": len(self._memo),
+        }
+
+
+language_detector = LanguageDetector()
+
+metrics.collected(
+    "scraper_langdetect_texts_total", metrics.COUNTER,
+    "Texts classified, by how: fast_path (no langdetect needed), memo (seen before) or langdetect.",
+    ("path",), lambda: [(("fast_path",), language_detector.fast_path), (("memo",), language_detector.hits),
+                        (("langdetect",), language_detector.misses)])
+
+
+def warm_up():
+    """
+    Loads langdetect's profiles now instead of on the first detection (e.g. in the gunicorn
+    master before forking, so in-thread detection in every worker shares them). The process
+    pool is not started here; each worker starts its own, whose fork server loads the profiles
+    once for all of its processes.
+    """
+    _load_langdetect()
+
+
+def detect_language(text):
+    """Returns the language code of text, "N/A" for no text, or "Undetectable"."""
+    return language_detector.detect(text)
+
+
+def detect_languages(texts):
+    """Returns the language code of each text in a batch (classified in parallel)."""
+    return language_detector.detect_many(texts)
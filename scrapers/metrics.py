@@ -0,0 +1,385 @@
+# scrapers/metrics.py
+import os
+import json
+import time
+import bisect
+import weakref
+import threading
+
+# --- Configuration (Metrics, overridable from the environment) ---
+# Directory where each worker process publishes its metrics so /metrics, served by any one
+# worker, reports totals for all of them. gunicorn.conf.py sets it; empty means this process only.
+METRICS_DIR = os.getenv("SCRAPER_METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("SCRAPER_METRICS_FLUSH_INTERVAL", "5")) # Seconds between publishes
+
+# Latency buckets (seconds) for upstream calls; wide enough for slow RapidAPI providers
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# How gauges from several processes are combined: summed, or kept apart with a 'pid' label.
+# Either way only live processes count; counters and histograms of exited workers are kept.
+LIVESUM = "livesum"
+LIVEALL = "liveall"
+
+
+class _Shard:
+    """One thread's private slice of every counter, gauge and histogram it has touched."""
+    __slots__ = ("values", "histograms")
+
+    def __init__(self):
+        self.values = {} # child -> number
+        self.histograms = {} # child -> [count per bucket..., count above the last bucket, sum]
+
+
+_local = threading.local()
+_shards = [] # (weak reference to the owning thread, shard) for threads that may still be running
+_retired = _Shard() # Totals of threads that have finished
+_shards_lock = threading.Lock()
+
+
+def _retire_finished_shards():
+    """Folds the shards of finished threads into _retired, so short-lived threads don't pile up. Call with _shards_lock held."""
+    running = []
+    for thread_ref, shard in _shards:
+        thread = thread_ref()
+        if thread is not None and thread.is_alive():
+            running.append((thread_ref, shard))
+            continue
+        for child, value in shard.values.items():
+            _retired.values[child] = _retired.values.get(child, 0) + value
+        for child, counts in shard.histograms.items():
+            total = _retired.histograms.get(child)
+            _retired.histograms[child] = list(counts) if total is None else [a + b for a, b in zip(total, counts)]
+    _shards[:] = running
+
+
+def _shard():
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = _Shard()
+        with _shards_lock:
+            _retire_finished_shards()
+            _shards.append((weakref.ref(threading.current_thread()), shard))
+        _local.shard = shard
+    return shard
+
+
+def _all_shards():
+    """Returns the retired totals and every running thread's shard."""
+    with _shards_lock:
+        _retire_finished_shards()
+        return [_retired] + [shard for _, shard in _shards]
+
+
+class _Child:
+    """A metric with its label values bound. Updates only touch the calling thread's shard, so they take no lock."""
+    __slots__ = ("metric", "label_values")
+
+    def __init__(self, metric, label_values):
+        self.metric = metric
+        self.label_values = label_values
+
+    def inc(self, amount=1):
+        values = _shard().values
+        values[self] = values.get(self, 0) + amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def value(self):
+        """Returns the current total of a counter or gauge child, summed over all threads."""
+        return sum(shard.values.get(self, 0) for shard in _all_shards())
+
+    def observe(self, value):
+        histograms = _shard().histograms
+        counts = histograms.get(self)
+        if counts is None:
+            counts = histograms[self] = [0] * (len(self.metric.buckets) + 2)
+        counts[bisect.bisect_left(self.metric.buckets, value)] += 1
+        counts[-1] += value
+
+
+class Metric:
+    """
+    A named metric with fixed label names. Counters and histograms only go up; gauges created
+    here are up/down counts (e.g. calls in flight). Use labels(...) to get the child to update.
+    """
+    def __init__(self, name, kind, help_text, labelnames=(), buckets=DEFAULT_BUCKETS, mode=LIVESUM):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) if kind == HISTOGRAM else ()
+        self.mode = mode
+        self._children = {}
+        self._children_lock = threading.Lock()
+
+    def labels(self, *label_values):
+        label_values = tuple(str(value) for value in label_values)
+        child = self._children.get(label_values)
+        if child is None:
+            with self._children_lock:
+                child = self._children.setdefault(label_values, _Child(self, label_values))
+        return child
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+
+class CollectedMetric:
+    """
+    A metric whose samples are read at scrape time by calling 'collect', which returns a list
+    of (label values, value). Used for state that already lives elsewhere (key scheduler,
+    caches, circuit breakers), so the hot path pays nothing for it.
+    """
+    def __init__(self, name, kind, help_text, labelnames, collect, mode=LIVESUM):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = ()
+        self.mode = mode
+        self.collect = collect
+
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _register(metric):
+    with _metrics_lock:
+        existing = _metrics.get(metric.name)
+        if existing is not None:
+            return existing # Re-imported module; keep the instance already being updated
+        _metrics[metric.name] = metric
+        return metric
+
+
+def counter(name, help_text, labelnames=()):
+    return _register(Metric(name, COUNTER, help_text, labelnames))
+
+
+def gauge(name, help_text, labelnames=(), mode=LIVESUM):
+    return _register(Metric(name, GAUGE, help_text, labelnames, mode=mode))
+
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Metric(name, HISTOGRAM, help_text, labelnames, buckets=buckets))
+
+
+def collected(name, kind, help_text, labelnames, collect, mode=LIVESUM):
+    return _register(CollectedMetric(name, kind, help_text, labelnames, collect, mode=mode))
+
+
+def snapshot():
+    """
+    Returns this process's metrics as a JSON-serializable dict: every thread's shard summed,
+    plus the collected metrics. This is what each worker publishes to METRICS_DIR.
+    Metrics that were created but never registered (private tallies) are left out.
+    """
+    shards = _all_shards()
+    with _metrics_lock:
+        metrics = list(_metrics.values())
+    registered = set(metrics)
+
+    values = {}
+    histograms = {}
+    for shard in shards:
+        # Copies taken in one step each, as the owning threads keep writing
+        for child, value in list(shard.values.items()):
+            values[child] = values.get(child, 0) + value
+        for child, counts in list(shard.histograms.items()):
+            counts = list(counts)
+            total = histograms.get(child)
+            histograms[child] = counts if total is None else [a + b for a, b in zip(total, counts)]
+
+    samples = {metric.name: [] for metric in metrics}
+    for child, value in values.items():
+        if child.metric in registered:
+            samples[child.metric.name].append([list(child.label_values), value])
+    for child, counts in histograms.items():
+        if child.metric in registered:
+            samples[child.metric.name].append([list(child.label_values), counts])
+    for metric in metrics:
+        if isinstance(metric, CollectedMetric):
+            try:
+                collected_samples = metric.collect()
+            except Exception as e:
+                print(f"Warning: Could not collect metric {metric.name}: {e}")
+                continue
+            samples[metric.name].extend([[str(value) for value in labels], value] for labels, value in collected_samples)
+
+    return {
+        "pid": os.getpid(),
+        "metrics": {
+            metric.name: {
+                "kind": metric.kind,
+                "help": metric.help,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(metric.buckets),
+                "mode": metric.mode,
+                "samples": samples[metric.name],
+            }
+            for metric in metrics
+        },
+    }
+
+
+def _snapshot_path(pid):
+    return os.path.join(METRICS_DIR, f"metrics-{pid}.json")
+
+
+def _write_snapshot(process_snapshot):
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = _snapshot_path(process_snapshot["pid"])
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as snapshot_file:
+        json.dump(process_snapshot, snapshot_file)
+    os.replace(temporary_path, path) # Atomic, so readers never see half a file
+
+
+def publish():
+    """Writes this process's snapshot to METRICS_DIR."""
+    if METRICS_DIR:
+        _write_snapshot(snapshot())
+
+
+_publisher_pid = None
+_publisher_lock = threading.Lock()
+
+
+def _publish_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        try:
+            publish()
+        except Exception as e:
+            print(f"Warning: Could not publish metrics: {e}")
+
+
+def ensure_publisher():
+    """Starts this process's background publisher on first use (e.g. after a gunicorn fork)."""
+    global _publisher_pid
+    if not METRICS_DIR or _publisher_pid == os.getpid():
+        return
+    with _publisher_lock:
+        if _publisher_pid == os.getpid():
+            return
+        threading.Thread(target=_publish_loop, name="metrics-publisher", daemon=True).start()
+        _publisher_pid = os.getpid()
+
+
+def clear_published():
+    """Removes every published snapshot (at server start, so totals begin from zero)."""
+    if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+        return
+    for name in os.listdir(METRICS_DIR):
+        if name.startswith("metrics-"):
+            os.remove(os.path.join(METRICS_DIR, name))
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _load_snapshots():
+    """Returns the snapshots of every process: this one's taken now, the others' as last published."""
+    own = snapshot()
+    if not METRICS_DIR:
+        return [own]
+    _write_snapshot(own)
+    snapshots = [own]
+    own_name = os.path.basename(_snapshot_path(own["pid"]))
+    for name in os.listdir(METRICS_DIR):
+        if not name.startswith("metrics-") or not name.endswith(".json") or name == own_name:
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, name)) as snapshot_file:
+                snapshots.append(json.load(snapshot_file))
+        except (OSError, ValueError):
+            continue # Being replaced or removed right now
+    return snapshots
+
+
+def _merge(snapshots):
+    """
+    Combines per-process snapshots: counters and histograms are summed over every process
+    that ever published, gauges over live processes only (or kept per pid, see LIVEALL).
+    Returns {name: (metadata, {label values: value})}.
+    """
+    merged = {}
+    for process_snapshot in snapshots:
+        pid = process_snapshot["pid"]
+        alive = pid == os.getpid() or _is_alive(pid)
+        for name, metric in process_snapshot["metrics"].items():
+            entry = merged.get(name)
+            if entry is None:
+                entry = merged[name] = (metric, {})
+            meta, samples = entry
+            if metric["kind"] == GAUGE:
+                if not alive:
+                    continue
+                if metric["mode"] == LIVEALL:
+                    meta = dict(metric, labelnames=metric["labelnames"] + ["pid"])
+                    merged[name] = (meta, samples)
+            for label_values, value in metric["samples"]:
+                if metric["kind"] == GAUGE and metric["mode"] == LIVEALL:
+                    label_values = label_values + [str(pid)]
+                key = tuple(label_values)
+                if metric["kind"] == HISTOGRAM:
+                    total = samples.get(key)
+                    samples[key] = value if total is None else [a + b for a, b in zip(total, value)]
+                else:
+                    samples[key] = samples.get(key, 0) + value
+    return merged
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, label_values, extra=()):
+    pairs = list(zip(labelnames, label_values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_number(value):
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+
+def render():
+    """Returns every metric, totalled across worker processes, in the Prometheus text format."""
+    lines = []
+    for name, (meta, samples) in sorted(_merge(_load_snapshots()).items()):
+        lines.append(f"# HELP {name} {meta['help']}")
+        lines.append(f"# TYPE {name} {meta['kind']}")
+        labelnames = meta["labelnames"]
+        for label_values, value in sorted(samples.items()):
+            if meta["kind"] != HISTOGRAM:
+                lines.append(f"{name}{_format_labels(labelnames, label_values)} {_format_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(meta["buckets"], value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labelnames, label_values, [('le', repr(float(bound)))])} {cumulative}")
+            cumulative += value[-2]
+            lines.append(f"{name}_bucket{_format_labels(labelnames, label_values, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, label_values)} {_format_number(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(labelnames, label_values)} {cumulative}")
+    return "\n".join(lines) + "\n"
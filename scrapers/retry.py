@@ -0,0 +1,113 @@
+# scrapers/retry.py
+import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+from .http_pool import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+# --- Configuration (Retry policy, overridable from the environment) ---
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4")) # Attempts per identifier (at least one per API key)
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5")) # Backoff ceiling of the first retry, doubled per attempt
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "8")) # Cap on the backoff ceiling
+IDENTIFIER_DEADLINE = float(os.getenv("IDENTIFIER_DEADLINE", "20")) # Seconds one identifier may take, retries included
+
+# Shortest socket timeout handed out near a deadline (0 would make the socket non-blocking)
+_MIN_TIMEOUT = 0.05
+
+
+class Deadline:
+    """A point in time by which some work must finish, measured on the monotonic clock."""
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def earliest(self, other):
+        """Returns whichever of the two deadlines comes first (other may be None)."""
+        if other is None or self.expires_at <= other.expires_at:
+            return self
+        return other
+
+
+_local = threading.local()
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """
+    Makes 'deadline' apply to every fetch run by this thread inside the block, on top of
+    (never extending) any deadline already in scope. A deadline of None changes nothing.
+    """
+    previous = getattr(_local, "deadline", None)
+    if deadline is not None:
+        _local.deadline = deadline.earliest(previous)
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+def current_deadline():
+    """Returns the deadline set by the innermost deadline_scope of this thread, or None."""
+    return getattr(_local, "deadline", None)
+
+
+def is_retryable_status(status):
+    """429 and 5xx answers are worth retrying after a pause; other errors won't change."""
+    return status == 429 or status >= 500
+
+
+class RetryPolicy:
+    """
+    How hard to try one identifier: how many attempts, how long to pause between them
+    (capped exponential backoff with full jitter, so retries from many threads don't land
+    on the upstream in lockstep), the connect/read socket timeouts of each attempt, and
+    the deadline the whole thing must finish by.
+    """
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY,
+                 identifier_deadline=IDENTIFIER_DEADLINE, connect_timeout=HTTP_CONNECT_TIMEOUT,
+                 read_timeout=HTTP_READ_TIMEOUT):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.identifier_deadline = identifier_deadline
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def start_deadline(self):
+        """Returns the deadline of a new identifier, cut short by any deadline in scope."""
+        return Deadline(self.identifier_deadline).earliest(current_deadline())
+
+    def backoff(self, retry_number):
+        """Returns the pause before retry number 'retry_number' (1 for the first retry)."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (retry_number - 1)))
+        return random.uniform(0, ceiling)
+
+    def sleep(self, retry_number, deadline):
+        """
+        Pauses before a retry. Returns False, without sleeping, if the deadline would pass
+        before the retry could even start.
+        """
+        delay = self.backoff(retry_number)
+        if delay >= deadline.remaining():
+            return False
+        time.sleep(delay)
+        return True
+
+    def timeouts(self, deadline):
+        """
+        Returns the (connect, read) socket timeouts of the next attempt, shortened so that a
+        single stalled connect or read can't run past the deadline.
+        """
+        remaining = max(_MIN_TIMEOUT, deadline.remaining())
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
@@ -0,0 +1,74 @@
+# scrapers/singleflight.py
+import threading
+
+from . import tracing
+
+
+class WaitTimeout(Exception):
+    """Raised to a waiter whose timeout ran out before the call it was waiting for finished."""
+
+
+class _InFlightCall:
+    """A fetch that is currently running, and the outcome its waiters will share."""
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one: the first caller runs the
+    function, everyone who asks for the key while it is running waits and gets the same
+    result (or the same exception). Nothing is remembered once the call completes;
+    caching finished results is the job of the cache layer.
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0 # Number of callers that were served by someone else's fetch
+
+    def do(self, key, function, copy_result=None, timeout=None):
+        """
+        Runs function() unless a call for key is already in flight, in which case this waits
+        for it, for up to 'timeout' seconds if given (WaitTimeout when it runs out; the call
+        carries on for its other callers). copy_result, if given, is applied to the shared
+        result for each waiter so callers don't end up holding the same mutable object.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _InFlightCall()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            with tracing.span("singleflight.wait"):
+                if not call.done.wait(timeout):
+                    raise WaitTimeout(key)
+            if call.error is not None:
+                raise call.error
+            return copy_result(call.result) if copy_result else call.result
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        """Returns the number of distinct keys currently being fetched."""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,494 @@
+# scrapers/snapshots.py
+import os
+import re
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from .identifiers import parse_identifier, IdentifierError
+
+# --- Configuration (Metric snapshots, overridable from the environment) ---
+SNAPSHOTS_ENABLED = os.getenv("SCRAPER_SNAPSHOTS_ENABLED", "0") == "1" # Record a snapshot of every fresh fetch (opt-in)
+SNAPSHOTS_DB_PATH = os.getenv("SCRAPER_SNAPSHOTS_DB_PATH", os.path.join("instance", "snapshots.db"))
+SNAPSHOT_KEYFRAME_INTERVAL = int(os.getenv("SCRAPER_SNAPSHOT_KEYFRAME_INTERVAL", "32")) # Rows between full (non-delta) rows
+SNAPSHOT_QUEUE_SIZE = int(os.getenv("SCRAPER_SNAPSHOT_QUEUE_SIZE", "10000")) # Rows waiting for the writer; more are dropped
+SNAPSHOT_BATCH_SIZE = 500 # Rows the writer stores per transaction
+
+# Metrics kept per info type: metric name -> the record field it is read from. Rows store values
+# by position in this order, so new metrics must be added at the end of a list, never in between.
+SNAPSHOT_METRICS = {
+    "instagram_profile": {"followers": "Followers", "following": "Following", "posts": "Posts Count"},
+    "tiktok_profile": {
+        "followers": "Profile Followers", "following": "Following Count",
+        "likes": "Total Likes Received", "posts": "Posts Count",
+    },
+    "youtube_profile": {"subscribers": "Subscribers", "videos": "Total Videos", "views": "Total Channel Views"},
+    "snapchat_profile": {"followers": "Followers"},
+    "instagram_post": {"likes": "Likes", "comments": "Comments", "shares": "Shares", "views": "Video Views"},
+    "tiktok_post": {"views": "Views", "likes": "Likes", "comments": "Comments", "shares": "Shares"},
+    "youtube_post": {"views": "Views", "likes": "Likes", "comments": "Comments"},
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot_series (
+    id INTEGER PRIMARY KEY,
+    info_type TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    last_at INTEGER NOT NULL,
+    base BLOB NOT NULL,
+    since_keyframe INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    UNIQUE (info_type, identifier)
+);
+CREATE TABLE IF NOT EXISTS snapshot_points (
+    series_id INTEGER NOT NULL,
+    at INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (series_id, at)
+) WITHOUT ROWID;
+"""
+
+# "1,234", "12.5K", "3M", "1.2B" and the like, as some APIs return counts
+_COUNT_PATTERN = re.compile(r"^([0-9]+(?:\.[0-9]+)?)\s*([KMB]?)$", re.IGNORECASE)
+_COUNT_SUFFIXES = {"": 1, "K": 1000, "M": 1000000, "B": 1000000000}
+
+
+def parse_count(value):
+    """
+    Returns a count from a record field as an int: numbers as they are, numeric strings with
+    thousands separators or a K/M/B suffix converted. None for "N/A" and anything else.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    if not isinstance(value, str):
+        return None
+    match = _COUNT_PATTERN.match(value.strip().replace(",", "").replace("_", ""))
+    if match is None:
+        return None
+    number, suffix = match.groups()
+    return int(round(float(number) * _COUNT_SUFFIXES[suffix.upper()]))
+
+
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _zigzag(value):
+    # Small negative deltas (an unfollow or two) stay one byte
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+def encode_row(values, base, keyframe):
+    """
+    Encodes one row of metric values (None where a metric is missing) as varints: a header
+    with a keyframe bit and a presence bit per metric, then each present value, zigzagged.
+    A keyframe holds the values themselves; other rows hold the change from 'base', the
+    metrics' previous values (a metric without one is stored whole).
+    Returns (row bytes, the base for the next row).
+    """
+    header = 1 if keyframe else 0
+    for position, value in enumerate(values):
+        if value is not None:
+            header |= 1 << (position + 1)
+    out = bytearray()
+    _write_varint(out, header)
+    next_base = [None] * len(values) if keyframe else list(base)
+    for position, value in enumerate(values):
+        if value is None:
+            continue
+        previous = None if keyframe else base[position]
+        _write_varint(out, _zigzag(value if previous is None else value - previous))
+        next_base[position] = value
+    return bytes(out), next_base
+
+
+def decode_row(data, base, metric_count):
+    """Reverses encode_row. Returns (keyframe, values, the base for the next row)."""
+    header, offset = _read_varint(data, 0)
+    keyframe = bool(header & 1)
+    values = [None] * metric_count
+    next_base = [None] * metric_count if keyframe else list(base)
+    for position in range(metric_count):
+        if not header & (1 << (position + 1)):
+            continue
+        stored, offset = _read_varint(data, offset)
+        stored = _unzigzag(stored)
+        previous = None if keyframe else next_base[position]
+        values[position] = stored if previous is None else previous + stored
+        next_base[position] = values[position]
+    return keyframe, values, next_base
+
+
+def _encode_base(base):
+    out = bytearray()
+    for value in base:
+        # 0 marks a missing value, so present ones are shifted up by one
+        _write_varint(out, 0 if value is None else _zigzag(value) + 1)
+    return bytes(out)
+
+
+def _decode_base(data, metric_count):
+    base = []
+    offset = 0
+    while offset < len(data):
+        stored, offset = _read_varint(data, offset)
+        base.append(None if stored == 0 else _unzigzag(stored - 1))
+    # Metrics added to SNAPSHOT_METRICS after the series started have no previous value yet
+    return (base + [None] * metric_count)[:metric_count]
+
+
+def series_identifier(parsed):
+    """Returns the key snapshots of a parsed identifier are stored under (the kind keeps handles and ids apart)."""
+    return f"{parsed.kind}:{parsed.canonical_id}"
+
+
+class SnapshotStore:
+    """
+    Time series of the numeric metrics of profiles and posts, one series per identifier,
+    backed by SQLite so every gunicorn worker (and python -m scrapers) adds to the same history.
+
+    Rows are delta-encoded: each holds the change since the previous row as small varints,
+    so a daily snapshot of a profile takes a few bytes. Every 'keyframe_interval' rows one
+    holds the full values; a range query starts decoding at the keyframe before its start,
+    so it reads at most that many rows more than the range itself, however long the history.
+    """
+    def __init__(self, path, keyframe_interval=SNAPSHOT_KEYFRAME_INTERVAL):
+        self.path = path
+        self.keyframe_interval = max(1, keyframe_interval)
+        self._local = threading.local() # One connection per thread; sqlite3 connections aren't shareable
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited across fork() must not be reused by the child
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record(self, info_type, identifier, values, at=None):
+        """
+        Appends a row of metric values (ordered as in SNAPSHOT_METRICS, None where missing) to
+        a series, timestamped 'at' (Unix seconds, now by default). A row at or before the
+        series' latest one is dropped: one snapshot per second is plenty, and rows must stay
+        in order for the deltas to add up. Returns True if the row was stored.
+        """
+        return self.record_many([(info_type, identifier, values, time.time() if at is None else at)]) == 1
+
+    def record_many(self, rows):
+        """
+        Appends (info_type, identifier, values, at) rows, in order, in a single transaction
+        (see record()). Returns the number stored.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stored = sum(self._append(conn, *row) for row in rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return stored
+
+    def _append(self, conn, info_type, identifier, values, at):
+        at = int(at)
+        metric_count = len(values)
+        row = conn.execute(
+            "SELECT id, last_at, base, since_keyframe FROM snapshot_series WHERE info_type = ? AND identifier = ?",
+            (info_type, identifier),
+        ).fetchone()
+        if row is None:
+            series_id, base, keyframe = None, [None] * metric_count, True
+        else:
+            series_id, last_at, stored_base, since_keyframe = row
+            if at <= last_at:
+                return False
+            base = _decode_base(stored_base, metric_count)
+            keyframe = since_keyframe + 1 >= self.keyframe_interval
+
+        data, next_base = encode_row(values, base, keyframe)
+        if series_id is None:
+            series_id = conn.execute(
+                "INSERT INTO snapshot_series (info_type, identifier, last_at, base, since_keyframe, points) "
+                "VALUES (?, ?, ?, ?, 0, 1)",
+                (info_type, identifier, at, _encode_base(next_base)),
+            ).lastrowid
+        else:
+            conn.execute(
+                "UPDATE snapshot_series SET last_at = ?, base = ?, points = points + 1, "
+                "since_keyframe = CASE WHEN ? THEN 0 ELSE since_keyframe + 1 END WHERE id = ?",
+                (at, _encode_base(next_base), keyframe, series_id),
+            )
+        conn.execute("INSERT INTO snapshot_points (series_id, at, data) VALUES (?, ?, ?)", (series_id, at, data))
+        return True
+
+    def series_info(self, info_type, identifier):
+        """Returns {"points", "last_at"} for a series, or None if nothing was recorded for it."""
+        row = self._connection().execute(
+            "SELECT points, last_at FROM snapshot_series WHERE info_type = ? AND identifier = ?", (info_type, identifier)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"points": row[0], "last_at": row[1]}
+
+    def query(self, info_type, identifier, metric_count, start=None, end=None):
+        """
+        Returns [(at, values), ...] for the rows of a series between 'start' and 'end'
+        (Unix seconds, inclusive; open-ended if None), oldest first.
+        """
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT id FROM snapshot_series WHERE info_type = ? AND identifier = ?", (info_type, identifier)
+        ).fetchone()
+        if row is None:
+            return []
+        series_id = row[0]
+        start = int(start) if start is not None else None
+        end = int(end) if end is not None else None
+
+        # Rows before the range, back to the keyframe the first row in range is decoded from
+        lead_in = []
+        if start is not None:
+            for at, data in conn.execute(
+                "SELECT at, data FROM snapshot_points WHERE series_id = ? AND at < ? ORDER BY at DESC LIMIT ?",
+                (series_id, start, self.keyframe_interval),
+            ):
+                lead_in.append(data)
+                if _read_varint(data, 0)[0] & 1:
+                    break
+            else:
+                if lead_in:
+                    # Written with a longer keyframe interval; fall back to the whole lead-in
+                    lead_in = [data for (data,) in conn.execute(
+                        "SELECT data FROM snapshot_points WHERE series_id = ? AND at < ? ORDER BY at DESC",
+                        (series_id, start),
+                    )]
+        base = [None] * metric_count
+        for data in reversed(lead_in):
+            _, _, base = decode_row(data, base, metric_count)
+
+        sql = "SELECT at, data FROM snapshot_points WHERE series_id = ?"
+        parameters = [series_id]
+        if start is not None:
+            sql += " AND at >= ?"
+            parameters.append(start)
+        if end is not None:
+            sql += " AND at <= ?"
+            parameters.append(end)
+        points = []
+        for at, data in conn.execute(sql + " ORDER BY at", parameters):
+            _, values, base = decode_row(data, base, metric_count)
+            points.append((at, values))
+        return points
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    """Returns the process-wide snapshot store, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SnapshotStore(SNAPSHOTS_DB_PATH)
+    return _store
+
+
+class SnapshotWriter:
+    """
+    Stores snapshots from a background thread, up to SNAPSHOT_BATCH_SIZE rows per transaction,
+    so a fetch only pays for putting its row on a queue: it never waits on SQLite's write lock,
+    held by one process at a time. Rows queued while a batch is being written go in the next one.
+    When the queue is full (the disk can't keep up), new rows are dropped with a warning.
+    """
+    def __init__(self, store, max_queued=SNAPSHOT_QUEUE_SIZE):
+        self.store = store
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._thread = threading.Thread(target=self._write_loop, name="snapshot-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush, 5.0) # Rows still queued at exit are written, within reason
+
+    def submit(self, info_type, identifier, values, at=None):
+        """Queues a row for SnapshotStore.record_many(). Returns False if it was dropped."""
+        try:
+            self._queue.put_nowait((info_type, identifier, values, time.time() if at is None else at))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                print(f"Warning: Snapshot queue full; {self.dropped} snapshot(s) dropped so far.")
+            return False
+
+    def flush(self, timeout=None):
+        """Waits until every queued row is written, or 'timeout' seconds. Returns True if it was."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _write_loop(self):
+        while True:
+            rows = [self._queue.get()]
+            while len(rows) < SNAPSHOT_BATCH_SIZE:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.store.record_many(rows)
+            except (sqlite3.Error, OSError) as e:
+                print(f"Warning: Could not record {len(rows)} snapshot(s): {e}")
+            finally:
+                for _ in rows:
+                    self._queue.task_done()
+
+
+_writer = None
+_writer_pid = None
+
+
+def get_snapshot_writer():
+    """Returns this process's snapshot writer, starting it on first use (threads don't survive fork())."""
+    global _writer, _writer_pid
+    if _writer_pid != os.getpid():
+        with _store_lock:
+            if _writer_pid != os.getpid():
+                _writer = SnapshotWriter(get_snapshot_store())
+                _writer_pid = os.getpid()
+    return _writer
+
+
+def record_snapshot(info_type, parsed, record):
+    """
+    Queues the metrics of a freshly fetched record (see SNAPSHOT_METRICS) for the background
+    writer. Does nothing for info types without metrics, records without any count or unless
+    SCRAPER_SNAPSHOTS_ENABLED=1. Failures are printed and otherwise ignored: they must not
+    fail the fetch.
+    """
+    metrics = SNAPSHOT_METRICS.get(info_type)
+    if not SNAPSHOTS_ENABLED or metrics is None:
+        return
+    values = [parse_count(record.get(field)) for field in metrics.values()]
+    if all(value is None for value in values):
+        return
+    try:
+        get_snapshot_writer().submit(info_type, series_identifier(parsed), values)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: Could not record a snapshot for {info_type} {parsed.id}: {e}")
+
+
+def parse_time(value):
+    """
+    Returns Unix seconds for a query's time bound: Unix seconds, or an ISO 8601 date or
+    date-time (UTC unless it names an offset). Raises ValueError for anything else.
+    """
+    try:
+        return int(float(value))
+    except ValueError:
+        pass
+    moment = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def _iso(at):
+    return datetime.fromtimestamp(at, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def growth(points, metric_names):
+    """
+    Summarizes each metric over 'points' (as returned by get_history): its first and last
+    values in the range, the change between them, in percent of the first value, and per day.
+    Metrics without any value in the range are left out.
+    """
+    summary = {}
+    for metric in metric_names:
+        present = [(point["at"], point[metric]) for point in points if point.get(metric) is not None]
+        if not present:
+            continue
+        (first_at, first), (last_at, last) = present[0], present[-1]
+        change = last - first
+        days = (last_at - first_at) / 86400
+        summary[metric] = {
+            "first": first,
+            "last": last,
+            "change": change,
+            "change_percent": round(change * 100 / first, 2) if first else None,
+            "per_day": round(change / days, 2) if days > 0 else None,
+        }
+    return summary
+
+
+def get_history(info_type, identifier, start=None, end=None):
+    """
+    Returns the recorded snapshots of an identifier (any spelling the identifier parser
+    accepts) between 'start' and 'end' (Unix seconds, inclusive), with a growth summary:
+    {"info_type", "identifier", "points": [{"at", "time", <metric>: value, ...}], "growth"}.
+    Returns {"error": ...} for info types without snapshots or unparsable identifiers;
+    'points' is empty when nothing was recorded in the range, and None when nothing was ever.
+    """
+    metrics = SNAPSHOT_METRICS.get(info_type)
+    if metrics is None:
+        return {"error": f"No snapshots are kept for '{info_type}'. Use one of: {', '.join(SNAPSHOT_METRICS)}."}
+    try:
+        parsed = parse_identifier(info_type, identifier)
+    except IdentifierError as e:
+        return {"error": str(e)}
+
+    store = get_snapshot_store()
+    key = series_identifier(parsed)
+    metric_names = list(metrics)
+    if store.series_info(info_type, key) is None:
+        points = None
+    else:
+        points = []
+        for at, values in store.query(info_type, key, len(metric_names), start, end):
+            point = {"at": at, "time": _iso(at)}
+            point.update(zip(metric_names, values))
+            points.append(point)
+    return {
+        "info_type": info_type,
+        "identifier": parsed.id,
+        "points": points,
+        "growth": growth(points or [], metric_names),
+    }
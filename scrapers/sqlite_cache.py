@@ -0,0 +1,176 @@
+# scrapers/sqlite_cache.py
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from . import metrics
+
+# --- Configuration (Shared on-disk cache, disabled unless a path is set) ---
+SQLITE_CACHE_PATH = os.getenv("SCRAPER_CACHE_SQLITE_PATH") # e.g. /var/cache/social_media_app/results.db
+SQLITE_CACHE_MAX_BYTES = int(os.getenv("SCRAPER_CACHE_SQLITE_MAX_BYTES", str(256 * 1024 * 1024)))
+SQLITE_CACHE_COMPACT_INTERVAL = float(os.getenv("SCRAPER_CACHE_SQLITE_COMPACT_INTERVAL", "300"))
+
+# Reads only refresh an entry's LRU timestamp when it is older than this, to avoid a write per hit
+_TOUCH_INTERVAL_SECONDS = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at);
+CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at);
+"""
+
+
+class SQLiteCacheStore:
+    """
+    Scraper result cache stored in a SQLite database in WAL mode, so every gunicorn worker
+    on a node reads and writes the same entries and they survive restarts.
+    Expired entries and, above max_bytes, least recently used ones are removed by a
+    background compaction thread.
+    """
+    def __init__(self, path, max_bytes=SQLITE_CACHE_MAX_BYTES, compact_interval=SQLITE_CACHE_COMPACT_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compact_interval = compact_interval
+        self._local = threading.local() # One connection per thread; sqlite3 connections aren't shareable
+        self._compactor = None
+        self._compactor_lock = threading.Lock()
+        self._compactor_pid = None
+        # Sharded like the registered metrics, so lookups from every thread are counted without a lock;
+        # not registered itself (scraper_cache_lookups_total reads it through hits/misses)
+        lookups = metrics.Metric("sqlite_cache_lookups", metrics.COUNTER, "Shared cache lookups by result.", ("result",))
+        self._hits = lookups.labels("hit")
+        self._misses = lookups.labels("miss")
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+
+    @property
+    def hits(self):
+        return self._hits.value()
+
+    @property
+    def misses(self):
+        return self._misses.value()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited across fork() must not be reused by the child
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _ensure_compactor(self):
+        """Starts the compaction thread in this process on first use (e.g. after a gunicorn fork)."""
+        if self._compactor_pid == os.getpid() or not self.compact_interval:
+            return
+        with self._compactor_lock:
+            if self._compactor_pid == os.getpid():
+                return
+            self._compactor = threading.Thread(target=self._compact_loop, name="sqlite-cache-compactor", daemon=True)
+            self._compactor.start()
+            self._compactor_pid = os.getpid()
+
+    def _compact_loop(self):
+        while True:
+            time.sleep(self.compact_interval)
+            try:
+                self.compact()
+            except sqlite3.Error as e:
+                print(f"Warning: SQLite cache compaction failed: {e}")
+
+    def get(self, key):
+        """
+        Returns (value, expires_at) for a live entry, or None if the key is missing or expired.
+        """
+        self._ensure_compactor()
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            self._misses.inc()
+            return None
+        if now - row[2] > _TOUCH_INTERVAL_SECONDS:
+            conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+        self._hits.inc()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, ttl):
+        """Stores value under key for ttl seconds."""
+        self._ensure_compactor()
+        encoded = json.dumps(value, ensure_ascii=False, default=str)
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO results (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, encoded, len(encoded), now + ttl, now),
+        )
+
+    def compact(self):
+        """
+        Deletes expired entries, then least recently used ones until the store fits in max_bytes,
+        and checkpoints the WAL so the database file doesn't keep growing.
+        """
+        conn = self._connection()
+        conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+        total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total_bytes > self.max_bytes:
+            excess = total_bytes - self.max_bytes
+            freed = 0
+            doomed = []
+            for key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed_at"):
+                doomed.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def clear(self):
+        self._connection().execute("DELETE FROM results")
+
+    def stats(self):
+        entries, total_bytes = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / lookups) if lookups else 0.0,
+            "entries": entries,
+            "bytes": total_bytes,
+        }
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_shared_store():
+    """
+    Returns the node-wide SQLite cache store, or None when SCRAPER_CACHE_SQLITE_PATH isn't set.
+    """
+    global _shared_store
+    if not SQLITE_CACHE_PATH:
+        return None
+    if _shared_store is None:
+        with _shared_store_lock:
+            if _shared_store is None:
+                _shared_store = SQLiteCacheStore(SQLITE_CACHE_PATH)
+    return _shared_store
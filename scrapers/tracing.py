@@ -0,0 +1,207 @@
+# scrapers/tracing.py
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+# --- Configuration (Tracing, overridable from the environment) ---
+# Print every span slower than this many milliseconds (e.g. 500); 0 turns the slow-span log off
+TRACE_SLOW_MS = float(os.getenv("SCRAPER_TRACE_SLOW_MS", "0"))
+
+# Span names used around the request lifecycle, outermost first:
+#   fetch              one identifier, cache and retries included (batch.fetch_identifier)
+#   host.wait          waiting for one of the host's BATCH_PER_HOST_CONCURRENCY slots
+#   singleflight.wait  waiting on the same identifier already being fetched by another caller
+#   key.acquire        waiting for an API key's rate limit to allow a call
+#   backoff            the pause before a retry
+#   upstream.request   one attempt against the API (attributes: host, key, status)
+#   http.pool_wait     waiting for a free pooled connection
+#   http.connect       opening a connection: DNS, TCP and TLS
+#   http.tcp_connect   the DNS + TCP part of http.connect (TLS is the rest)
+#   http.send          writing the request
+#   http.ttfb          from the request sent to the response's status line (time to first byte)
+#   http.read          reading the response body
+#   json.decode        parsing the response
+#   records.build      mapping the response to output records, languages included
+#   langdetect         running langdetect on the texts the fast path and memo didn't answer
+#   snapshot.record    queueing a fetched profile's or post's metrics for the snapshot writer
+
+
+class SpanHook:
+    """
+    Receives spans as they start and end. Subclass it, override what you need and register
+    it with add_hook(). Hooks run on the thread doing the work, so they should be quick;
+    an exception in a hook is printed and otherwise ignored.
+    """
+    def on_start(self, span):
+        pass
+
+    def on_end(self, span):
+        pass
+
+
+class Span:
+    """
+    One timed step of a fetch. 'attributes' describe it (host, status, ...), 'parent' is
+    the span it ran inside on the same thread, 'error' the exception class name if it raised.
+    """
+    __slots__ = ("name", "attributes", "parent", "start", "end", "error")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.parent = None
+        self.start = None
+        self.end = None
+        self.error = None
+
+    @property
+    def duration(self):
+        """Seconds the span took (so far, if it hasn't ended)."""
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.parent = getattr(_local, "span", None)
+        _local.span = self
+        self.start = time.perf_counter()
+        for hook in _hooks:
+            _call_hook(hook.on_start, self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end = time.perf_counter()
+        _local.span = self.parent
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        for hook in _hooks:
+            _call_hook(hook.on_end, self)
+        recorder = getattr(_local, "recorder", None)
+        if recorder is not None:
+            recorder.add(self)
+        return False
+
+
+class _NoopSpan:
+    """Stands in for every span while nothing is listening, so tracing costs one check."""
+    __slots__ = ()
+
+    def set_attribute(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+_local = threading.local()
+_hooks = () # Replaced, never mutated, so spans can iterate it without a lock
+_hooks_lock = threading.Lock()
+_recording = 0 # Threads currently inside record_timings()
+
+
+def _call_hook(method, span):
+    try:
+        method(span)
+    except Exception as e:
+        print(f"Warning: Tracing hook {method.__qualname__} failed on span {span.name}: {e}")
+
+
+def span(name, **attributes):
+    """
+    Returns a context manager timing the block as a span called 'name'. While no hook is
+    registered and no thread is recording timings this is a shared no-op object.
+    """
+    if not _hooks and not _recording:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def current_span():
+    """Returns the innermost span running on this thread, or None."""
+    return getattr(_local, "span", None)
+
+
+def add_hook(hook):
+    """Registers a SpanHook for spans started from now on, on every thread. Returns it."""
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + (hook,)
+    return hook
+
+
+def remove_hook(hook):
+    global _hooks
+    with _hooks_lock:
+        _hooks = tuple(registered for registered in _hooks if registered is not hook)
+
+
+class TimingRecorder:
+    """Totals the spans one thread ends inside record_timings(), per span name."""
+    def __init__(self):
+        self.seconds = {} # span name -> total seconds
+        self.counts = {} # span name -> number of spans
+        self.upstream = [] # One entry per upstream.request span, in order
+
+    def add(self, span):
+        self.seconds[span.name] = self.seconds.get(span.name, 0.0) + span.duration
+        self.counts[span.name] = self.counts.get(span.name, 0) + 1
+        if span.name == "upstream.request":
+            attempt = dict(span.attributes, ms=round(span.duration * 1000, 2))
+            if span.error:
+                attempt["error"] = span.error
+            self.upstream.append(attempt)
+
+    def summary(self):
+        """
+        Returns the breakdown attached to debug records: total milliseconds and count per
+        span name (nested spans are included in their parents' time too), the number of
+        upstream attempts and the key, status and duration of each.
+        """
+        return {
+            "attempts": self.counts.get("upstream.request", 0),
+            "timings_ms": {name: round(seconds * 1000, 2) for name, seconds in self.seconds.items()},
+            "span_counts": dict(self.counts),
+            "upstream": list(self.upstream),
+        }
+
+
+@contextmanager
+def record_timings():
+    """
+    Records every span this thread ends inside the block; yields the TimingRecorder.
+    Turns span creation on for as long as any thread is recording.
+    """
+    global _recording
+    recorder = TimingRecorder()
+    previous = getattr(_local, "recorder", None)
+    _local.recorder = recorder
+    with _hooks_lock:
+        _recording += 1
+    try:
+        yield recorder
+    finally:
+        with _hooks_lock:
+            _recording -= 1
+        _local.recorder = previous
+
+
+class SlowSpanLogger(SpanHook):
+    """Prints spans that took longer than 'threshold_ms', with their attributes."""
+    def __init__(self, threshold_ms):
+        self.threshold = threshold_ms / 1000
+
+    def on_end(self, span):
+        if span.duration >= self.threshold:
+            attributes = " ".join(f"{key}={value}" for key, value in span.attributes.items())
+            print(f"Slow span {span.name}: {span.duration * 1000:.1f}ms {attributes}".rstrip())
+
+
+if TRACE_SLOW_MS > 0:
+    add_hook(SlowSpanLogger(TRACE_SLOW_MS))
@@ -1,23 +1,16 @@
 # scrapers/utils.py
 
 from datetime import datetime
-import requests # Using requests for better HTTP handling
+
+from .extract import compile_path # Paths are split once and cached
 
 def safe_get(data, path, default="N/A"):
     """
     Safely gets nested dictionary values given a dot-separated path.
-    Returns default if any part of the path is not found or is not a dictionary.
+    Returns default if any part of the path is not found, holds None or is not a dictionary.
+    The path is compiled on first use (see extract.compile_path), so repeated lookups don't re-split it.
     """
-    keys = path.split(".")
-    value = data
-    for key in keys:
-        if isinstance(value, dict):
-            value = value.get(key)
-            if value is None: # If a key is found but its value is None, return default
-                return default
-        else:
-            return default
-    return value if value is not None else default
+    return compile_path(path)(data, default)
 
 def format_timestamp(ts, include_time=True):
     """
@@ -38,28 +31,3 @@ def format_timestamp(ts, include_time=True):
             return dt_object.strftime('%Y-%m-%d')
     except (ValueError, TypeError):
         return "Invalid timestamp"
-
-def make_api_request(host, endpoint, headers=None, params=None):
-    """
-    Generic helper function to make an API request using requests library.
-    """
-    url = f"https://{host}{endpoint}"
-    try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-        response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-        return response.json()
-    except requests.exceptions.Timeout:
-        print(f"Error: Request to {url} timed out.")
-        return {"error": "API request timed out"}
-    except requests.exceptions.HTTPError as e:
-        print(f"Error: HTTP error occurred during request to {url}: {e.response.status_code} - {e.response.text}")
-        return {"error": f"API HTTP error: {e.response.status_code} - {e.response.text}"}
-    except requests.exceptions.ConnectionError:
-        print(f"Error: Could not connect to {host}.")
-        return {"error": "API connection error"}
-    except requests.exceptions.RequestException as e:
-        print(f"Error during API request to {url}: {e}")
-        return {"error": f"API request failed: {str(e)}"}
-    except ValueError: # Catches JSONDecodeError if response is not valid JSON
-        print(f"Error: Could not decode JSON from response for {url}. Response content: {response.text}")
-        return {"error": "Invalid JSON response from API"}
\ No newline at end of file
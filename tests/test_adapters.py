@@ -0,0 +1,120 @@
+# tests/test_adapters.py
+import json
+
+import pytest
+
+from scrapers import adapters, load_scraper
+from scrapers.api_key_manager import RapidAPIKeyScheduler
+from scrapers.circuit_breaker import CircuitBreaker
+from scrapers.http_pool import PooledResponse
+from scrapers.retry import RetryPolicy
+
+PROFILE = {"data": {"user": {"uniqueId": "someone", "nickname": "Some One"},
+                    "stats": {"followerCount": 12, "followingCount": 3, "heartCount": 40, "videoCount": 2}}}
+
+
+def answer(status, body=b"", headers=None, reason=""):
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode("utf-8")
+    return PooledResponse(status, reason, headers or {}, body)
+
+
+class FakeUpstream:
+    """Hands out scripted answers (or raises scripted exceptions) and records the key of every call."""
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.keys = []
+
+    def request(self, host, endpoint, headers=None, params=None, timeout=None):
+        self.keys.append(headers["x-rapidapi-key"])
+        result = self.answers.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def adapter(monkeypatch):
+    monkeypatch.setenv("RAPIDAPI_KEY_1", "key-one")
+    monkeypatch.setenv("RAPIDAPI_KEY_2", "key-two")
+    monkeypatch.delenv("RAPIDAPI_KEY_3", raising=False)
+    scheduler = RapidAPIKeyScheduler()
+    monkeypatch.setattr(adapters, "rapidapi_key_manager", scheduler)
+    breaker = CircuitBreaker("test", min_calls=2, failure_rate=1.0)
+    monkeypatch.setattr(adapters, "get_breaker", lambda host: breaker)
+    _, profile_adapter = load_scraper("tiktok_profile")
+    monkeypatch.setattr(profile_adapter, "retry_policy", RetryPolicy(max_attempts=3, base_delay=0, max_delay=0))
+    # Handles for the assertions, removed again after the test
+    monkeypatch.setattr(profile_adapter, "scheduler", scheduler, raising=False)
+    monkeypatch.setattr(profile_adapter, "breaker", breaker, raising=False)
+    return profile_adapter
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    fake_upstream = FakeUpstream()
+    monkeypatch.setattr(adapters.http_pool, "request", fake_upstream.request)
+    return fake_upstream
+
+
+def test_fields_are_mapped_from_the_data_root(adapter, upstream):
+    upstream.answers = [answer(200, PROFILE)]
+    assert adapter.fetch("https://www.tiktok.com/@someone") == {
+        "Username": "someone", "Nickname": "Some One", "Profile Followers": "12", "Following Count": "3",
+        "Total Likes Received": "40", "Posts Count": "2", "Profile URL": "https://www.tiktok.com/@someone",
+    }
+
+
+def test_rate_limits_and_server_errors_are_retried(adapter, upstream):
+    upstream.answers = [answer(429), answer(503, b"<html>oops</html>"), answer(200, PROFILE)]
+    assert adapter.fetch("someone")["Username"] == "someone"
+    assert upstream.keys[0] != upstream.keys[1] # The rate-limited key rests
+
+
+def test_auth_failures_disable_the_key_whatever_the_body(adapter, upstream):
+    upstream.answers = [answer(401, b"<html>Unauthorized</html>"), answer(200, {"message": "You are not subscribed to this API."}),
+                        answer(200, PROFILE)]
+    assert adapter.fetch("someone") == {"error": "All RapidAPI keys exhausted, cooling down or invalid for this host."}
+    assert sorted(upstream.keys) == ["key-one", "key-two"]
+    assert [state for _, _, state, _ in adapter.scheduler.key_states()] == ["disabled", "disabled"]
+
+
+def test_other_client_errors_are_returned_without_retrying(adapter, upstream):
+    upstream.answers = [answer(404, b"", reason="Not Found")]
+    assert adapter.fetch("someone") == {"error": "TikTok API Error 404: Not Found"}
+    upstream.answers = [answer(400, {"message": "unique_id is invalid"})]
+    assert adapter.fetch("someone") == {"error": "TikTok API Error 400: unique_id is invalid"}
+
+
+def test_answers_without_data_are_an_error(adapter, upstream):
+    upstream.answers = [answer(200, {"data": {}, "message": "User not found"})]
+    assert adapter.fetch("someone") == {"error": "TikTok API returned no valid data for someone: User not found"}
+
+
+def test_attempts_run_out_with_the_last_error(adapter, upstream):
+    upstream.answers = [OSError("connection reset"), answer(200, b"not json"), answer(502)]
+    assert adapter.fetch("someone") == {
+        "error": "Failed to fetch TikTok profile info after trying all available API keys. Last error: TikTok API Error 502."}
+
+
+def test_an_open_breaker_fails_fast(adapter, upstream):
+    upstream.answers = [answer(500), answer(500)]
+    adapter.fetch("someone")
+    assert adapter.breaker.state == "open"
+    error = adapter.fetch("someone")["error"]
+    assert error.startswith("TikTok API is unavailable after repeated failures; not calling it for another")
+    assert len(upstream.keys) == 2
+
+
+def test_malformed_identifiers_never_reach_the_api(adapter, upstream):
+    assert "error" in adapter.fetch("bad user!")
+    assert upstream.keys == []
+
+
+def test_input_fields_are_redone_for_each_spelling():
+    _, post_adapter = load_scraper("instagram_post")
+    reel_url = "https://www.instagram.com/reel/Cabc123/"
+    parsed, _ = post_adapter.parse(reel_url)
+    records = post_adapter.records_for([{}], parsed, reel_url)
+    assert records[0]["Post URL"] == reel_url
+    assert post_adapter.for_identifier(records, "Cabc123")[0]["Post URL"] == "https://www.instagram.com/p/Cabc123/"
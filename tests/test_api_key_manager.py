@@ -0,0 +1,153 @@
+# tests/test_api_key_manager.py
+import pytest
+
+from scrapers import api_key_manager
+from scrapers.api_key_manager import RapidAPIKeyScheduler, KEY_BURST, KEY_RATE_PER_SECOND, KEY_COOLDOWN_SECONDS, KEY_LOW_REMAINING
+
+HOST = "tiktok-scraper7.p.rapidapi.com"
+OTHER_HOST = "instagram-social-api.p.rapidapi.com"
+
+
+class FakeClock:
+    """Stands in for the time module: monotonic() is set by the test and sleep() just moves it on."""
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(api_key_manager, "time", fake_clock)
+    return fake_clock
+
+
+@pytest.fixture
+def scheduler(monkeypatch, clock):
+    monkeypatch.setenv("RAPIDAPI_KEY_1", "key-one")
+    monkeypatch.setenv("RAPIDAPI_KEY_2", "key-two")
+    monkeypatch.delenv("RAPIDAPI_KEY_3", raising=False)
+    return RapidAPIKeyScheduler()
+
+
+def test_keys_are_read_in_order(scheduler):
+    assert scheduler.api_keys == ["key-one", "key-two"]
+    assert scheduler.max_key_rotations == 2
+    assert scheduler.key_index("key-two") == 1
+
+
+def test_no_keys_raises(monkeypatch):
+    for name in ("RAPIDAPI_KEY", "RAPIDAPI_KEY_1"):
+        monkeypatch.delenv(name, raising=False)
+    with pytest.raises(ValueError):
+        RapidAPIKeyScheduler()
+
+
+def test_burst_is_spread_over_both_keys(scheduler, clock):
+    keys = [scheduler.acquire_key(HOST) for _ in range(int(KEY_BURST) * 2)]
+    assert keys.count("key-one") == keys.count("key-two") == int(KEY_BURST)
+    assert clock.slept == 0 # Both buckets were full
+
+
+def test_waits_for_a_token_to_refill(scheduler, clock):
+    for _ in range(int(KEY_BURST) * 2):
+        scheduler.acquire_key(HOST)
+    assert scheduler.acquire_key(HOST) is not None
+    assert clock.slept == pytest.approx(1 / KEY_RATE_PER_SECOND)
+
+
+def test_gives_up_when_no_token_frees_up_in_time(scheduler):
+    for _ in range(int(KEY_BURST) * 2):
+        scheduler.acquire_key(HOST)
+    assert scheduler.acquire_key(HOST, timeout=0) is None
+
+
+def test_buckets_are_per_host(scheduler, clock):
+    for _ in range(int(KEY_BURST) * 2):
+        scheduler.acquire_key(HOST)
+    assert scheduler.acquire_key(OTHER_HOST, timeout=0) is not None
+
+
+def test_rate_limited_key_rests_on_that_host_only(scheduler, clock):
+    scheduler.report_rate_limited(HOST, "key-one")
+    assert {scheduler.acquire_key(HOST) for _ in range(int(KEY_BURST))} == {"key-two"}
+    assert scheduler.acquire_key(OTHER_HOST) == "key-one" # Still in rotation there
+    clock.now += KEY_COOLDOWN_SECONDS
+    assert scheduler.acquire_key(HOST) == "key-one"
+
+
+def test_auth_failure_disables_key_on_that_host_only(scheduler, clock):
+    scheduler.report_auth_failure(HOST, "key-one")
+    clock.now += 3600
+    assert {scheduler.acquire_key(HOST) for _ in range(5)} == {"key-two"}
+    assert "key-one" in {scheduler.acquire_key(OTHER_HOST) for _ in range(5)}
+    assert (HOST, 0, "disabled", None) in scheduler.key_states()
+
+
+def quota_headers(remaining=None, reset=None):
+    headers = {}
+    if remaining is not None:
+        headers["x-ratelimit-requests-remaining"] = str(remaining)
+    if reset is not None:
+        headers["x-ratelimit-requests-reset"] = str(reset)
+    return headers
+
+
+def test_key_low_on_quota_is_used_last(scheduler):
+    scheduler.update_from_headers(HOST, "key-one", quota_headers(remaining=KEY_LOW_REMAINING - 1, reset=3600))
+    scheduler.update_from_headers(HOST, "key-two", quota_headers(remaining=500, reset=3600))
+    assert {scheduler.acquire_key(HOST) for _ in range(int(KEY_BURST))} == {"key-two"}
+
+
+def test_exhausted_key_comes_back_when_its_window_resets(scheduler, clock):
+    scheduler.update_from_headers(HOST, "key-one", quota_headers(remaining=0, reset=30))
+    assert {scheduler.acquire_key(HOST) for _ in range(5)} == {"key-two"}
+    assert (HOST, 0, "exhausted", 0) in scheduler.key_states()
+    clock.now += 30
+    assert "key-one" in {scheduler.acquire_key(HOST) for _ in range(5)}
+
+
+def test_exhausted_key_without_reset_rests_for_the_cooldown(scheduler, clock):
+    scheduler.update_from_headers(HOST, "key-one", quota_headers(remaining=0))
+    assert {scheduler.acquire_key(HOST) for _ in range(5)} == {"key-two"}
+    assert (HOST, 0, "exhausted", 0) in scheduler.key_states()
+    clock.now += KEY_COOLDOWN_SECONDS
+    assert "key-one" in {scheduler.acquire_key(HOST) for _ in range(5)}
+
+
+def test_reported_quota_is_not_counted_twice(scheduler):
+    quota_reported = scheduler.update_from_headers(HOST, "key-one", quota_headers(remaining=1))
+    scheduler.report_success(HOST, "key-one", quota_reported)
+    assert (HOST, 0, "active", 1) in scheduler.key_states() # The header value already counts this call
+    scheduler.report_auth_failure(HOST, "key-two")
+    assert scheduler.acquire_key(HOST) == "key-one" # Its last request is still usable
+
+
+def test_quota_counts_down_on_success_without_headers(scheduler):
+    scheduler.update_from_headers(HOST, "key-one", quota_headers(remaining=2))
+    quota_reported = scheduler.update_from_headers(HOST, "key-one", quota_headers(reset=3600))
+    scheduler.report_success(HOST, "key-one", quota_reported)
+    assert (HOST, 0, "active", 1) in scheduler.key_states()
+
+
+def test_rate_limit_rests_until_the_reported_reset(scheduler, clock):
+    scheduler.update_from_headers(HOST, "key-one", quota_headers(reset=KEY_COOLDOWN_SECONDS * 2))
+    scheduler.report_rate_limited(HOST, "key-one")
+    clock.now += KEY_COOLDOWN_SECONDS
+    assert (HOST, 0, "cooling_down", None) in scheduler.key_states()
+    clock.now += KEY_COOLDOWN_SECONDS
+    assert (HOST, 0, "active", None) in scheduler.key_states()
+
+
+def test_missing_or_malformed_headers_are_ignored(scheduler):
+    scheduler.update_from_headers(HOST, "key-one", None)
+    scheduler.update_from_headers(HOST, "key-one", {"x-ratelimit-requests-remaining": "lots"})
+    scheduler.acquire_key(HOST)
+    assert all(remaining is None for _, _, _, remaining in scheduler.key_states())
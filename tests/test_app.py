@@ -0,0 +1,64 @@
+# tests/test_app.py
+import json
+
+import pytest
+
+import app as app_module
+from scrapers import batch, load_scraper
+from scrapers.identifiers import parse_identifier
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A test client whose fetches build records from an empty response; identifiers starting with 'fail' fail."""
+    def fake_fetch_identifier(info_type, identifier, deadline=None, debug=False, incremental=False):
+        if identifier.startswith("fail"):
+            return [batch.build_error_record(info_type, identifier, "Upstream said no.")], True
+        _, adapter = load_scraper(info_type)
+        return adapter.records_for([{}], parse_identifier(info_type, identifier), identifier), False
+
+    monkeypatch.setattr(batch, "fetch_identifier", fake_fetch_identifier)
+    # No job workers or metrics publisher for these requests
+    monkeypatch.setitem(app_module.app.before_request_funcs, None, [])
+    return app_module.app.test_client()
+
+
+def stream_messages(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_stream_sends_every_record_then_a_summary(client):
+    response = client.post("/api/fetch-info/stream", json={"type": "tiktok_profile", "identifiers": ["someone", "fail.user", "bad user!"]})
+    assert response.mimetype == "application/x-ndjson"
+    assert response.headers["X-Accel-Buffering"] == "no"
+    *records, summary = stream_messages(response)
+    assert sorted(message["index"] for message in records) == [0, 1, 2]
+    assert records[0]["index"] == 2 # The malformed identifier is answered before anything is fetched
+    assert {message["type"] for message in records} == {"record"}
+    assert summary == {
+        "type": "summary", "total": 3, "completed": 3, "failed": 2,
+        "warning": "Some identifiers failed to fetch data. Please check the 'Status' and 'Error Details' for individual records.",
+    }
+
+
+def test_stream_speaks_sse_when_asked(client):
+    response = client.post("/api/fetch-info/stream?format=sse", json={"type": "tiktok_profile", "identifiers": ["fail.user"]})
+    assert response.mimetype == "text/event-stream"
+    events = response.get_data(as_text=True).split("\n\n")
+    assert events[0].startswith("event: record\ndata: ")
+    assert events[1].startswith("event: summary\ndata: ")
+    assert json.loads(events[1].split("data: ", 1)[1])["error"].startswith("No data could be fetched")
+
+
+def test_stream_validates_like_the_buffered_endpoint(client):
+    assert client.post("/api/fetch-info/stream", json={"type": "tiktok_profile", "identifiers": []}).status_code == 400
+    response = client.post("/api/fetch-info/stream", json={"type": "tiktok_profile", "identifiers": ["a"], "incremental": True})
+    assert response.status_code == 400
+
+
+def test_buffered_endpoint_returns_records_in_input_order(client):
+    response = client.post("/api/fetch-info", json={"type": "tiktok_profile", "identifiers": ["second", "fail.user", "third"]})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [record.get("Status") for record in results] == [None, "Failed", None]
+    assert "warning" in response.get_json()
@@ -0,0 +1,125 @@
+# tests/test_batch.py
+import time
+import threading
+
+import pytest
+
+from scrapers import batch, load_scraper
+from scrapers.identifiers import parse_identifier
+from scrapers.retry import Deadline
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """
+    Replaces the upstream fetch with one that builds records through the platform's real
+    adapter (from an empty response), as the first requester of a key would get them.
+    Returns the identifiers actually fetched.
+    """
+    fetched = []
+
+    def fake_fetch_identifier(info_type, identifier, deadline=None, debug=False, incremental=False):
+        fetched.append(identifier)
+        if identifier.startswith("fail"):
+            return [batch.build_error_record(info_type, identifier, "Upstream said no.")], True
+        _, adapter = load_scraper(info_type)
+        return adapter.records_for([{}], parse_identifier(info_type, identifier), identifier), False
+
+    monkeypatch.setattr(batch, "fetch_identifier", fake_fetch_identifier)
+    return fetched
+
+
+# Spellings of one post, and the input-derived field each position must get back as it asked
+DUPLICATES = [
+    ("instagram_post", "Post URL", [
+        "https://www.instagram.com/p/Cabc123/",
+        "https://www.instagram.com/reel/Cabc123/",
+        "Cabc123",
+    ], [
+        "https://www.instagram.com/p/Cabc123/",
+        "https://www.instagram.com/reel/Cabc123/",
+        "https://www.instagram.com/p/Cabc123/",
+    ]),
+    ("tiktok_post", "Author Username", [
+        "https://www.tiktok.com/@Some.User/video/7234567890123456789",
+        "https://m.tiktok.com/@some.user/video/7234567890123456789?lang=en",
+    ], ["Some.User", "some.user"]),
+    ("youtube_post", "Video URL", [
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://youtu.be/dQw4w9WgXcQ",
+    ], ["https://www.youtube.com/watch?v=dQw4w9WgXcQ", "https://youtu.be/dQw4w9WgXcQ"]),
+]
+
+
+@pytest.mark.parametrize("info_type, column, identifiers, expected", DUPLICATES, ids=[case[0] for case in DUPLICATES])
+def test_duplicates_are_fetched_once_and_keep_their_own_input_fields(fetches, info_type, column, identifiers, expected):
+    results = batch.fetch_batch(info_type, identifiers)
+    assert fetches == identifiers[:1]
+    assert [failed for _, failed in results] == [False] * len(identifiers)
+    assert [records[0][column] for records, _ in results] == expected
+
+
+@pytest.mark.parametrize("info_type, column, identifiers, expected", DUPLICATES, ids=[case[0] for case in DUPLICATES])
+def test_streamed_duplicates_keep_their_own_input_fields(fetches, info_type, column, identifiers, expected):
+    streamed = {position: (records, failed, finished) for position, records, failed, finished in batch.iter_batch(info_type, identifiers)}
+    assert fetches == identifiers[:1]
+    assert [streamed[position][0][0][column] for position in range(len(identifiers))] == expected
+    assert all(finished and not failed for _, failed, finished in streamed.values())
+
+
+def test_positions_get_copies(fetches):
+    (first, _), (second, _) = batch.fetch_batch("youtube_post", ["dQw4w9WgXcQ", "https://youtu.be/dQw4w9WgXcQ"])
+    first[0]["Views"] = 1
+    assert second[0]["Views"] != 1
+
+
+def test_failures_name_each_position_as_requested(fetches):
+    results = batch.fetch_batch("tiktok_profile", ["fail.user", "@FAIL.USER", "bad user!"])
+    assert fetches == ["fail.user"] # The malformed one is never dispatched
+    assert [failed for _, failed in results] == [True, True, True]
+    assert [records[0]["Requested Identifier"] for records, _ in results] == ["fail.user", "@FAIL.USER", "bad user!"]
+    assert results[1][0][0]["Error Details"] == "Upstream said no."
+
+
+def test_fair_semaphore_hands_slots_out_in_arrival_order():
+    semaphore = batch._FairSemaphore(1)
+    assert semaphore.acquire()
+    order = []
+
+    def take(name):
+        semaphore.acquire()
+        order.append(name)
+        semaphore.release()
+
+    threads = []
+    for name in ("first", "second", "third"):
+        threads.append(threading.Thread(target=take, args=(name,)))
+        threads[-1].start()
+        while len(semaphore._waiters) < len(threads):
+            time.sleep(0.001)
+    semaphore.release()
+    for thread in threads:
+        thread.join()
+    assert order == ["first", "second", "third"]
+
+
+def test_fair_semaphore_wait_times_out_and_leaves_the_queue():
+    semaphore = batch._FairSemaphore(1)
+    assert semaphore.acquire()
+    assert not semaphore.acquire(timeout=0.01)
+    assert not semaphore.acquire(timeout=0)
+    assert not semaphore._waiters
+    semaphore.release()
+    assert semaphore.acquire(timeout=0) # The released slot wasn't handed to a waiter that had given up
+
+
+def test_fetch_waiting_for_a_busy_host_gives_up_at_the_deadline(monkeypatch):
+    _, adapter = load_scraper("youtube_post")
+    semaphore = batch._FairSemaphore(1)
+    semaphore.acquire() # Held by a slow fetch
+    monkeypatch.setattr(batch, "_get_host_semaphore", lambda host: semaphore)
+    started = time.monotonic()
+    records, failed = batch.fetch_identifier("youtube_post", "dQw4w9WgXcQ", deadline=Deadline(0.05))
+    assert failed and time.monotonic() - started < 1
+    assert records[0]["Error Details"] == f"The request's time budget of 0.05s ran out while waiting for a free slot on {adapter.host}."
+    assert not semaphore._waiters
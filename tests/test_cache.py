@@ -0,0 +1,97 @@
+# tests/test_cache.py
+import pytest
+
+from scrapers import cache
+from scrapers.cache import ResponseCache
+
+
+class FakeClock:
+    """Stands in for the time module: monotonic() is set by the test."""
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(cache, "time", fake_clock)
+    return fake_clock
+
+
+def test_entries_expire_after_their_ttl(clock):
+    response_cache = ResponseCache()
+    response_cache.set("key", {"Name": "a"}, 60)
+    clock.now += 59
+    assert response_cache.get("key") == {"Name": "a"}
+    clock.now += 1
+    assert response_cache.get("key") is None
+    assert response_cache.stats()["entries"] == 0 and response_cache.stats()["bytes"] == 0
+
+
+def test_least_recently_used_entry_goes_first_past_max_entries(clock):
+    response_cache = ResponseCache(max_entries=2)
+    response_cache.set("a", 1, 60)
+    response_cache.set("b", 2, 60)
+    response_cache.get("a") # Now more recent than b
+    response_cache.set("c", 3, 60)
+    assert [response_cache.get(key) for key in ("a", "b", "c")] == [1, None, 3]
+    assert response_cache.stats()["evictions"] == 1
+
+
+def test_byte_limit_evicts_and_oversized_values_are_not_stored(clock):
+    response_cache = ResponseCache(max_bytes=30)
+    response_cache.set("a", "x" * 10, 60) # 12 bytes as JSON
+    response_cache.set("b", "y" * 10, 60)
+    response_cache.set("c", "z" * 10, 60) # 36 bytes in all: a goes
+    assert response_cache.get("a") is None and response_cache.stats()["bytes"] == 24
+    response_cache.set("huge", "w" * 100, 60)
+    assert response_cache.get("huge") is None and response_cache.get("b") is not None
+
+
+def test_callers_get_copies(clock):
+    response_cache = ResponseCache()
+    response_cache.set("key", [{"Likes": 1}], 60)
+    response_cache.get("key")[0]["Likes"] = 2
+    assert response_cache.get("key") == [{"Likes": 1}]
+
+
+def test_hit_rate_counts_expired_entries_as_misses(clock):
+    response_cache = ResponseCache()
+    response_cache.set("key", 1, 10)
+    response_cache.get("key")
+    clock.now += 10
+    response_cache.get("key")
+    response_cache.get("other")
+    stats = response_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_ttl_overrides_come_from_the_environment(monkeypatch):
+    assert cache.get_ttl("instagram_hashtag") == 300
+    assert cache.get_ttl("unknown_type") == cache.DEFAULT_TTL_SECONDS
+    monkeypatch.setenv("SCRAPER_CACHE_TTL_INSTAGRAM_HASHTAG", "30")
+    assert cache.get_ttl("instagram_hashtag") == 30
+
+
+def test_cached_keeps_successes_only(monkeypatch):
+    monkeypatch.setattr(cache, "response_cache", ResponseCache())
+    monkeypatch.setattr(cache, "get_shared_store", lambda: None)
+    answers = [{"error": "Upstream said no."}, {"Name": "someone"}, {"Name": "changed"}]
+    calls = []
+
+    @cache.cached("test_type")
+    def fetch(identifier):
+        calls.append(identifier)
+        return answers[len(calls) - 1]
+
+    assert fetch("someone") == {"error": "Upstream said no."} # Not cached: the next call asks again
+    assert fetch("someone") == {"Name": "someone"}
+    assert fetch(" someone/ ") == {"Name": "someone"} # Same entry for a trivially different spelling
+    assert calls == ["someone", "someone"]
@@ -0,0 +1,96 @@
+# tests/test_circuit_breaker.py
+import pytest
+
+from scrapers import circuit_breaker
+from scrapers.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeClock:
+    """Stands in for the time module: monotonic() is set by the test."""
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, "time", fake_clock)
+    return fake_clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test.host", window=4, min_calls=4, failure_rate=0.5, open_seconds=30, half_open_probes=1)
+
+
+def open_breaker(breaker):
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_opens_at_the_failure_rate_once_enough_calls_were_seen(breaker):
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED # Too few calls to judge the host
+    breaker.record_failure()
+    assert breaker.state == OPEN # 3 of the last 4 failed
+    assert not breaker.allow_request()
+
+
+def test_old_failures_leave_the_window(breaker):
+    breaker.record_failure()
+    for _ in range(4):
+        breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED # 1 of the last 4
+
+
+def test_half_opens_after_the_open_period_and_lets_a_probe_through(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 10
+    assert breaker.retry_in() == pytest.approx(20)
+    assert breaker.is_open()
+    clock.now += 20
+    assert not breaker.is_open() and breaker.state == HALF_OPEN and breaker.retry_in() == 0
+    assert breaker.allow_request()
+    assert not breaker.allow_request() # Only one probe at a time
+
+
+def test_a_successful_probe_closes_the_breaker(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CLOSED # The failures from before don't count any more
+
+
+def test_a_failed_probe_opens_the_breaker_for_another_period(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.retry_in() == pytest.approx(30)
+
+
+def test_a_probe_that_never_reports_back_is_replaced(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+    clock.now += 29
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+
+
+def test_breakers_are_shared_per_host(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    assert circuit_breaker.get_breaker("a.host") is circuit_breaker.get_breaker("a.host")
+    assert circuit_breaker.get_breaker("a.host") is not circuit_breaker.get_breaker("b.host")
@@ -0,0 +1,110 @@
+# tests/test_cli.py
+import os
+import sys
+import json
+import signal
+import threading
+
+import pytest
+
+from scrapers import batch
+from scrapers import __main__ as cli
+from scrapers.__main__ import BatchRun, CheckpointError
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """Replaces the fetcher: one record per identifier, and records every identifier fetched."""
+    calls = []
+    lock = threading.Lock()
+
+    def fake_fetch_identifier(info_type, identifier, deadline=None, debug=False, incremental=False):
+        with lock:
+            calls.append(identifier)
+        return [{"Username": identifier}], identifier.startswith("fail")
+
+    monkeypatch.setattr(batch, "fetch_identifier", fake_fetch_identifier)
+    monkeypatch.setattr(signal, "signal", lambda signum, handler: None) # Leave pytest's handlers alone
+    return calls
+
+
+def interrupted_after(lines, count):
+    """Yields the first 'count' lines, then raises KeyboardInterrupt as Ctrl-C would."""
+    for line in lines[:count]:
+        yield line
+    raise KeyboardInterrupt
+
+
+def written(path):
+    with open(path, encoding="utf-8") as output_file:
+        return [json.loads(line)["Requested Identifier"] for line in output_file]
+
+
+def run_cli(monkeypatch, *arguments):
+    monkeypatch.setattr(sys, "argv", ["python -m scrapers", *arguments])
+    return cli.main()
+
+
+def test_an_interrupted_run_resumes_where_it_stopped(monkeypatch, tmp_path, fetched):
+    lines = [f"user{number}\n" for number in range(12)]
+    lines[3] = "\n"
+    lines[5] = "# a comment\n"
+    input_path = tmp_path / "users.txt"
+    input_path.write_text("".join(lines))
+    output_path = str(tmp_path / "profiles.ndjson")
+    checkpoint_path = f"{output_path}.checkpoint"
+
+    run_state = {"info_type": "tiktok_profile", "input": str(input_path), "format": "ndjson", "incremental": False}
+    with open(output_path, "wb") as output:
+        # One worker, so only 4 lines are in flight and some finish before the interrupt
+        first_run = BatchRun("tiktok_profile", output, "ndjson", 1, checkpoint_path)
+        with pytest.raises(KeyboardInterrupt):
+            first_run.run(interrupted_after(lines, 8), run_state)
+    checkpoint = cli.load_checkpoint(checkpoint_path)
+    done_before = written(output_path)
+    assert checkpoint["output_bytes"] == os.path.getsize(output_path)
+    assert checkpoint["identifiers"] == len(done_before) > 0
+    assert checkpoint["resume_from"] > 0
+
+    # A record written after the checkpoint was saved (the process died before the next one)
+    with open(output_path, "a", encoding="utf-8") as output:
+        output.write(json.dumps({"Requested Identifier": "user11"}) + "\n")
+
+    fetched.clear()
+    assert run_cli(monkeypatch, "tiktok_profile", str(input_path), "-o", output_path, "-w", "2") == 0
+    assert sorted(fetched) == sorted(set(fetched)) # Nothing fetched twice in the resumed run
+    assert not set(fetched) & set(done_before) # Nor anything the first run had finished
+    assert sorted(written(output_path)) == sorted(line.strip() for line in lines if line.strip() and not line.startswith("#"))
+    assert not os.path.exists(checkpoint_path) # Removed once the input is finished
+
+
+def test_resuming_refuses_a_changed_output_or_a_different_run(monkeypatch, tmp_path, fetched):
+    input_path = tmp_path / "users.txt"
+    input_path.write_text("a\nb\n")
+    output_path = tmp_path / "profiles.ndjson"
+    output_path.write_bytes(b"")
+    with pytest.raises(CheckpointError):
+        cli._open_output(str(output_path), {"output_bytes": 10})
+
+    checkpoint_path = f"{output_path}.checkpoint"
+    cli.save_checkpoint(checkpoint_path, {"info_type": "tiktok_profile", "input": str(input_path), "format": "csv",
+                                          "incremental": False, "output_bytes": 0, "resume_from": 0, "identifiers": 0})
+    with pytest.raises(SystemExit):
+        run_cli(monkeypatch, "tiktok_profile", str(input_path), "-o", str(output_path))
+    assert fetched == []
+    assert run_cli(monkeypatch, "tiktok_profile", str(input_path), "-o", str(output_path), "--restart") == 0
+    assert sorted(written(output_path)) == ["a", "b"]
+
+
+def test_csv_output_has_one_header(monkeypatch, tmp_path, fetched):
+    input_path = tmp_path / "users.txt"
+    input_path.write_text("a\nfail.b\n")
+    output_path = tmp_path / "profiles.csv"
+    assert run_cli(monkeypatch, "tiktok_profile", str(input_path), "-o", str(output_path)) == 0
+    header, *rows = output_path.read_text(encoding="utf-8").splitlines()
+    assert header.startswith("Username,") and len(rows) == 2
+
+
+def test_incremental_is_refused_for_other_types(monkeypatch, fetched):
+    with pytest.raises(SystemExit):
+        run_cli(monkeypatch, "tiktok_profile", "--incremental")
@@ -0,0 +1,57 @@
+# tests/test_export.py
+import io
+import csv
+import sys
+import json
+
+import pytest
+
+from scrapers import export
+from scrapers.export import export_records, available_formats, get_columns, ExportError
+
+RECORDS = [
+    {"Caption Text": "a, \"quoted\" caption", "Username": "someone", "Likes": 5, "Extra": {"nested": [1]}},
+    {"Requested Identifier": "#gone", "Status": "Failed", "Error Details": "Not found.", "Platform": "Instagram"},
+]
+
+
+def test_parquet_is_only_offered_with_pyarrow(monkeypatch):
+    monkeypatch.setattr(export, "PARQUET_AVAILABLE", False)
+    assert available_formats() == ["csv", "ndjson"]
+    with pytest.raises(ExportError, match=r"Use one of: csv, ndjson\.$"):
+        export_records(RECORDS, "instagram_hashtag", "parquet")
+    monkeypatch.setattr(export, "PARQUET_AVAILABLE", True)
+    assert available_formats() == ["csv", "ndjson", "parquet"]
+
+
+def test_columns_follow_the_adapter_then_the_error_fields():
+    columns = get_columns("instagram_hashtag")
+    assert columns[:2] == ["Username", "Full Name"]
+    assert columns[-4:] == export.ERROR_COLUMNS
+    assert get_columns("myspace_profile") == export.ERROR_COLUMNS
+
+
+def test_csv_export_has_fixed_columns_and_blank_missing_fields(monkeypatch):
+    monkeypatch.setattr(export, "CSV_ROWS_PER_CHUNK", 1)
+    chunks, mimetype, extension = export_records(iter(RECORDS), "instagram_hashtag", "csv")
+    chunks = list(chunks)
+    assert (mimetype, extension, len(chunks)) == ("text/csv; charset=utf-8", "csv", 2)
+    header, data, failed = csv.reader(io.StringIO("".join(chunks)))
+    assert header == get_columns("instagram_hashtag")
+    row = dict(zip(header, data))
+    assert (row["Username"], row["Caption Text"], row["Likes"], row["Status"]) == ("someone", "a, \"quoted\" caption", "5", "")
+    assert dict(zip(header, failed))["Error Details"] == "Not found."
+
+
+def test_ndjson_export_keeps_extra_fields_after_the_known_ones():
+    chunks, _, _ = export_records(RECORDS, "instagram_hashtag", "ndjson")
+    first = json.loads(next(iter(chunks)))
+    assert list(first) == ["Username", "Caption Text", "Likes", "Extra"]
+    assert first["Extra"] == {"nested": [1]}
+
+
+def test_a_broken_pyarrow_install_is_a_clear_error(monkeypatch):
+    monkeypatch.setattr(export, "PARQUET_AVAILABLE", True)
+    monkeypatch.setitem(sys.modules, "pyarrow", None) # Found on disk but failing to import
+    with pytest.raises(ExportError, match="requires the 'pyarrow' library"):
+        export_records(RECORDS, "instagram_hashtag", "parquet")
@@ -0,0 +1,51 @@
+# tests/test_extract.py
+import itertools
+
+import pytest
+
+from scrapers.extract import compile_path, compile_field
+from scrapers.utils import safe_get
+
+
+def reference_safe_get(data, path, default="N/A"):
+    """safe_get as it was before paths were compiled: the behaviour compile_path must keep."""
+    keys = path.split(".")
+    value = data
+    for key in keys:
+        if isinstance(value, dict):
+            value = value.get(key)
+            if value is None:
+                return default
+        else:
+            return default
+    return value if value is not None else default
+
+
+SAMPLES = [
+    None, "text", 0, [], [{"a": 1}], {},
+    {"a": None}, {"a": 0}, {"a": ""}, {"a": False}, {"a": []}, {"a": "x"},
+    {"a": {"b": None}}, {"a": {"b": 0}}, {"a": {"b": "y"}}, {"a": {"b": []}}, {"a": {"b": {}}}, {"a": ["b"]}, {"a": "b"},
+    {"a": {"b": {"c": None}}}, {"a": {"b": {"c": "z"}}}, {"a": {"b": {"c": {"d": 4}}}}, {"a": {"b": [{"c": 1}]}},
+    {"a": {"x": 1}, "b": 2}, {"a.b": 5},
+]
+PATHS = ["a", "b", "a.b", "a.x", "a.b.c", "a.b.c.d", "a.b.c.d.e", "a.b.x"]
+
+
+@pytest.mark.parametrize("data, path", list(itertools.product(SAMPLES, PATHS)))
+def test_compiled_paths_agree_with_the_old_safe_get(data, path):
+    for default in ("N/A", None, 0):
+        expected = reference_safe_get(data, path, default)
+        assert compile_path(path)(data, default) == expected
+        assert safe_get(data, path, default) == expected
+    assert compile_path(path)(data) == reference_safe_get(data, path)
+
+
+def test_compiled_paths_are_cached():
+    assert compile_path("a.b") is compile_path("a.b")
+    assert compile_path("a.b").path == "a.b"
+
+
+def test_fields_are_extracted_as_text():
+    assert compile_field("stats.count")({"stats": {"count": 12}}, None, "id") == "12"
+    assert compile_field("stats.count")({}, None, "id") == "N/A"
+    assert compile_field(lambda source, parsed, identifier: identifier.upper())({}, None, "id") == "ID"
@@ -0,0 +1,92 @@
+# tests/test_fixtures.py
+import os
+import json
+import threading
+
+import pytest
+
+from scrapers import fixtures, http_pool
+from scrapers.fixtures import FixtureStore
+from scrapers.http_pool import PooledResponse
+
+HOST = "tiktok-scraper7.p.rapidapi.com"
+
+
+class FakePool:
+    """Answers every call with the next scripted response and records the paths asked for."""
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.paths = []
+
+    def request(self, method, url, headers=None, timeout=None):
+        self.paths.append(url)
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    fixture_store = FixtureStore(str(tmp_path))
+    monkeypatch.setattr(fixtures, "get_fixture_store", lambda: fixture_store)
+    monkeypatch.setattr(fixtures, "_local", threading.local()) # Call labels set by a test end with it
+    return fixture_store
+
+
+def upstream(monkeypatch, *responses):
+    pool = FakePool(*responses)
+    monkeypatch.setattr(http_pool, "get_pool", lambda host: pool)
+    return pool
+
+
+def response(status, body, headers=None):
+    return PooledResponse(status, "OK" if status == 200 else "Error", headers or {}, json.dumps(body).encode("utf-8"))
+
+
+def test_recorded_responses_replay_offline(monkeypatch, store):
+    body = {"data": {"user": {"uniqueId": "someone"}}}
+    headers = {"content-type": "application/json", "x-ratelimit-requests-remaining": "41", "set-cookie": "secret"}
+    upstream(monkeypatch, response(200, body, headers))
+    monkeypatch.setattr(fixtures, "FIXTURES_MODE", fixtures.RECORD)
+    fixtures.describe_call("tiktok_profile", "@someone")
+    recorded = http_pool.request(HOST, "/user/info", headers={"x-rapidapi-key": "key-one"}, params={"unique_id": "someone"})
+
+    pool = upstream(monkeypatch)
+    monkeypatch.setattr(fixtures, "FIXTURES_MODE", fixtures.REPLAY)
+    replayed = http_pool.request(HOST, "/user/info", headers={"x-rapidapi-key": "key-two"}, params={"unique_id": "someone"})
+    assert pool.paths == [] # Nothing went over the network
+    assert (replayed.status, replayed.reason, replayed.data) == (recorded.status, recorded.reason, recorded.data)
+    assert replayed.getheader("X-RateLimit-Requests-Remaining") == "41"
+    assert replayed.getheader("set-cookie") is None # Only the headers the scrapers read are kept
+
+    entry, = store.entries(HOST)
+    assert (entry["path"], entry["info_type"], entry["identifier"]) == ("/user/info?unique_id=someone", "tiktok_profile", "@someone")
+
+
+def test_unrecorded_calls_replay_as_404(monkeypatch, store):
+    monkeypatch.setattr(fixtures, "FIXTURES_MODE", fixtures.REPLAY)
+    missing = http_pool.request(HOST, "/user/info", params={"unique_id": "nobody"})
+    assert missing.status == 404
+    assert json.loads(missing.data)["message"].startswith("No recorded fixture for GET")
+
+
+def test_transient_errors_dont_replace_a_good_fixture(monkeypatch, store):
+    upstream(monkeypatch, response(200, {"ok": True}), response(503, {"message": "down"}), response(429, {}))
+    monkeypatch.setattr(fixtures, "FIXTURES_MODE", fixtures.RECORD)
+    for _ in range(3):
+        http_pool.request(HOST, "/user/info")
+    status, _, _, body = store.load(HOST, "GET", "/user/info")
+    assert (status, json.loads(body)) == (200, {"ok": True})
+
+
+def test_identical_bodies_are_stored_once_and_byte_for_byte_the_same(tmp_path):
+    store = FixtureStore(str(tmp_path))
+    store.save(HOST, "GET", "/a", 200, "OK", {}, b'{"same": true}')
+    store.save(HOST, "GET", "/b", 200, "OK", {}, b'{"same": true}')
+    bodies = [os.path.join(root, name) for root, _, names in os.walk(tmp_path / "bodies") for name in names]
+    assert len(bodies) == 1
+    with open(bodies[0], "rb") as body_file:
+        first = body_file.read()
+    os.remove(bodies[0])
+    store.save(HOST, "GET", "/a", 200, "OK", {}, b'{"same": true}')
+    with open(bodies[0], "rb") as body_file:
+        assert body_file.read() == first
+    assert [entry["path"] for entry in store.entries()] == sorted(["/a", "/b"], key=lambda path: fixtures.request_key(HOST, "GET", path))
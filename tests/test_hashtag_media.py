@@ -0,0 +1,132 @@
+# tests/test_hashtag_media.py
+import importlib
+
+import pytest
+
+from scrapers import batch
+from scrapers.cache import response_cache
+from scrapers.hashtag_state import HashtagStateStore
+
+# By module path: the package binds the name fetch_instagram_hashtag_media to the function
+hashtag_module = importlib.import_module("scrapers.fetch_instagram_hashtag_media")
+
+
+def post(code, taken_at):
+    return {"code": code, "taken_at": taken_at}
+
+
+class FakeFeed:
+    """Serves a hashtag's posts newest first, 'page_size' per page, and records the cursors asked for."""
+    def __init__(self, posts, page_size=2):
+        self.posts = posts
+        self.page_size = page_size
+        self.cursors = []
+
+    def request(self, parsed, identifier, params=None, deadline=None):
+        cursor = (params or {}).get(hashtag_module.PAGINATION_PARAM)
+        self.cursors.append(cursor)
+        start = int(cursor or 0)
+        end = start + self.page_size
+        response = {"data": {"items": self.posts[start:end]}}
+        if end < len(self.posts):
+            response[hashtag_module.PAGINATION_PATH] = str(end)
+        return response, None
+
+
+@pytest.fixture
+def state(monkeypatch, tmp_path):
+    store = HashtagStateStore(str(tmp_path / "hashtag_state.db"))
+    monkeypatch.setattr(hashtag_module, "get_hashtag_state", lambda: store)
+    return store
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    fake_feed = FakeFeed([post("C6", 600), post("C5", 500), post("C4", 400), post("C3", 300), post("C2", 200)])
+    monkeypatch.setattr(hashtag_module.ADAPTER, "request", fake_feed.request)
+    response_cache.clear()
+    yield fake_feed
+    response_cache.clear()
+
+
+def codes(posts):
+    return [record["Instagram URL"].split("/")[-2] for record in posts]
+
+
+def test_first_poll_returns_everything_and_remembers_it(state, feed):
+    posts = hashtag_module.fetch_instagram_hashtag_media("sunset", incremental=True)
+    assert codes(posts) == ["C6", "C5", "C4", "C3", "C2"]
+    high_water_mark, known_codes = state.get("sunset")
+    assert (high_water_mark, known_codes) == (600, {"C6", "C5", "C4", "C3", "C2"})
+
+
+def test_later_polls_emit_only_unseen_posts_and_stop_at_known_codes(state, feed):
+    hashtag_module.fetch_instagram_hashtag_media("sunset", incremental=True)
+    feed.posts[:0] = [post("C8", 800), post("C7", 700), post("C6b", 650)]
+    feed.cursors.clear()
+    posts = hashtag_module.fetch_instagram_hashtag_media("#Sunset", incremental=True)
+    assert codes(posts) == ["C8", "C7", "C6b"]
+    assert feed.cursors == [None, "2"] # The second page reached C6; older pages weren't asked for
+
+    feed.cursors.clear()
+    assert hashtag_module.fetch_instagram_hashtag_media("sunset", incremental=True) == []
+    assert feed.cursors == [None]
+
+
+def test_pagination_stops_at_the_high_water_mark(state, feed):
+    state.record("sunset", [], 450) # Codes forgotten, the newest taken_at still known
+    posts = hashtag_module.fetch_instagram_hashtag_media("sunset", incremental=True)
+    assert feed.cursors == [None, "2"] # C4 (taken at 400) is on the second page
+    assert codes(posts)[:2] == ["C6", "C5"]
+
+
+def test_cached_results_dont_hide_new_posts(state, feed):
+    assert len(hashtag_module.fetch_instagram_hashtag_media("sunset")) == 5 # Now cached
+    assert len(hashtag_module.fetch_instagram_hashtag_media("sunset", incremental=True)) == 5 # Not served from the cache
+    feed.posts.insert(0, post("C9", 900))
+    assert codes(hashtag_module.fetch_instagram_hashtag_media("sunset", incremental=True)) == ["C9"]
+    assert len(hashtag_module.fetch_instagram_hashtag_media("sunset")) == 5 # The plain fetch is still the cached one
+
+
+def test_batch_passes_incremental_through(state, feed):
+    (first, failed), = batch.fetch_batch("instagram_hashtag", ["sunset"], incremental=True)
+    assert not failed and len(first) == 5
+    assert batch.fetch_batch("instagram_hashtag", ["sunset"], incremental=True) == [([], False)] # Nothing new is no error
+    records, failed = batch.fetch_identifier("tiktok_profile", "someone", incremental=True)
+    assert failed and records[0]["Error Details"] == "Incremental fetches are not supported for tiktok_profile."
+
+
+def test_pages_are_followed_and_repeated_posts_dropped(feed):
+    feed.posts[3:3] = [post("C5", 500)] # Shows up again on the next page
+    posts = list(hashtag_module.iter_instagram_hashtag_media(["sunset", "#beach"], time_limit=0))
+    assert codes(posts) == ["C6", "C5", "C4", "C3", "C2"] # Nothing twice, not even across hashtags
+    assert feed.cursors == [None, "2", "4", None, "2", "4"]
+
+
+def test_pagination_stops_at_max_items(feed):
+    posts = list(hashtag_module.iter_instagram_hashtag_media("sunset", max_items=3, time_limit=0))
+    assert codes(posts) == ["C6", "C5", "C4"]
+    assert feed.cursors == [None, "2"]
+
+
+def test_posts_stream_out_page_by_page(feed):
+    posts = hashtag_module.iter_instagram_hashtag_media("sunset", time_limit=0)
+    assert codes([next(posts), next(posts)]) == ["C6", "C5"]
+    assert feed.cursors == [None] # The second page isn't asked for until the first is consumed
+    next(posts)
+    assert feed.cursors == [None, "2"]
+
+
+def test_a_failed_first_page_yields_an_error_and_a_failed_later_page_ends_pagination(feed, monkeypatch):
+    serve_page = feed.request
+
+    def flaky_request(parsed, identifier, params=None, deadline=None):
+        if parsed.id == "broken" or (params or {}).get(hashtag_module.PAGINATION_PARAM) == "4":
+            return None, {"error": "Instagram API Error 500."}
+        return serve_page(parsed, identifier, params=params, deadline=deadline)
+
+    monkeypatch.setattr(hashtag_module.ADAPTER, "request", flaky_request)
+    posts = list(hashtag_module.iter_instagram_hashtag_media(["broken", "sunset"], time_limit=0))
+    assert posts[0] == {"error": "Instagram API Error 500.", "hashtag": "broken"}
+    assert codes(posts[1:]) == ["C6", "C5", "C4", "C3"]
+    assert hashtag_module.fetch_instagram_hashtag_media("broken") == {"error": "Instagram API Error 500."}
@@ -0,0 +1,57 @@
+# tests/test_identifiers.py
+import pytest
+
+from scrapers.identifiers import parse_many, IdentifierError
+
+# Spellings of one identifier that must share a cache / de-duplication key
+SAME_IDENTIFIER = [
+    ("instagram_post", ["https://www.instagram.com/p/Cabc123_-x/", "https://instagram.com/reel/Cabc123_-x/?igsh=1", "Cabc123_-x"],
+     ("instagram", "post", "Cabc123_-x")),
+    ("instagram_profile", ["https://www.instagram.com/Some.User/", "@Some.User", " some.user "],
+     ("instagram", "profile", "some.user")),
+    ("instagram_hashtag", ["#Sunset", "sunset", "SUNSET"], ("instagram", "hashtag", "sunset")),
+    ("tiktok_post", ["https://www.tiktok.com/@Some.User/video/7234567890123456789",
+                     "https://m.tiktok.com/@some.user/video/7234567890123456789?lang=en"],
+     ("tiktok", "video", "7234567890123456789")),
+    ("tiktok_profile", ["https://www.tiktok.com/@Some.User", "@some.user", "Some.User"], ("tiktok", "profile", "some.user")),
+    ("youtube_post", ["https://www.youtube.com/watch?v=dQw4w9WgXcQ", "https://youtu.be/dQw4w9WgXcQ?t=3",
+                      "https://www.youtube.com/shorts/dQw4w9WgXcQ", "dQw4w9WgXcQ"],
+     ("youtube", "video", "dQw4w9WgXcQ")),
+    ("youtube_profile", ["https://www.youtube.com/@SomeChannel", "@somechannel", "SomeChannel"],
+     ("youtube", "handle", "@somechannel")),
+    ("youtube_profile", ["https://www.youtube.com/channel/UC1234567890123456789012", "UC1234567890123456789012"],
+     ("youtube", "id", "UC1234567890123456789012")),
+    ("snapchat_profile", ["https://www.snapchat.com/add/Some.User", "some.user", "Some.User"],
+     ("snapchat", "profile", "some.user")),
+]
+
+
+@pytest.mark.parametrize("info_type, identifiers, key", SAME_IDENTIFIER, ids=[case[0] for case in SAME_IDENTIFIER])
+def test_url_forms_share_one_canonical_key(info_type, identifiers, key):
+    parsed = parse_many(info_type, identifiers)
+    assert [result.key for result in parsed] == [key] * len(identifiers)
+
+
+def test_details_keep_what_each_spelling_said():
+    post, reel = parse_many("instagram_post", ["https://www.instagram.com/p/Cabc123_-x/", "https://www.instagram.com/reel/Cabc123_-x/"])
+    assert (post.details["url_path_type"], reel.details["url_path_type"]) == ("p", "reel")
+    upper, lower = parse_many("tiktok_post", ["https://www.tiktok.com/@Some.User/video/7234567890123456789",
+                                              "https://www.tiktok.com/@some.user/video/7234567890123456789"])
+    assert (upper.details["username"], lower.details["username"]) == ("Some.User", "some.user")
+
+
+def test_short_links_are_kept_as_links():
+    parsed, = parse_many("tiktok_post", ["https://vm.tiktok.com/ZMabc/"])
+    assert parsed.key == ("tiktok", "link", "https://vm.tiktok.com/ZMabc/")
+
+
+def test_malformed_inputs_get_an_error_in_their_position():
+    parsed = parse_many("tiktok_profile", ["bad user!", None, "", "ok"])
+    assert [type(result) for result in parsed[:3]] == [IdentifierError] * 3
+    assert parsed[3].key == ("tiktok", "profile", "ok")
+    assert all(isinstance(result, IdentifierError) for result in parse_many("tiktok_post", ["7234567890123456789", ["a"]]))
+
+
+def test_unknown_info_type_fails_every_position():
+    parsed = parse_many("myspace_profile", ["a", "b"])
+    assert len(parsed) == 2 and all(str(result) == "Invalid info type provided." for result in parsed)
@@ -0,0 +1,98 @@
+# tests/test_jobs.py
+import pytest
+
+from scrapers import jobs
+from scrapers.jobs import JobQueue, JobNotFound
+
+
+class FakeClock:
+    """Stands in for the time module: time() is set by the test."""
+    def __init__(self):
+        self.now = 1700000000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(jobs, "time", fake_clock)
+    return fake_clock
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """Replaces the batch fetcher: one record per identifier, failed for those starting with 'fail'."""
+    calls = []
+
+    def fake_fetch_batch(info_type, identifiers, incremental=False):
+        calls.append((identifiers, incremental))
+        return [([{"Requested Identifier": identifier}], identifier.startswith("fail")) for identifier in identifiers]
+
+    monkeypatch.setattr(jobs, "fetch_batch", fake_fetch_batch)
+    return calls
+
+
+@pytest.fixture
+def job_queue(tmp_path, clock, fetched):
+    return JobQueue(str(tmp_path / "jobs.db"), workers=0, chunk_size=2, lease_seconds=60)
+
+
+def identifiers_of(records):
+    return [record["Requested Identifier"] for record in records]
+
+
+def test_chunks_run_until_the_job_completes(job_queue, fetched):
+    job_id = job_queue.submit("tiktok_profile", ["a", "fail.b", "c"])
+    assert job_queue.get_job(job_id)["status"] == "queued"
+    assert job_queue.run_once() and job_queue.get_job(job_id)["status"] == "running"
+    assert job_queue.run_once() and not job_queue.run_once()
+    job = job_queue.get_job(job_id)
+    assert (job["status"], job["completed"], job["failed"], job["progress"]) == ("completed", 3, 1, 1.0)
+    assert fetched == [(["a", "fail.b"], False), (["c"], False)]
+
+
+def test_an_expired_lease_is_claimed_again_and_the_late_result_dropped(job_queue, clock):
+    job_id = job_queue.submit("tiktok_profile", ["a", "b"])
+    _, _, _, stale_token, items = job_queue._claim() # A worker that then stalls
+    assert job_queue._claim() is None # Leased: nobody else takes the items
+    clock.now += 60
+    _, _, _, token, reclaimed = job_queue._claim()
+    assert reclaimed == items and token != stale_token
+
+    job_queue._record_chunk(job_id, token, [0, 1], [([{"Requested Identifier": "a"}], False), ([{"Requested Identifier": "b"}], False)])
+    job_queue._record_chunk(job_id, stale_token, [0, 1], [([{"Requested Identifier": "late"}], True)] * 2)
+    job = job_queue.get_job(job_id)
+    assert (job["status"], job["completed"], job["failed"]) == ("completed", 2, 0)
+    assert identifiers_of(job_queue.iter_records(job_id)) == ["a", "b"]
+
+
+def test_results_page_by_cursor_and_export_in_input_order(job_queue):
+    job_id = job_queue.submit("tiktok_profile", ["a", "b", "c", "d"])
+    _, _, _, first_token, _ = job_queue._claim()
+    _, _, _, second_token, _ = job_queue._claim()
+    job_queue._record_chunk(job_id, second_token, [2, 3], [([{"Requested Identifier": "c"}], False), ([{"Requested Identifier": "d"}], False)])
+    job_queue._record_chunk(job_id, first_token, [0, 1], [([{"Requested Identifier": "a"}], False), ([{"Requested Identifier": "b"}], False)])
+
+    records, cursor, has_more = job_queue.get_results(job_id, limit=3)
+    assert identifiers_of(records) == ["c", "d", "a"] and has_more
+    records, cursor, has_more = job_queue.get_results(job_id, cursor=cursor, limit=3)
+    assert identifiers_of(records) == ["b"] and not has_more
+    assert job_queue.get_results(job_id, cursor=cursor) == ([], cursor, False) # Polling again picks up later records
+    assert identifiers_of(job_queue.iter_records(job_id, input_order=True)) == ["a", "b", "c", "d"]
+
+
+def test_incremental_jobs_fetch_incrementally(job_queue, fetched):
+    job_id = job_queue.submit("instagram_hashtag", ["sunset"], incremental=True)
+    assert job_queue.get_job(job_id)["incremental"]
+    job_queue.run_once()
+    assert fetched == [(["sunset"], True)]
+
+
+def test_unknown_jobs_and_bad_cursors(job_queue):
+    with pytest.raises(JobNotFound):
+        job_queue.get_job("missing")
+    job_id = job_queue.submit("tiktok_profile", ["a"])
+    with pytest.raises(ValueError):
+        job_queue.get_results(job_id, cursor="not-a-cursor")
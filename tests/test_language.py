@@ -0,0 +1,66 @@
+# tests/test_language.py
+import threading
+
+import pytest
+
+from scrapers import language
+from scrapers.language import LanguageDetector, NOT_AVAILABLE, UNDETECTABLE
+
+
+@pytest.fixture
+def detected(monkeypatch):
+    """Replaces langdetect with a stub answering "en"; returns the texts it was asked about."""
+    texts = []
+
+    def fake_detect(text):
+        texts.append(text)
+        return "en"
+
+    monkeypatch.setattr(language, "_detect", fake_detect)
+    return texts
+
+
+@pytest.fixture
+def detector():
+    return LanguageDetector(processes=0)
+
+
+@pytest.mark.parametrize("text, result", [
+    (None, NOT_AVAILABLE), ("", NOT_AVAILABLE), ("  ", NOT_AVAILABLE), ("N/A", NOT_AVAILABLE),
+    ("🔥🔥🔥 100%", UNDETECTABLE), ("ok", UNDETECTABLE), ("#a1 b2", UNDETECTABLE), # Fewer than 3 letters
+    ("Καλημέρα κόσμε", "el"), ("สวัสดีครับ", "th"), ("안녕하세요", "ko"),
+])
+def test_fast_path_answers_without_langdetect(detected, detector, text, result):
+    assert detector.detect(text) == result
+    assert detected == []
+
+
+def test_short_texts_go_to_langdetect_without_a_minimum(monkeypatch, detected, detector):
+    monkeypatch.setattr(language, "LANGDETECT_MIN_LETTERS", 0)
+    assert [detector.detect(text) for text in ("ok", "🔥")] == ["en", "en"]
+    assert detected == ["ok", "🔥"]
+
+
+def test_other_texts_go_to_langdetect_once(detected, detector):
+    assert detector.detect_many(["Good morning world", "Good morning world", "ok"]) == ["en", "en", UNDETECTABLE]
+    assert detector.detect("Good morning world") == "en"
+    assert detected == ["Good morning world"]
+    assert detector.stats() == {"hits": 1, "misses": 1, "fast_path": 1, "entries": 1}
+
+
+def test_counts_are_exact_across_threads(detected, detector):
+    texts = ["ok", "Good morning world", "hi"] * 50
+
+    def detect():
+        for _ in range(20):
+            detector.detect_many(texts)
+
+    threads = [threading.Thread(target=detect) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = detector.stats()
+    assert stats["fast_path"] == 8 * 20 * 100
+    # A batch either finds its one langdetect text in the memo 50 times, or misses and detects it once
+    assert stats["hits"] + 50 * stats["misses"] == 8 * 20 * 50
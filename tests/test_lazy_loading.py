@@ -0,0 +1,50 @@
+# tests/test_lazy_loading.py
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+import scrapers
+from scrapers import SCRAPERS, load_scraper
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fresh_import(code):
+    """Runs 'code' in a new interpreter (no keys set) and returns what it prints as JSON."""
+    env = {name: value for name, value in os.environ.items() if not name.startswith("RAPIDAPI_KEY")}
+    env.pop("SCRAPER_PRELOAD", None)
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+LOADED = "[name for name in sorted(sys.modules) if name.startswith('scrapers.fetch_') or name == 'langdetect']"
+
+
+def test_importing_the_package_or_the_app_loads_no_platform():
+    assert fresh_import(f"import sys, json, scrapers; print(json.dumps({LOADED}))") == []
+    assert fresh_import(f"import sys, json, app; print(json.dumps({LOADED}))") == []
+
+
+def test_a_platform_is_loaded_on_first_use_only():
+    loaded = fresh_import(
+        "import sys, json\n"
+        "from scrapers import load_scraper\n"
+        "load_scraper('tiktok_profile')\n"
+        f"print(json.dumps({LOADED}))"
+    )
+    assert loaded == ["scrapers.fetch_tiktok_profile_info"] # No langdetect, no other platform, no key needed yet
+
+
+def test_fetch_functions_resolve_by_name():
+    from scrapers import fetch_youtube_post_info
+    fetch_function, adapter = load_scraper("youtube_post")
+    assert fetch_youtube_post_info is fetch_function and scrapers.fetch_youtube_post_info is fetch_function
+    assert adapter.info_type == "youtube_post"
+    assert set(scrapers.__all__) == {function_name for _, function_name in SCRAPERS.values()}
+    with pytest.raises(AttributeError):
+        scrapers.fetch_myspace_profile_info
+    with pytest.raises(KeyError):
+        load_scraper("myspace_profile")
@@ -0,0 +1,102 @@
+# tests/test_metrics.py
+import json
+import threading
+
+import pytest
+
+from scrapers import metrics
+
+DEAD_PID = 999999999 # Above any pid_max, so never a live process
+
+
+@pytest.fixture
+def registry(monkeypatch, tmp_path):
+    """An empty metric registry, publishing to a fresh directory."""
+    monkeypatch.setattr(metrics, "_metrics", {})
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_updates_from_many_threads_add_up():
+    requests = metrics.Metric("test_requests_total", metrics.COUNTER, "Requests.", ("host",))
+
+    def work():
+        for _ in range(1000):
+            requests.labels("a.host").inc()
+        requests.labels("b.host").inc(5)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert requests.labels("a.host").value() == 8000
+    assert requests.labels("b.host").value() == 40
+    # The finished threads' shards were folded into the retired totals
+    assert all(thread_ref() is not thread for thread_ref, _ in metrics._shards for thread in threads)
+    assert requests.labels("a.host").value() == 8000
+
+
+def test_label_values_share_one_child():
+    gauge = metrics.Metric("test_in_flight", metrics.GAUGE, "In flight.", ("host",))
+    assert gauge.labels("a.host") is gauge.labels("a.host")
+    gauge.labels(1).inc(3)
+    gauge.labels("1").dec()
+    assert gauge.labels("1").value() == 2
+
+
+def test_only_registered_metrics_are_in_the_snapshot(registry):
+    registered = metrics.counter("test_registered_total", "Registered.")
+    private = metrics.Metric("test_private_total", metrics.COUNTER, "Private.")
+    registered.inc()
+    private.inc()
+    assert metrics.counter("test_registered_total", "Again.") is registered
+    snapshot = metrics.snapshot()
+    assert list(snapshot["metrics"]) == ["test_registered_total"]
+    assert snapshot["metrics"]["test_registered_total"]["samples"] == [[[], 1]]
+
+
+def test_histograms_count_per_bucket(registry):
+    latency = metrics.histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        latency.observe(value)
+    (label_values, counts), = metrics.snapshot()["metrics"]["test_latency_seconds"]["samples"]
+    assert counts == [2, 1, 1, pytest.approx(2.65)]
+
+
+def test_collected_metrics_are_read_at_scrape_time(registry):
+    state = {"value": 1}
+    metrics.collected("test_collected", metrics.GAUGE, "Collected.", ("name",), lambda: [(("x",), state["value"])])
+    state["value"] = 7
+    assert metrics.snapshot()["metrics"]["test_collected"]["samples"] == [[["x"], 7]]
+
+
+def test_render_totals_every_process(registry):
+    calls = metrics.counter("test_calls_total", "Calls.", ("host",))
+    in_flight = metrics.gauge("test_in_flight_now", "In flight.")
+    latency = metrics.histogram("test_call_seconds", "Call latency.", buckets=(1.0,))
+    calls.labels('a"host').inc(2)
+    in_flight.inc()
+    latency.observe(0.5)
+
+    # A worker that has since exited: its counters still count, its gauges don't
+    exited = metrics.snapshot()
+    exited["pid"] = DEAD_PID
+    (registry / f"metrics-{DEAD_PID}.json").write_text(json.dumps(exited))
+    calls.labels('a"host').inc()
+    in_flight.labels().dec()
+
+    assert metrics.render() == "\n".join([
+        "# HELP test_call_seconds Call latency.",
+        "# TYPE test_call_seconds histogram",
+        'test_call_seconds_bucket{le="1.0"} 2',
+        'test_call_seconds_bucket{le="+Inf"} 2',
+        "test_call_seconds_sum 1.0",
+        "test_call_seconds_count 2",
+        "# HELP test_calls_total Calls.",
+        "# TYPE test_calls_total counter",
+        'test_calls_total{host="a\\"host"} 5',
+        "# HELP test_in_flight_now In flight.",
+        "# TYPE test_in_flight_now gauge",
+        "test_in_flight_now 0",
+    ]) + "\n"
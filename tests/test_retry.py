@@ -0,0 +1,85 @@
+# tests/test_retry.py
+import pytest
+
+from scrapers import retry
+from scrapers.retry import RetryPolicy, Deadline, deadline_scope, current_deadline, is_retryable_status
+
+
+class FakeClock:
+    """Stands in for the time module: monotonic() is set by the test and sleep() just moves it on."""
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(retry, "time", fake_clock)
+    return fake_clock
+
+
+def test_backoff_ceiling_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: high) # Always the ceiling
+    policy = RetryPolicy(base_delay=0.5, max_delay=3)
+    assert [policy.backoff(retry_number) for retry_number in range(1, 6)] == [0.5, 1, 2, 3, 3]
+
+
+def test_backoff_is_jittered_below_the_ceiling():
+    policy = RetryPolicy(base_delay=1, max_delay=8)
+    pauses = [policy.backoff(3) for _ in range(200)]
+    assert all(0 <= pause <= 4 for pause in pauses)
+    assert len(set(pauses)) > 1
+
+
+def test_no_sleep_when_the_retry_couldnt_start_before_the_deadline(clock, monkeypatch):
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(base_delay=1, max_delay=8)
+    deadline = Deadline(3)
+    assert policy.sleep(1, deadline) and clock.slept == [1]
+    assert not policy.sleep(2, deadline) # 2s left, and the pause would take all of it
+    assert clock.slept == [1]
+
+
+def test_socket_timeouts_shrink_near_the_deadline(clock):
+    policy = RetryPolicy(connect_timeout=5, read_timeout=15)
+    deadline = Deadline(20)
+    assert policy.timeouts(deadline) == (5, 15)
+    clock.now += 12
+    assert policy.timeouts(deadline) == (5, 8)
+    clock.now += 20
+    assert policy.timeouts(deadline) == (retry._MIN_TIMEOUT, retry._MIN_TIMEOUT) # Never 0, which would mean non-blocking
+
+
+def test_deadlines_in_scope_only_ever_get_shorter(clock):
+    assert current_deadline() is None
+    outer, longer, shorter = Deadline(10), Deadline(30), Deadline(5)
+    with deadline_scope(outer):
+        with deadline_scope(longer):
+            assert current_deadline() is outer
+        with deadline_scope(shorter):
+            assert current_deadline() is shorter
+            assert RetryPolicy(identifier_deadline=20).start_deadline() is shorter
+        with deadline_scope(None):
+            assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+def test_deadline_expiry(clock):
+    deadline = Deadline(2)
+    clock.now += 1.5
+    assert deadline.remaining() == pytest.approx(0.5) and not deadline.expired()
+    clock.now += 1
+    assert deadline.remaining() == 0 and deadline.expired()
+
+
+@pytest.mark.parametrize("status, retryable", [(429, True), (500, True), (503, True), (400, False), (404, False), (200, False)])
+def test_retryable_statuses(status, retryable):
+    assert is_retryable_status(status) is retryable
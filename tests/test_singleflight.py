@@ -0,0 +1,95 @@
+# tests/test_singleflight.py
+import threading
+
+import pytest
+
+from scrapers import cache
+from scrapers.retry import Deadline, deadline_scope
+from scrapers.singleflight import SingleFlight, WaitTimeout
+
+
+class SlowCall:
+    """A function that blocks until released, run as the leader of a key on its own thread."""
+    def __init__(self, flight, key, result="result"):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.result = result
+        self.calls = 0
+        self.thread = threading.Thread(target=self._lead, args=(flight, key))
+        self.thread.start()
+        assert self.started.wait(1)
+
+    def _lead(self, flight, key):
+        try:
+            flight.do(key, self)
+        except Exception:
+            pass # The waiters' side is what is being tested
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+    def finish(self):
+        self.release.set()
+        self.thread.join()
+
+
+def test_waiters_share_the_leaders_result():
+    flight = SingleFlight()
+    leader = SlowCall(flight, "key", result=["record"])
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(flight.do("key", lambda: pytest.fail("ran twice"), copy_result=list)))
+    waiter.start()
+    while flight.shared < 1:
+        pass
+    leader.finish()
+    waiter.join()
+    assert results == [["record"]] and results[0] is not leader.result
+    assert leader.calls == 1 and flight.in_flight() == 0
+
+
+def test_waiters_share_the_leaders_exception():
+    flight = SingleFlight()
+    leader = SlowCall(flight, "key", result=ValueError("upstream broke"))
+    errors = []
+
+    def wait():
+        try:
+            flight.do("key", lambda: None)
+        except ValueError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    while flight.shared < 1:
+        pass
+    leader.finish()
+    waiter.join()
+    assert [str(error) for error in errors] == ["upstream broke"]
+
+
+def test_a_waiter_gives_up_at_its_timeout_while_the_call_carries_on():
+    flight = SingleFlight()
+    leader = SlowCall(flight, "key")
+    with pytest.raises(WaitTimeout):
+        flight.do("key", lambda: None, timeout=0.01)
+    assert flight.in_flight() == 1
+    leader.finish()
+    assert flight.do("key", lambda: "fresh") == "fresh"
+
+
+def test_cached_fetch_waits_no_longer_than_the_deadline_in_scope(monkeypatch):
+    flight = SingleFlight()
+    monkeypatch.setattr(cache, "inflight_fetches", flight)
+    monkeypatch.setattr(cache, "CACHE_ENABLED", False)
+    fetch = cache.cached("test_type")(lambda identifier: {"Name": identifier})
+    leader = SlowCall(flight, cache.cache_key("test_type", "someone"))
+    try:
+        with deadline_scope(Deadline(0.05)):
+            assert fetch("someone") == {"error": "Timed out waiting for another request's fetch of someone within the 0.05s deadline."}
+    finally:
+        leader.finish()
@@ -0,0 +1,76 @@
+# tests/test_snapshots.py
+import random
+
+import pytest
+
+from scrapers.snapshots import SnapshotStore, encode_row, decode_row, parse_count, _encode_base, _decode_base
+
+# Follower counts that go up and down, with gaps where a fetch didn't report a metric
+SERIES = [
+    [1000, 50, 12],
+    [1004, 50, 12],
+    [998, None, 13], # A few unfollows, and a missing metric
+    [998, 51, 13],
+    [2500000000, 51, 0], # Values far beyond one varint byte
+    [None, None, None],
+    [2499999990, 49, 14],
+]
+
+
+def _round_trip(rows, keyframe_interval):
+    base = [None] * len(rows[0])
+    encoded = []
+    for number, values in enumerate(rows):
+        data, base = encode_row(values, base, keyframe=number % keyframe_interval == 0)
+        encoded.append(data)
+    base = [None] * len(rows[0])
+    decoded = []
+    for data in encoded:
+        _, values, base = decode_row(data, base, len(rows[0]))
+        decoded.append(values)
+    return encoded, decoded
+
+
+@pytest.mark.parametrize("keyframe_interval", [1, 3, 100])
+def test_rows_decode_to_what_was_encoded(keyframe_interval):
+    _, decoded = _round_trip(SERIES, keyframe_interval)
+    assert decoded == SERIES
+
+
+def test_random_walks_round_trip():
+    rng = random.Random(7)
+    rows, value = [], [rng.randrange(10 ** 9) for _ in range(4)]
+    for _ in range(500):
+        value = [max(0, metric + rng.randint(-1000, 1000)) for metric in value]
+        rows.append([metric if rng.random() > 0.1 else None for metric in value])
+    _, decoded = _round_trip(rows, 32)
+    assert decoded == rows
+
+
+def test_small_changes_take_a_few_bytes():
+    encoded, _ = _round_trip([[1000000, 5000], [1000003, 4999]], 32)
+    assert len(encoded[0]) > len(encoded[1]) == 3 # Header, +3 and -1
+
+
+def test_base_round_trips_and_pads_new_metrics():
+    base = [5, None, -3, 0]
+    assert _decode_base(_encode_base(base), 4) == base
+    assert _decode_base(_encode_base(base), 6) == base + [None, None]
+
+
+def test_store_query_decodes_from_the_nearest_keyframe(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.db"), keyframe_interval=3)
+    for at, values in enumerate(SERIES, start=100):
+        assert store.record("tiktok_profile", "profile:someone", values, at=at)
+    assert not store.record("tiktok_profile", "profile:someone", [1, 1, 1], at=100) # Out of order
+
+    assert store.query("tiktok_profile", "profile:someone", 3) == list(enumerate(SERIES, start=100))
+    assert store.query("tiktok_profile", "profile:someone", 3, start=104, end=105) == [(104, SERIES[4]), (105, SERIES[5])]
+    assert store.series_info("tiktok_profile", "profile:someone") == {"points": len(SERIES), "last_at": 106}
+
+
+@pytest.mark.parametrize("value, count", [
+    (1234, 1234), ("1,234", 1234), ("1.2K", 1200), ("3M", 3000000), ("N/A", None), (True, None), (None, None),
+])
+def test_parse_count(value, count):
+    assert parse_count(value) == count
@@ -0,0 +1,83 @@
+# tests/test_sqlite_cache.py
+import sqlite3
+
+import pytest
+
+from scrapers import cache, sqlite_cache
+from scrapers.sqlite_cache import SQLiteCacheStore
+
+
+class FakeClock:
+    """Stands in for the time module: time() is set by the test."""
+    def __init__(self):
+        self.now = 1700000000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(sqlite_cache, "time", fake_clock)
+    return fake_clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return SQLiteCacheStore(str(tmp_path / "results.db"), max_bytes=100, compact_interval=0)
+
+
+def test_entries_expire_after_their_ttl(store, clock):
+    store.set("tiktok_profile:profile:someone", {"Followers": 5}, 60)
+    assert store.get("tiktok_profile:profile:someone") == ({"Followers": 5}, clock.now + 60)
+    clock.now += 60
+    assert store.get("tiktok_profile:profile:someone") is None
+    assert (store.hits, store.misses) == (1, 1)
+
+
+def test_compaction_drops_expired_entries(store, clock):
+    store.set("short", "a", 10)
+    store.set("long", "b", 1000)
+    clock.now += 10
+    store.compact()
+    assert store.stats()["entries"] == 1
+    assert store.get("long") is not None
+
+
+def test_compaction_evicts_least_recently_used_entries_above_the_size_cap(store, clock):
+    for number in range(5):
+        store.set(f"key-{number}", "x" * 28, 1000) # 30 bytes encoded each
+        clock.now += 1
+    clock.now += sqlite_cache._TOUCH_INTERVAL_SECONDS + 1
+    assert store.get("key-0") is not None # Refreshes its access time
+    store.compact()
+    assert store.stats()["bytes"] <= 100
+    assert [key for key in ("key-0", "key-1", "key-2", "key-3", "key-4") if store.get(key)] == ["key-0", "key-3", "key-4"]
+
+
+class BrokenStore:
+    """A shared store whose database is locked."""
+    def get(self, key):
+        raise sqlite3.OperationalError("database is locked")
+
+    def set(self, key, value, ttl):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_a_failing_shared_store_is_skipped(monkeypatch):
+    monkeypatch.setattr(cache, "get_shared_store", lambda: BrokenStore())
+    cache.response_cache.clear()
+    calls = []
+
+    @cache.cached("test_type")
+    def fetch(identifier):
+        calls.append(identifier)
+        return {"Name": identifier}
+
+    try:
+        assert fetch("someone") == {"Name": "someone"} # Looked up as a miss, fetched, and the write skipped
+        assert fetch("someone") == {"Name": "someone"} # From the in-memory cache
+        assert calls == ["someone"]
+    finally:
+        cache.response_cache.clear()
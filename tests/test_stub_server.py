@@ -0,0 +1,82 @@
+# tests/test_stub_server.py
+import json
+import urllib.parse
+import urllib.request
+
+import pytest
+
+from bench.stub_server import StubServer, StubConfig, parse_latency
+from scrapers import adapters, http_pool, load_scraper
+from scrapers.api_key_manager import RapidAPIKeyScheduler
+from scrapers.circuit_breaker import CircuitBreaker
+from scrapers.retry import RetryPolicy
+
+
+@pytest.fixture
+def start_stub(monkeypatch):
+    """Starts stub servers on free ports, points the connection pool at the last one and stops them all afterwards."""
+    servers = []
+
+    def start(**options):
+        server = StubServer(("127.0.0.1", 0), StubConfig(seed=1, payload_bytes=100, **options))
+        servers.append(server)
+        monkeypatch.setattr(http_pool, "_override", urllib.parse.urlsplit(server.start_in_thread()))
+        http_pool.close_all() # No pooled connection to a previous stub
+        return server
+
+    yield start
+    http_pool.close_all()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def adapter(monkeypatch):
+    monkeypatch.setenv("RAPIDAPI_KEY_1", "key-one")
+    monkeypatch.setenv("RAPIDAPI_KEY_2", "key-two")
+    monkeypatch.delenv("RAPIDAPI_KEY_3", raising=False)
+    monkeypatch.setattr(adapters, "rapidapi_key_manager", RapidAPIKeyScheduler())
+    breaker = CircuitBreaker("stub", min_calls=100)
+    monkeypatch.setattr(adapters, "get_breaker", lambda host: breaker)
+    _, profile_adapter = load_scraper("tiktok_profile")
+    monkeypatch.setattr(profile_adapter, "retry_policy", RetryPolicy(max_attempts=4, base_delay=0, max_delay=0))
+    return profile_adapter
+
+
+def get(server, path, host):
+    request = urllib.request.Request(server.url + path, headers={"x-rapidapi-host": host, "x-rapidapi-key": "key"})
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def test_latency_specs():
+    assert parse_latency("0")(None) == 0
+    assert parse_latency("fixed:0.2")(None) == 0.2
+    with pytest.raises(ValueError):
+        parse_latency("gaussian:1")
+
+
+def test_hashtag_pages_follow_the_pagination_token(start_stub):
+    server = start_stub(page_size=3, hashtag_pages=2)
+    first = get(server, "/v1/hashtag?hashtag=sunset", "instagram-social-api.p.rapidapi.com")
+    assert [item["code"] for item in first["data"]["items"]] == ["sunset-1-0", "sunset-1-1", "sunset-1-2"]
+    last = get(server, f"/v1/hashtag?hashtag=sunset&pagination_token={first['pagination_token']}",
+               "instagram-social-api.p.rapidapi.com")
+    assert "pagination_token" not in last
+    assert server.stats() == {"requests": 2, "by_host": {"instagram-social-api.p.rapidapi.com": 2}, "by_status": {"200": 2}}
+
+
+def test_the_scrapers_fetch_from_the_stub(start_stub, adapter):
+    server = start_stub()
+    record = adapter.fetch("someone")
+    assert record["Username"] == "someone" and record["Nickname"] == "Someone"
+    assert server.stats()["by_host"] == {"tiktok-scraper7.p.rapidapi.com": 1}
+
+
+def test_unauthorized_keys_and_used_up_quota_are_honoured(start_stub, adapter):
+    server = start_stub(unauthorized_keys=["key-one"], quota=1)
+    assert adapter.fetch("someone")["Username"] == "someone"
+    assert adapter.fetch("another")["error"].startswith("All RapidAPI keys exhausted")
+    # key-two's quota headers said 0 left, so no call was spent on a 429
+    assert server.stats()["by_status"] == {"401": 1, "200": 1}
@@ -0,0 +1,96 @@
+# tests/test_tracing.py
+import pytest
+
+from scrapers import batch, tracing
+
+
+class Collector(tracing.SpanHook):
+    def __init__(self):
+        self.started = []
+        self.ended = []
+
+    def on_start(self, span):
+        self.started.append(span.name)
+
+    def on_end(self, span):
+        self.ended.append(span)
+
+
+@pytest.fixture
+def collector():
+    hook = tracing.add_hook(Collector())
+    yield hook
+    tracing.remove_hook(hook)
+
+
+def test_spans_cost_nothing_while_nobody_listens():
+    assert tracing.span("fetch") is tracing._NOOP_SPAN
+    with tracing.span("fetch") as span:
+        span.set_attribute("host", "a.host")
+    assert tracing.current_span() is None
+
+
+def test_spans_nest_and_reach_the_hooks(collector):
+    with tracing.span("fetch", info_type="tiktok_profile") as outer:
+        with tracing.span("upstream.request", host="a.host") as inner:
+            assert tracing.current_span() is inner
+            inner.set_attribute("status", 200)
+        with pytest.raises(ValueError):
+            with tracing.span("json.decode"):
+                raise ValueError("not json")
+    assert tracing.current_span() is None
+    assert collector.started == ["fetch", "upstream.request", "json.decode"]
+    assert [span.name for span in collector.ended] == ["upstream.request", "json.decode", "fetch"]
+    assert inner.parent is outer and inner.attributes == {"host": "a.host", "status": 200}
+    assert collector.ended[1].error == "ValueError"
+    assert outer.duration >= inner.duration
+
+
+def test_a_failing_hook_doesnt_break_the_span(collector, capsys):
+    class Broken(tracing.SpanHook):
+        def on_end(self, span):
+            raise RuntimeError("boom")
+
+    broken = tracing.add_hook(Broken())
+    try:
+        with tracing.span("fetch"):
+            pass
+    finally:
+        tracing.remove_hook(broken)
+    assert "failed on span fetch: boom" in capsys.readouterr().out
+    assert [span.name for span in collector.ended] == ["fetch"]
+
+
+def test_recorded_timings_are_summarized():
+    assert tracing.span("fetch") is tracing._NOOP_SPAN
+    with tracing.record_timings() as recorder:
+        for status in (429, 200):
+            with tracing.span("upstream.request", host="a.host", key=1) as attempt:
+                attempt.set_attribute("status", status)
+        with tracing.span("backoff"):
+            pass
+    assert tracing.span("fetch") is tracing._NOOP_SPAN # Off again once nobody records
+    summary = recorder.summary()
+    assert summary["attempts"] == 2
+    assert summary["span_counts"] == {"upstream.request": 2, "backoff": 1}
+    assert set(summary["timings_ms"]) == {"upstream.request", "backoff"}
+    assert [(attempt["status"], attempt["key"]) for attempt in summary["upstream"]] == [(429, 1), (200, 1)]
+    assert all("ms" in attempt for attempt in summary["upstream"])
+
+
+def test_debug_fetches_attach_the_breakdown_to_copies(monkeypatch):
+    cached = [{"Username": "someone"}]
+
+    def fake_fetch(info_type, identifier, deadline, incremental=False):
+        with tracing.span("upstream.request", host="a.host", key=0, status=200):
+            pass
+        return cached, False
+
+    monkeypatch.setattr(batch, "_fetch_identifier", fake_fetch)
+    records, failed = batch.fetch_identifier("tiktok_profile", "someone", debug=True)
+    debug_info = records[0]["_debug"]
+    assert not failed and debug_info["attempts"] == 1
+    assert debug_info["span_counts"] == {"upstream.request": 1, "fetch": 1}
+    assert debug_info["elapsed_ms"] >= debug_info["timings_ms"]["upstream.request"]
+    assert "_debug" not in cached[0] # The cached record is left alone
+    assert "_debug" not in batch.fetch_identifier("tiktok_profile", "someone")[0][0]